@@ -2,20 +2,55 @@
 
 import ttkbootstrap as ttk
 from tkinter import messagebox, filedialog
-from models import Inventario
+from models import obtener_inventario_compartido
+from tabla_virtual import TablaVirtual
+from panel_tareas import PanelTareas
+from tareas import Tarea
+from intercambio import exportar_dataframe
+import config
 from config import get_setting # <-- Asegúrate de que esta importación exista
-import pandas as pd
+import numpy as np
+from rendimiento import medido
+import perfilado
 
 class AlertsFrame(ttk.Frame):
     def __init__(self, parent, controller, usuario_actual):
         super().__init__(parent)
         self.controller = controller
         self.usuario_actual = usuario_actual
-        self.inventario = Inventario()
+        self.inventario = obtener_inventario_compartido()
         self.stock_low_limit = get_setting("stock_low_limit") # Valor inicial
+        self._refresco_pendiente = None
 
         self.crear_widgets()
         self.cargar_alertas_en_treeview()
+        self.inventario.suscribir(self._on_inventario_cambiado)
+        config.suscribir(self._on_setting_cambiado)
+
+    def destroy(self):
+        self.inventario.cancelar_suscripcion(self._on_inventario_cambiado)
+        config.cancelar_suscripcion(self._on_setting_cambiado)
+        if self._refresco_pendiente is not None:
+            self.after_cancel(self._refresco_pendiente)
+        self.panel_tareas.cancelar_todas()
+        super().destroy()
+
+    def _on_inventario_cambiado(self, evento, codigos):
+        self._programar_refresco()
+
+    def _on_setting_cambiado(self, clave, valor):
+        if clave == "stock_low_limit":
+            self.stock_low_limit = valor
+            self._programar_refresco()
+
+    def _programar_refresco(self):
+        """Agrupa los cambios del inventario o de la configuración en un único refresco de las alertas."""
+        if self._refresco_pendiente is None:
+            self._refresco_pendiente = self.after_idle(self._refrescar_vista)
+
+    def _refrescar_vista(self):
+        self._refresco_pendiente = None
+        self._perform_search()
 
     def crear_widgets(self):
         titulo_label = ttk.Label(self, text="⚠️ Alertas de Stock", font=("Helvetica", 20, "bold"))
@@ -26,21 +61,21 @@ class AlertsFrame(ttk.Frame):
         ttk.Button(button_frame, text="Exportar Alertas", command=self.exportar_alertas, bootstyle="SUCCESS").pack(side="left", padx=5)
         ttk.Button(button_frame, text="Actualizar Lista", command=self.cargar_alertas_en_treeview, bootstyle="INFO").pack(side="right", padx=5)
 
+        # Exportaciones en curso (solo visible mientras hay alguna)
+        self.panel_tareas = PanelTareas(self)
+        self.panel_tareas.pack(fill="x", padx=15, pady=(0, 5), after=button_frame)
+
         search_frame = ttk.Labelframe(self, text="🔍 Buscar Alerta", padding=10)
         search_frame.pack(fill="x", padx=10, pady=(5, 10))
         self.search_entry = ttk.Entry(search_frame, bootstyle="PRIMARY")
         self.search_entry.pack(fill="x")
         self.search_entry.bind("<KeyRelease>", self._perform_search)
 
-        tree_frame = ttk.Frame(self)
-        tree_frame.pack(fill="both", expand=True, padx=10, pady=5)
-        tree_scroll = ttk.Scrollbar(tree_frame)
-        tree_scroll.pack(side="right", fill="y")
-        self.tree = ttk.Treeview(tree_frame, yscrollcommand=tree_scroll.set, bootstyle="PRIMARY", show="headings")
-        self.tree.pack(fill="both", expand=True)
-        tree_scroll.config(command=self.tree.yview)
+        self.tabla = TablaVirtual(self, ('codigo', 'descripcion', 'cantidad', 'estado'), bootstyle="PRIMARY",
+                                  mensaje_vacio="No hay productos con stock bajo en este momento.")
+        self.tabla.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tree = self.tabla.tree
 
-        self.tree['columns'] = ('codigo', 'descripcion', 'cantidad', 'estado')
         self.tree.column("codigo", anchor="center", width=150)
         self.tree.column("descripcion", anchor="w", width=500)
         self.tree.column("cantidad", anchor="center", width=100)
@@ -49,52 +84,44 @@ class AlertsFrame(ttk.Frame):
         self.tree.heading("descripcion", text="Descripción", anchor='w')
         self.tree.heading("cantidad", text="Cantidad Actual", anchor='center')
         self.tree.heading("estado", text="Estado", anchor='w')
-
-    def _populate_treeview(self, productos_list):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        if not productos_list:
-            self.tree.insert("", "end", values=("", "No hay productos con stock bajo en este momento.", "", ""))
-            return
-        for index, producto in enumerate(productos_list):
-            if producto.cantidad < 20:
-                estado = "Crítico"
-                tag = 'danger'
-            elif producto.cantidad < self.stock_low_limit: # Usar el valor dinámico
-                estado = "Bajo"
-                tag = 'warning'
-            else:
-                estado = "Normal"
-                tag = 'success'
-            self.tree.insert(parent='', index='end', iid=index, text='',
-                             values=(producto.codigo, producto.descripcion, producto.cantidad, estado),
-                             tags=(tag,))
         self.tree.tag_configure('danger', foreground='red')
         self.tree.tag_configure('warning', foreground='orange')
         self.tree.tag_configure('success', foreground='green')
 
+    @medido("vista.alertas.llenar_tabla")
+    def _populate_treeview(self, df):
+        cantidades = df['cantidad'].to_numpy(dtype=int)
+        # Estado y color calculados por columnas en lugar de fila a fila
+        condiciones = [cantidades < 20, cantidades < self.stock_low_limit] # Usar el valor dinámico
+        estados = np.select(condiciones, ["Crítico", "Bajo"], default="Normal")
+        tags = np.select(condiciones, ['danger', 'warning'], default='success')
+        self.tabla.cargar([df['codigo'], df['descripcion'], cantidades, estados], etiquetas=tags)
+
+    @medido("vista.alertas.buscar")
     def _perform_search(self, event=None):
-        search_term = self.search_entry.get().lower().strip()
-        # CAMBIO CLAVE: Volver a leer el límite de stock ANTES de buscar
-        self.stock_low_limit = get_setting("stock_low_limit")
-        
-        productos_bajo_stock = self.inventario.obtener_productos_stock_bajo(limite=self.stock_low_limit)
+        sesion = perfilado.iniciar_sesion("Búsqueda en alertas")
+        try:
+            with perfilado.perfilar(sesion):
+                self._buscar(self.search_entry.get().lower().strip())
+        finally:
+            perfilado.terminar_sesion(sesion)
+
+    def _buscar(self, search_term):
+        """Muestra las alertas cuyo código o descripción contienen el término."""
+        # El límite de stock se mantiene al día mediante config.suscribir;
+        # la lista sale del índice de cantidades del inventario, sin recorrerlo entero
+        df_bajo_stock = self.inventario.obtener_dataframe_stock_bajo(limite=self.stock_low_limit)
 
         if not search_term:
-            self._populate_treeview(productos_bajo_stock)
+            self._populate_treeview(df_bajo_stock)
         else:
-            productos_filtrados = [
-                p for p in productos_bajo_stock
-                if search_term in p.codigo.lower() or search_term in p.descripcion.lower()
-            ]
-            self._populate_treeview(productos_filtrados)
+            coincide = (df_bajo_stock['codigo'].str.lower().str.contains(search_term, regex=False) |
+                        df_bajo_stock['descripcion'].str.lower().str.contains(search_term, regex=False))
+            self._populate_treeview(df_bajo_stock[coincide])
 
     def cargar_alertas_en_treeview(self):
-        # CAMBIO CLAVE: Volver a leer el límite de stock ANTES de cargar
-        self.stock_low_limit = get_setting("stock_low_limit")
-        
-        productos_bajo_stock = self.inventario.obtener_productos_stock_bajo(limite=self.stock_low_limit)
-        self._populate_treeview(productos_bajo_stock)
+        df_bajo_stock = self.inventario.obtener_dataframe_stock_bajo(limite=self.stock_low_limit)
+        self._populate_treeview(df_bajo_stock)
         self.search_entry.delete(0, 'end')
 
     def exportar_alertas(self):
@@ -105,16 +132,15 @@ class AlertsFrame(ttk.Frame):
         )
         if not filepath:
             return
-        try:
-            # Usar el límite más reciente para exportar
-            self.stock_low_limit = get_setting("stock_low_limit")
-            productos_bajo_stock = self.inventario.obtener_productos_stock_bajo(limite=self.stock_low_limit)
-            
-            if not productos_bajo_stock:
-                messagebox.showinfo("Sin Datos", "No hay productos con stock bajo para exportar.")
-                return
-            df_reporte = pd.DataFrame([p.__dict__ for p in productos_bajo_stock])
-            df_reporte.to_excel(filepath, index=False)
-            messagebox.showinfo("Reporte Generado", f"El reporte de alertas se ha guardado en:\n{filepath}")
-        except Exception as e:
-            messagebox.showerror("Error al Generar Reporte", f"No se pudo generar el reporte.\nError: {e}")
\ No newline at end of file
+        # Usar el límite más reciente para exportar
+        df_reporte = self.inventario.obtener_dataframe_stock_bajo(limite=self.stock_low_limit)
+
+        if df_reporte.empty:
+            messagebox.showinfo("Sin Datos", "No hay productos con stock bajo para exportar.")
+            return
+        # El archivo se escribe en segundo plano; se pueden lanzar varias exportaciones a la vez
+        tarea = Tarea("Exportando alertas", exportar_dataframe, df_reporte, filepath)
+        self.panel_tareas.lanzar(
+            tarea,
+            lambda ruta: messagebox.showinfo("Reporte Generado", f"El reporte de alertas se ha guardado en:\n{ruta}"),
+            al_fallar=lambda e: messagebox.showerror("Error al Generar Reporte", f"No se pudo generar el reporte.\nError: {e}"))
@@ -0,0 +1,96 @@
+# almacenamiento.py
+
+import os
+import pandas as pd
+from utils import INVENTARIO_FILE, INVENTARIO_FEATHER_FILE
+
+# Columnas del inventario, en el orden en que se guardan
+COLUMNAS = ['codigo', 'descripcion', 'cantidad']
+
+try:
+    import pyarrow  # noqa: F401  (necesario para el formato Feather)
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+def dataframe_vacio() -> pd.DataFrame:
+    """Devuelve un inventario vacío con los tipos de columna correctos."""
+    return pd.DataFrame({
+        'codigo': pd.Series(dtype=str),
+        'descripcion': pd.Series(dtype=str),
+        'cantidad': pd.Series(dtype=int),
+    })
+
+def normalizar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """Garantiza que existan todas las columnas y que tengan el tipo esperado."""
+    for col in COLUMNAS:
+        if col not in df.columns:
+            df[col] = "" if col == 'descripcion' else 0
+    df['codigo'] = df['codigo'].astype(str)
+    df['cantidad'] = pd.to_numeric(df['cantidad'], errors='coerce').fillna(0).astype(int)
+    return df[COLUMNAS].reset_index(drop=True)
+
+def reemplazar_atomicamente(ruta: str, escribir):
+    """Escribe con escribir(ruta_temporal) y sustituye el archivo final de una sola vez."""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = ruta + ".tmp"
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+class AlmacenamientoCSV:
+    """Guarda el inventario en un archivo CSV (formato de texto legible e intercambiable)."""
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    def existe(self) -> bool:
+        return os.path.exists(self.ruta)
+
+    def cargar(self) -> pd.DataFrame:
+        """Carga los datos desde el archivo CSV o devuelve un DataFrame vacío si no existe."""
+        if not self.existe():
+            return dataframe_vacio()
+        try:
+            # El código se lee como texto para no perder ceros a la izquierda
+            return normalizar_tipos(pd.read_csv(self.ruta, dtype={'codigo': str}))
+        except (pd.errors.EmptyDataError, FileNotFoundError):
+            return dataframe_vacio()
+
+    def guardar(self, df: pd.DataFrame):
+        reemplazar_atomicamente(self.ruta, lambda ruta: df.to_csv(ruta, index=False))
+
+class AlmacenamientoFeather:
+    """
+    Guarda el inventario en formato columnar binario (Apache Arrow / Feather).
+    Conserva los tipos de cada columna, así que cargar no requiere volver a
+    interpretar texto. Si el archivo aún no existe y hay un almacenamiento de
+    origen (normalmente el CSV antiguo), lo migra automáticamente la primera vez.
+    """
+    def __init__(self, ruta: str, migrar_desde=None):
+        self.ruta = ruta
+        self.migrar_desde = migrar_desde
+
+    def existe(self) -> bool:
+        return os.path.exists(self.ruta)
+
+    def cargar(self) -> pd.DataFrame:
+        if not self.existe():
+            if self.migrar_desde is not None and self.migrar_desde.existe():
+                df = self.migrar_desde.cargar()
+                self.guardar(df)
+                print(f"Inventario migrado de '{self.migrar_desde.ruta}' a '{self.ruta}'.")
+                return df
+            return dataframe_vacio()
+        return normalizar_tipos(pd.read_feather(self.ruta))
+
+    def guardar(self, df: pd.DataFrame):
+        reemplazar_atomicamente(self.ruta, lambda ruta: df.reset_index(drop=True).to_feather(ruta))
+
+def almacenamiento_por_defecto():
+    """
+    Devuelve el almacenamiento del inventario de la aplicación: Feather si
+    pyarrow está instalado (migrando el CSV existente), o CSV en caso contrario.
+    """
+    csv = AlmacenamientoCSV(INVENTARIO_FILE)
+    if PYARROW_DISPONIBLE:
+        return AlmacenamientoFeather(INVENTARIO_FEATHER_FILE, migrar_desde=csv)
+    return csv
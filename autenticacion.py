@@ -0,0 +1,64 @@
+# autenticacion.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from usuarios import GestionUsuarios
+
+# Hilos dedicados a calcular y verificar hashes bcrypt
+HILOS_AUTENTICACION = 2
+# Cada cuánto se consulta desde Tk si la operación terminó
+INTERVALO_SONDEO_MS = 50
+
+_ejecutor = None
+_cerrojo_ejecutor = threading.Lock()
+
+def _obtener_ejecutor() -> ThreadPoolExecutor:
+    """Devuelve el pool de hilos de autenticación, creándolo la primera vez."""
+    global _ejecutor
+    with _cerrojo_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=HILOS_AUTENTICACION, thread_name_prefix="autenticacion")
+        return _ejecutor
+
+class ServicioAutenticacion:
+    """
+    Ejecuta en segundo plano las operaciones de GestionUsuarios que usan bcrypt,
+    para que la ventana no se congele mientras se calcula el hash.
+    Cada método devuelve un Future; usa esperar_resultado() para recibir el
+    resultado en el hilo de Tk.
+    """
+    def __init__(self, gestion_usuarios=None):
+        self.gestion_usuarios = gestion_usuarios or GestionUsuarios()
+
+    def verificar_usuario(self, nombre_usuario: str, password: str):
+        """Future con los datos del usuario o None (ver GestionUsuarios.verificar_usuario)."""
+        return _obtener_ejecutor().submit(self.gestion_usuarios.verificar_usuario, nombre_usuario, password)
+
+    def crear_usuario(self, nombre_usuario: str, nombre_completo: str, password: str):
+        """Future con True si el usuario se creó (ver GestionUsuarios.crear_usuario)."""
+        return _obtener_ejecutor().submit(self.gestion_usuarios.crear_usuario, nombre_usuario, nombre_completo, password)
+
+    def cambiar_password(self, nombre_usuario: str, nueva_password: str):
+        """Future con True si la contraseña se cambió (ver GestionUsuarios.cambiar_password)."""
+        return _obtener_ejecutor().submit(self.gestion_usuarios.cambiar_password, nombre_usuario, nueva_password)
+
+def esperar_resultado(widget, futuro, al_terminar, al_fallar=None, intervalo=INTERVALO_SONDEO_MS):
+    """
+    Sondea el futuro con widget.after() sin bloquear el bucle de eventos y,
+    cuando termina, llama en el hilo de Tk a al_terminar(resultado) o, si la
+    operación lanzó una excepción, a al_fallar(excepcion).
+    """
+    def sondear():
+        if not widget.winfo_exists():
+            return
+        if not futuro.done():
+            widget.after(intervalo, sondear)
+            return
+        error = futuro.exception()
+        if error is None:
+            al_terminar(futuro.result())
+        elif al_fallar is not None:
+            al_fallar(error)
+        else:
+            print(f"Error en la operación de autenticación: {error}")
+    widget.after(intervalo, sondear)
@@ -0,0 +1,309 @@
+# benchmarks.py
+"""
+Pruebas de rendimiento sin interfaz gráfica.
+
+Mide las operaciones más usadas de la aplicación (cargar, guardar, altas,
+bajas, stock bajo, importar y exportar el inventario, registrar en el
+historial, leer la configuración y las operaciones de usuarios) sobre
+catálogos sintéticos de distintos tamaños. Todo se ejecuta en una carpeta de
+datos temporal (variable INVENTARIO_DATA_DIR), así que no toca los datos reales.
+
+Los resultados se guardan en JSON para poder compararlos entre versiones:
+
+    python benchmarks.py                                  # 1k, 10k y 100k filas
+    python benchmarks.py --filas 1000 1000000 --salida actual.json
+    python benchmarks.py --salida actual.json --comparar anterior.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Tamaños de catálogo por defecto (filas)
+FILAS_POR_DEFECTO = [1000, 10000, 100000]
+# Por encima de este tamaño no se prueba Excel (openpyxl es lento y no aporta más información)
+MAX_FILAS_EXCEL = 100000
+# Operaciones individuales en las pruebas de altas, bajas e historial
+OPERACIONES = 1000
+# Lecturas de configuración en la prueba de get_setting
+LECTURAS_CONFIGURACION = 100000
+# Una variación mayor que esta fracción se marca al comparar con otra ejecución
+UMBRAL_REGRESION = 0.20
+
+def _preparar_entorno(carpeta: str):
+    """Redirige la carpeta de datos antes de importar los módulos de la aplicación."""
+    # Debe coincidir con utils.DATA_DIR_ENV; se fija antes de importar utils
+    os.environ["INVENTARIO_DATA_DIR"] = carpeta
+
+def catalogo_sintetico(filas: int, semilla: int = 42):
+    """Genera un inventario de prueba reproducible con el número de filas indicado."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(semilla)
+    indices = np.arange(filas)
+    return pd.DataFrame({
+        'codigo': [f"BAT{i:07d}" for i in indices],
+        'descripcion': [f"Batería modelo {i % 500} - lote {i // 500}" for i in indices],
+        'cantidad': rng.integers(0, 500, size=filas),
+    })
+
+class Resultados:
+    """Acumula las mediciones y las convierte en el informe JSON."""
+    def __init__(self, repeticiones: int):
+        self.repeticiones = repeticiones
+        self.mediciones = []
+
+    def medir(self, prueba: str, funcion, preparar=None, filas=None, operaciones=1, repeticiones=None):
+        """
+        Ejecuta funcion(estado) varias veces y guarda los tiempos. preparar(),
+        si se indica, crea el estado de cada repetición y no se cronometra.
+        Lo que las operaciones escriben por consola se descarta.
+        """
+        tiempos = []
+        for _ in range(repeticiones or self.repeticiones):
+            with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+                estado = preparar() if preparar is not None else None
+                inicio = time.perf_counter()
+                funcion(estado)
+                tiempos.append(time.perf_counter() - inicio)
+        mediana = statistics.median(tiempos)
+        medicion = {
+            "prueba": prueba,
+            "filas": filas,
+            "operaciones": operaciones,
+            "repeticiones": len(tiempos),
+            "min_s": min(tiempos),
+            "mediana_s": mediana,
+            "max_s": max(tiempos),
+            "ops_por_s": operaciones / mediana if mediana > 0 else None,
+        }
+        self.mediciones.append(medicion)
+        tamano = f"{filas:>8} filas" if filas is not None else " " * 14
+        print(f"{prueba:<36} {tamano}  mediana {mediana * 1000:10.2f} ms  ({operaciones / mediana if mediana else 0:,.0f} ops/s)")
+        return medicion
+
+def _commit_actual():
+    """Devuelve el commit de git del código medido, si se puede averiguar."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def pruebas_inventario(resultados: Resultados, carpeta: str, filas: int):
+    """Carga, guardado, altas, bajas, stock bajo, importación y exportación con un catálogo de 'filas' filas."""
+    from almacenamiento import AlmacenamientoCSV, AlmacenamientoFeather, PYARROW_DISPONIBLE
+    from diario import Diario
+    from models import Inventario
+    from log import registro_por_lotes
+    from intercambio import leer_por_bloques, exportar_dataframe
+    from tareas import Tarea
+
+    carpeta = os.path.join(carpeta, f"inventario_{filas}")
+    os.makedirs(carpeta, exist_ok=True)
+    df = catalogo_sintetico(filas)
+    ruta_csv = os.path.join(carpeta, "inventario.csv")
+    ruta_feather = os.path.join(carpeta, "inventario.feather")
+    AlmacenamientoCSV(ruta_csv).guardar(df)
+    if PYARROW_DISPONIBLE:
+        AlmacenamientoFeather(ruta_feather).guardar(df)
+        principal = lambda: AlmacenamientoFeather(ruta_feather)
+    else:
+        principal = lambda: AlmacenamientoCSV(ruta_csv)
+
+    def nuevo_inventario():
+        """Inventario recién cargado del archivo principal, con un diario vacío."""
+        diario = Diario(os.path.join(carpeta, "bench.diario"))
+        diario.vaciar()
+        return Inventario(usuario_actual="benchmark", almacenamiento=principal(), diario=diario)
+
+    resultados.medir("inventario.cargar_csv", filas=filas,
+                     funcion=lambda _: Inventario(almacenamiento=AlmacenamientoCSV(ruta_csv),
+                                                  diario=Diario(os.path.join(carpeta, "vacio.diario"))))
+    if PYARROW_DISPONIBLE:
+        resultados.medir("inventario.cargar_feather", filas=filas, funcion=lambda _: nuevo_inventario())
+
+    # Guardar: reescritura completa y guardado incremental en el diario
+    resultados.medir("inventario.compactar", filas=filas, preparar=nuevo_inventario,
+                     funcion=lambda inv: inv.compactar())
+
+    cambios = min(OPERACIONES, filas)
+    def con_cambios():
+        inv = nuevo_inventario()
+        with registro_por_lotes():
+            for i in range(0, cambios):
+                inv.agregar_o_actualizar_producto(f"BAT{i:07d}", "Batería modificada", i % 40)
+        return inv
+    resultados.medir("inventario.guardar_diario", filas=filas, operaciones=cambios, preparar=con_cambios,
+                     funcion=lambda inv: inv.guardar_datos())
+
+    # Altas y cambios individuales (la mitad productos nuevos), como desde el formulario
+    def altas(inv):
+        with registro_por_lotes():
+            for i in range(OPERACIONES):
+                codigo = f"BAT{i:07d}" if i % 2 else f"NUEVO{i:07d}"
+                inv.agregar_o_actualizar_producto(codigo, "Batería de prueba", i % 100)
+    resultados.medir("inventario.agregar_o_actualizar", filas=filas, operaciones=OPERACIONES,
+                     preparar=nuevo_inventario, funcion=altas)
+
+    def bajas(inv):
+        with registro_por_lotes():
+            for i in range(cambios):
+                inv.eliminar_producto(f"BAT{i:07d}")
+    resultados.medir("inventario.eliminar_producto", filas=filas, operaciones=cambios,
+                     preparar=nuevo_inventario, funcion=bajas)
+
+    # Stock bajo: la primera consulta construye el índice, las siguientes lo reutilizan
+    resultados.medir("inventario.stock_bajo_primera", filas=filas, preparar=nuevo_inventario,
+                     funcion=lambda inv: inv.obtener_dataframe_stock_bajo(50))
+    def stock_repetido(inv):
+        for limite in range(10, 110, 10):
+            inv.obtener_dataframe_stock_bajo(limite)
+    def con_indice():
+        inv = nuevo_inventario()
+        inv.obtener_dataframe_stock_bajo(50)
+        return inv
+    resultados.medir("inventario.stock_bajo_repetida", filas=filas, operaciones=10,
+                     preparar=con_indice, funcion=stock_repetido)
+
+    # Exportar e importar: la mitad de las filas del archivo ya existen con otra cantidad
+    tarea = Tarea("benchmark", lambda t: None)
+    importacion = df.copy()
+    importacion['codigo'] = [f"BAT{i:07d}" for i in range(filas // 2, filas // 2 + filas)]
+    importacion['cantidad'] = (importacion['cantidad'] + 1) % 500
+    formatos = ["csv"] + (["xlsx"] if filas <= MAX_FILAS_EXCEL else [])
+    for formato in formatos:
+        ruta = os.path.join(carpeta, f"importacion.{formato}")
+        resultados.medir(f"exportar.{formato}", filas=filas,
+                         funcion=lambda _, ruta=ruta: exportar_dataframe(tarea, importacion, ruta))
+        def importar(inv, ruta=ruta):
+            for bloque in leer_por_bloques(ruta):
+                inv.merge_dataframe(bloque)
+        resultados.medir(f"importar.{formato}", filas=filas, preparar=nuevo_inventario, funcion=importar)
+
+def pruebas_historial(resultados: Resultados):
+    """Rendimiento de log_change, de una en una y agrupadas en lotes."""
+    from log import log_change, registro_por_lotes, flush_history
+
+    def sueltas(_):
+        for i in range(OPERACIONES):
+            log_change("benchmark", "Prueba", f"Entrada {i}")
+    resultados.medir("log.log_change", operaciones=OPERACIONES, funcion=sueltas)
+
+    agrupadas = OPERACIONES * 100
+    def por_lotes(_):
+        with registro_por_lotes():
+            for i in range(agrupadas):
+                log_change("benchmark", "Prueba por lotes", f"Entrada {i}")
+    resultados.medir("log.log_change_por_lotes", operaciones=agrupadas, funcion=por_lotes)
+    flush_history()
+
+def pruebas_configuracion(resultados: Resultados):
+    """Latencia de get_setting con la configuración ya en memoria."""
+    from config import get_setting, load_settings
+    load_settings()
+    def lecturas(_):
+        for _ in range(LECTURAS_CONFIGURACION):
+            get_setting("stock_low_limit")
+    resultados.medir("config.get_setting", operaciones=LECTURAS_CONFIGURACION, funcion=lecturas)
+
+def pruebas_usuarios(resultados: Resultados):
+    """Operaciones de GestionUsuarios. Las de contraseña dependen de 'bcrypt_rounds'."""
+    from usuarios import GestionUsuarios, ADMIN_USER, ADMIN_PASSWORD
+    gestor = GestionUsuarios(usuario_actual="benchmark")
+    contador = iter(range(10 ** 9))
+
+    resultados.medir("usuarios.verificar_usuario", funcion=lambda _: gestor.verificar_usuario(ADMIN_USER, ADMIN_PASSWORD))
+    resultados.medir("usuarios.crear_usuario",
+                     funcion=lambda _: gestor.crear_usuario(f"bench{next(contador)}", "Usuario de prueba", "clave"))
+    def listados(_):
+        for _ in range(OPERACIONES):
+            gestor.obtener_todos_los_usuarios()
+    resultados.medir("usuarios.obtener_todos_los_usuarios", operaciones=OPERACIONES, funcion=listados)
+
+def comparar(actual: dict, anterior: dict, umbral: float = UMBRAL_REGRESION):
+    """Muestra la variación de la mediana de cada prueba respecto a otra ejecución."""
+    previas = {(m["prueba"], m["filas"]): m for m in anterior.get("resultados", [])}
+    print(f"\nComparación con {anterior.get('commit') or 'la ejecución anterior'} ({anterior.get('fecha')}):")
+    regresiones = 0
+    for medicion in actual["resultados"]:
+        previa = previas.get((medicion["prueba"], medicion["filas"]))
+        if not previa or not previa["mediana_s"]:
+            continue
+        variacion = medicion["mediana_s"] / previa["mediana_s"] - 1
+        marca = ""
+        if variacion > umbral:
+            marca = "  <-- más lento"
+            regresiones += 1
+        elif variacion < -umbral:
+            marca = "  (más rápido)"
+        filas = medicion["filas"] if medicion["filas"] is not None else ""
+        print(f"{medicion['prueba']:<36} {filas:>8}  {variacion:+7.1%}{marca}")
+    return regresiones
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pruebas de rendimiento del sistema de inventario.")
+    parser.add_argument("--filas", type=int, nargs="+", default=FILAS_POR_DEFECTO,
+                        help="Tamaños de catálogo a probar (por defecto: 1000 10000 100000).")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones de cada prueba (se usa la mediana).")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados.")
+    parser.add_argument("--comparar", help="Resultados JSON de otra ejecución con los que comparar.")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION,
+                        help="Variación a partir de la cual una prueba se considera más lenta (0.2 = 20%%).")
+    parser.add_argument("--sin-usuarios", action="store_true",
+                        help="Omitir las pruebas de usuarios (bcrypt hace que sean las más lentas).")
+    args = parser.parse_args(argv)
+
+    carpeta = tempfile.mkdtemp(prefix="benchmark_inventario_")
+    _preparar_entorno(carpeta)
+    try:
+        import pandas as pd
+        from config import get_setting
+
+        resultados = Resultados(args.repeticiones)
+        for filas in args.filas:
+            pruebas_inventario(resultados, carpeta, filas)
+        pruebas_historial(resultados)
+        pruebas_configuracion(resultados)
+        if not args.sin_usuarios:
+            pruebas_usuarios(resultados)
+
+        informe = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "pandas": pd.__version__,
+            "bcrypt_rounds": get_setting("bcrypt_rounds"),
+            "repeticiones": args.repeticiones,
+            "resultados": resultados.mediciones,
+        }
+    finally:
+        from log import flush_history
+        flush_history()
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en '{args.salida}'.")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            regresiones = comparar(informe, json.load(f), args.umbral)
+        if regresiones:
+            print(f"\n{regresiones} prueba(s) más lentas que en la ejecución anterior.")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
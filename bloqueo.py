@@ -0,0 +1,125 @@
+# bloqueo.py
+
+import os
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Segundos máximos de espera por un bloqueo que tiene otro proceso
+ESPERA_MAX_S = 30
+# Pausa entre intentos mientras el bloqueo está ocupado
+PAUSA_REINTENTO_S = 0.05
+
+class BloqueoOcupado(Exception):
+    """Otro proceso mantuvo el bloqueo más tiempo del permitido."""
+    pass
+
+def firma_archivo(ruta: str):
+    """
+    Devuelve (mtime en ns, tamaño, inodo) del archivo, o None si no existe.
+    Comparar firmas es una forma barata de saber si otro proceso lo cambió o
+    lo sustituyó (el reemplazo atómico cambia el inodo) sin volver a leerlo.
+    """
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size, estado.st_ino)
+
+class BloqueoArchivo:
+    """
+    Bloqueo exclusivo entre procesos sobre un archivo auxiliar '<ruta>.lock'
+    (fcntl en Linux/macOS, msvcrt en Windows). Es consultivo: solo protege de
+    los procesos que también lo toman. Es reentrante dentro del proceso, así
+    que una operación que ya lo tiene puede llamar a otra que también lo pide.
+    Se usa como context manager.
+    """
+    def __init__(self, ruta: str, espera_max: float = ESPERA_MAX_S):
+        self.ruta = ruta + ".lock"
+        self.espera_max = espera_max
+        self._cerrojo = threading.RLock()
+        self._profundidad = 0
+        self._archivo = None
+
+    def _intentar(self) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._archivo.seek(0)
+                msvcrt.locking(self._archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def _liberar(self):
+        if fcntl is not None:
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+        else:
+            self._archivo.seek(0)
+            msvcrt.locking(self._archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def adquirir(self, espera_max: float = None):
+        """
+        Toma el bloqueo, esperando como mucho espera_max segundos (por defecto,
+        los del constructor; 0 para no esperar). Lanza BloqueoOcupado si no lo consigue.
+        """
+        espera = self.espera_max if espera_max is None else espera_max
+        obtenido = self._cerrojo.acquire(timeout=espera) if espera > 0 else self._cerrojo.acquire(blocking=False)
+        if not obtenido:
+            raise BloqueoOcupado(f"El bloqueo de '{self.ruta}' está ocupado por otro hilo.")
+        if self._profundidad:
+            self._profundidad += 1
+            return
+        try:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            self._archivo = open(self.ruta, 'a+b')
+            limite = time.monotonic() + espera
+            while not self._intentar():
+                if time.monotonic() >= limite:
+                    raise BloqueoOcupado(f"Otro proceso tiene bloqueado '{self.ruta}' desde hace más de "
+                                         f"{espera:.0f} s.")
+                time.sleep(PAUSA_REINTENTO_S)
+        except BaseException:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+            self._cerrojo.release()
+            raise
+        self._profundidad = 1
+
+    def liberar(self):
+        self._profundidad -= 1
+        if not self._profundidad:
+            try:
+                self._liberar()
+            finally:
+                self._archivo.close()
+                self._archivo = None
+        self._cerrojo.release()
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.liberar()
+
+# Un bloqueo por archivo en todo el proceso: fcntl.flock bloquea entre sí dos
+# aperturas del mismo archivo aunque sean del mismo proceso.
+_bloqueos = {}
+_cerrojo_bloqueos = threading.Lock()
+
+def obtener_bloqueo(ruta: str) -> BloqueoArchivo:
+    """Devuelve el BloqueoArchivo del proceso para la ruta indicada, creándolo la primera vez."""
+    clave = os.path.abspath(ruta)
+    with _cerrojo_bloqueos:
+        bloqueo = _bloqueos.get(clave)
+        if bloqueo is None:
+            bloqueo = _bloqueos[clave] = BloqueoArchivo(clave)
+        return bloqueo
@@ -0,0 +1,76 @@
+# busqueda.py
+
+import numpy as np
+
+# Filas examinadas por cada paso de una búsqueda incremental
+FILAS_POR_PASO = 25000
+
+class BuscadorInventario:
+    """
+    Motor de búsqueda por código o descripción sobre un Inventario.
+
+    Guarda en memoria el texto en minúsculas de cada producto (se recalcula solo
+    cuando cambia la versión del inventario) y, si el término nuevo amplía el
+    anterior, busca únicamente dentro de los resultados previos.
+    """
+    def __init__(self, inventario):
+        self.inventario = inventario
+        self._version = None
+        self._datos = None
+        self._texto = None              # Serie "codigo\x00descripcion" en minúsculas
+        self._ultimo_termino = ""
+        self._ultimas_posiciones = None
+
+    def _preparar(self):
+        """Recalcula las columnas en minúsculas si el inventario cambió desde la última búsqueda."""
+        datos = self.inventario.obtener_dataframe()
+        if self._texto is None or self._version != self.inventario.version or self._datos is not datos:
+            # El separador \x00 evita coincidencias que crucen de una columna a otra
+            self._texto = (datos['codigo'].astype(str) + "\x00" +
+                           datos['descripcion'].fillna("").astype(str)).str.lower().reset_index(drop=True)
+            self._version = self.inventario.version
+            self._datos = datos
+            self._ultimo_termino = ""
+            self._ultimas_posiciones = None
+        return datos
+
+    def buscar_incremental(self, termino: str, filas_por_paso: int = FILAS_POR_PASO):
+        """
+        Generador que realiza la búsqueda en pasos de como mucho filas_por_paso filas,
+        cediendo el control entre paso y paso para no bloquear la interfaz.
+        Al agotarse devuelve (StopIteration.value) el DataFrame con los resultados.
+        """
+        termino = termino.lower().strip()
+        datos = self._preparar()
+        if not termino:
+            self._ultimo_termino = ""
+            self._ultimas_posiciones = None
+            return datos
+
+        if self._ultimo_termino and termino.startswith(self._ultimo_termino):
+            candidatos = self._ultimas_posiciones
+        else:
+            candidatos = np.arange(len(self._texto))
+
+        encontrados = []
+        for inicio in range(0, len(candidatos), filas_por_paso):
+            bloque = candidatos[inicio:inicio + filas_por_paso]
+            coincide = self._texto.iloc[bloque].str.contains(termino, regex=False).to_numpy(dtype=bool)
+            encontrados.append(bloque[coincide])
+            if inicio + filas_por_paso < len(candidatos):
+                yield
+
+        posiciones = np.concatenate(encontrados) if encontrados else np.empty(0, dtype=np.intp)
+        # Solo una búsqueda completada sirve de base para acotar la siguiente
+        self._ultimo_termino = termino
+        self._ultimas_posiciones = posiciones
+        return datos.iloc[posiciones]
+
+    def buscar(self, termino: str):
+        """Devuelve de una vez el DataFrame con los productos cuyo código o descripción contienen el término."""
+        busqueda = self.buscar_incremental(termino)
+        while True:
+            try:
+                next(busqueda)
+            except StopIteration as fin:
+                return fin.value
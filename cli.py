@@ -0,0 +1,199 @@
+# cli.py
+"""
+Operaciones del inventario desde la línea de comandos, sin interfaz gráfica.
+Pensado para tareas programadas (cron, Programador de tareas de Windows),
+como la sincronización nocturna con los archivos de los proveedores.
+
+    python cli.py importar proveedor1.xlsx proveedor2.csv
+    python cli.py exportar inventario.xlsx
+    python cli.py alertas --limite 20 --salida alertas.xlsx
+    python cli.py resumen
+    python cli.py compactar
+
+Código de salida: 0 si todo fue bien, 1 si hubo un error, 2 si un archivo no
+tiene el formato esperado, 3 si otro puesto cambió a la vez algunos de los
+productos importados (se conservan sus valores; ver --conflictos).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Usuario con el que se registran los cambios en el historial
+USUARIO_POR_DEFECTO = "Sistema (CLI)"
+
+def _inventario(usuario: str):
+    """Carga el inventario con el almacenamiento configurado, como lo haría la aplicación."""
+    from models import obtener_inventario_compartido
+    inventario = obtener_inventario_compartido()
+    inventario.usuario_actual = usuario
+    return inventario
+
+def _tarea(nombre: str, mostrar_progreso: bool):
+    """Tarea para las funciones de intercambio; opcionalmente muestra su progreso en stderr."""
+    from tareas import Tarea
+
+    class TareaConsola(Tarea):
+        def informar_progreso(self, fraccion=None, mensaje=None):
+            super().informar_progreso(fraccion, mensaje)
+            if mostrar_progreso and self.mensaje:
+                porcentaje = f"{self.progreso:4.0%} " if self.progreso is not None else ""
+                print(f"\r{porcentaje}{self.mensaje:<60}", end="", file=sys.stderr, flush=True)
+
+    return TareaConsola(nombre, lambda tarea: None)
+
+def _guardar(inventario, conservar_propios: bool) -> int:
+    """
+    Guarda el inventario. Si otro puesto cambió a la vez los mismos productos,
+    conserva los valores propios o los ajenos según se indique, los lista y
+    vuelve a guardar. Devuelve el número de conflictos.
+    """
+    from models import ConflictoEdicion, describir_valor
+    try:
+        inventario.guardar_datos()
+        return 0
+    except ConflictoEdicion as e:
+        conflictos = e.conflictos
+    print(f"{len(conflictos)} productos se cambiaron también desde otro puesto; se conservan los valores "
+          f"{'importados' if conservar_propios else 'del otro puesto'}:", file=sys.stderr)
+    for codigo, ajeno, local in conflictos:
+        inventario.resolver_conflicto(codigo, conservar_propios)
+        print(f"  {codigo}: otro puesto {describir_valor(ajeno)}, importado {describir_valor(local)}", file=sys.stderr)
+    inventario.guardar_datos()
+    return len(conflictos)
+
+def comando_importar(args) -> int:
+    """Fusiona uno o varios archivos Excel/CSV en el inventario, en el orden indicado."""
+    from intercambio import leer_por_bloques
+    from log import registro_por_lotes
+
+    inventario = _inventario(args.usuario)
+    tarea = _tarea("Importando", args.progreso)
+    total = {"agregados": 0, "actualizados": 0, "sin_cambios": 0}
+    conflictos = 0
+    inicio = time.perf_counter()
+    try:
+        # Un solo lote de historial y un solo guardado para todos los archivos
+        with registro_por_lotes():
+            for ruta in args.archivos:
+                filas = 0
+                for bloque in leer_por_bloques(ruta, args.filas_por_bloque, tarea.informar_progreso):
+                    filas += len(bloque)
+                    for clave, valor in inventario.merge_dataframe(bloque).items():
+                        total[clave] += valor
+                if args.progreso:
+                    print(file=sys.stderr)
+                print(f"{ruta}: {filas} filas leídas.")
+    finally:
+        # Lo ya fusionado se guarda aunque un archivo posterior falle
+        if total["agregados"] or total["actualizados"]:
+            conflictos = _guardar(inventario, args.conflictos == "propios")
+    print(f"Importación completa en {time.perf_counter() - inicio:.1f} s. "
+          f"Agregados: {total['agregados']}, actualizados: {total['actualizados']}, "
+          f"sin cambios: {total['sin_cambios']}.")
+    return 3 if conflictos else 0
+
+def comando_exportar(args) -> int:
+    """Exporta el inventario completo a Excel o CSV."""
+    from intercambio import exportar_dataframe
+    inventario = _inventario(args.usuario)
+    ruta = exportar_dataframe(_tarea("Exportando", args.progreso), inventario.obtener_dataframe(), args.destino)
+    if args.progreso:
+        print(file=sys.stderr)
+    print(f"Inventario exportado a '{ruta}' ({len(inventario.obtener_dataframe())} productos).")
+    return 0
+
+def comando_alertas(args) -> int:
+    """Muestra o exporta los productos con stock bajo."""
+    from config import get_setting
+    limite = args.limite if args.limite is not None else get_setting("stock_low_limit")
+    inventario = _inventario(args.usuario)
+    df = inventario.obtener_dataframe_stock_bajo(limite)
+    if args.salida:
+        from intercambio import exportar_dataframe
+        exportar_dataframe(_tarea("Exportando alertas", args.progreso), df, args.salida)
+        if args.progreso:
+            print(file=sys.stderr)
+        print(f"{len(df)} productos con menos de {limite} unidades exportados a '{args.salida}'.")
+        return 0
+    print(f"{len(df)} productos con menos de {limite} unidades.")
+    if len(df):
+        print(df.to_string(index=False, max_rows=args.max_filas))
+    return 0
+
+def comando_resumen(args) -> int:
+    """Muestra los totales del inventario."""
+    from config import get_setting
+    limite = get_setting("stock_low_limit")
+    resumen = _inventario(args.usuario).obtener_resumen(limite)
+    print(f"Total de productos únicos: {resumen['total_productos']}")
+    print(f"Total de unidades en stock: {resumen['total_unidades']}")
+    print(f"Productos con stock bajo (< {limite} unidades): {resumen['productos_stock_bajo']}")
+    return 0
+
+def comando_compactar(args) -> int:
+    """Vuelca el diario de cambios en el archivo principal del inventario."""
+    inventario = _inventario(args.usuario)
+    if not hasattr(inventario, "compactar"):
+        print("El almacenamiento configurado no usa diario de cambios; no hay nada que compactar.")
+        return 0
+    inventario.compactar()
+    print("Inventario compactado.")
+    return 0
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Operaciones del inventario sin interfaz gráfica.")
+    parser.add_argument("--datos", help="Carpeta de datos a usar (por defecto, la de la aplicación).")
+    parser.add_argument("--usuario", default=USUARIO_POR_DEFECTO, help="Usuario con el que se registran los cambios en el historial.")
+    parser.add_argument("--progreso", action="store_true", help="Mostrar el progreso de la lectura y escritura de archivos.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    importar = comandos.add_parser("importar", help="Fusionar uno o varios archivos Excel/CSV en el inventario.")
+    importar.add_argument("archivos", nargs="+", help="Archivos a importar; si un código se repite, gana el último archivo.")
+    importar.add_argument("--filas-por-bloque", type=int, default=None, help="Filas leídas y fusionadas de cada vez.")
+    importar.add_argument("--conflictos", choices=("ajenos", "propios"), default="ajenos",
+                          help="Valores que se conservan si otro puesto cambió a la vez los mismos productos.")
+    importar.set_defaults(funcion=comando_importar)
+
+    exportar = comandos.add_parser("exportar", help="Exportar el inventario completo a Excel (.xlsx) o CSV (.csv).")
+    exportar.add_argument("destino")
+    exportar.set_defaults(funcion=comando_exportar)
+
+    alertas = comandos.add_parser("alertas", help="Listar o exportar los productos con stock bajo.")
+    alertas.add_argument("--limite", type=int, help="Límite de stock bajo (por defecto, el de la configuración).")
+    alertas.add_argument("--salida", help="Exportar las alertas a este archivo (.xlsx o .csv) en lugar de listarlas.")
+    alertas.add_argument("--max-filas", type=int, default=100, help="Filas mostradas como máximo al listar.")
+    alertas.set_defaults(funcion=comando_alertas)
+
+    resumen = comandos.add_parser("resumen", help="Mostrar los totales del inventario.")
+    resumen.set_defaults(funcion=comando_resumen)
+
+    compactar = comandos.add_parser("compactar", help="Volcar el diario de cambios en el archivo del inventario.")
+    compactar.set_defaults(funcion=comando_compactar)
+    return parser
+
+def main(argv=None) -> int:
+    args = crear_parser().parse_args(argv)
+    if args.datos:
+        # Debe fijarse antes de importar los módulos de la aplicación (ver utils.DATA_DIR_ENV)
+        os.environ["INVENTARIO_DATA_DIR"] = os.path.abspath(args.datos)
+    if getattr(args, "filas_por_bloque", 0) is None:
+        from intercambio import FILAS_POR_BLOQUE_IMPORTACION
+        args.filas_por_bloque = FILAS_POR_BLOQUE_IMPORTACION
+
+    from intercambio import FormatoInvalido
+    try:
+        return args.funcion(args)
+    except FormatoInvalido as e:
+        print(f"Error de formato: {e}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        from log import flush_history
+        flush_history()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,9 @@
 
 import json
 import os
+import threading
 from utils import get_data_path
+from rendimiento import medido
 
 # Nombre del archivo de configuración
 CONFIG_FILE = os.path.join(get_data_path(), "config.json")
@@ -10,50 +12,154 @@ CONFIG_FILE = os.path.join(get_data_path(), "config.json")
 # Valores de configuración por defecto
 DEFAULT_SETTINGS = {
     "stock_low_limit": 50,
-    "theme": "superhero"
+    "theme": "superhero",
+    "inventario_backend": "archivo",  # "archivo" (Feather/CSV), "sqlite" o "remoto" (servidor.py)
+    "bcrypt_rounds": 12,  # Factor de trabajo de bcrypt para las contraseñas
+    "historial_max_entradas": 500000,  # Entradas en historial.db antes de archivar (0 = sin límite)
+    "historial_max_dias": 365,  # Días que se conservan en historial.db antes de archivar (0 = sin límite)
+    "precargar_en_segundo_plano": True,  # Cargar el inventario en segundo plano tras el login
+    "medir_rendimiento": False,  # Medir los tiempos de las operaciones (Herramientas > Rendimiento)
+    "servidor_url": "http://127.0.0.1:8765",  # Servidor usado por el backend "remoto"
+    "servidor_token": "",  # Token de acceso del servidor (vacío = sin token)
+    "intervalo_comprobacion_s": 5  # Cada cuánto se buscan cambios hechos por otros puestos (o procesos)
 }
 
-def load_settings():
-    """Carga la configuración desde el archivo JSON.
-    Si el archivo no existe, crea uno con los valores por defecto.
-    """
+# Copia en memoria de la configuración y mtime del archivo del que se leyó
+_cache = None
+_cache_mtime = None
+# Callbacks avisados cuando cambia algún valor
+_suscriptores = []
+# Cambios leídos del archivo desde otro hilo, pendientes de avisar en el principal
+_avisos_pendientes = {}
+_cerrojo_avisos = threading.Lock()
+
+def _mtime_archivo():
+    """Devuelve el mtime del archivo de configuración, o None si no existe."""
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+@medido("config.leer_archivo")
+def _leer_archivo():
+    """Lee y valida el archivo JSON, recreándolo con los valores por defecto si hace falta."""
     if not os.path.exists(CONFIG_FILE):
         # Si no existe, crearlo con los valores por defecto
-        save_settings(DEFAULT_SETTINGS)
+        _escribir_archivo(DEFAULT_SETTINGS)
         return DEFAULT_SETTINGS.copy()
-    
+
     try:
         with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
             settings = json.load(f)
-        
+
         # Asegurarse de que todas las claves por defecto existan
         # (útil si añadimos nuevas opciones en el futuro)
         for key, value in DEFAULT_SETTINGS.items():
             if key not in settings:
                 settings[key] = value
-        
+
         return settings
     except (json.JSONDecodeError, IOError):
         # Si el archivo está corrupto o hay error, volver a los valores por defecto
-        save_settings(DEFAULT_SETTINGS)
+        _escribir_archivo(DEFAULT_SETTINGS)
         return DEFAULT_SETTINGS.copy()
 
+def _actualizar_cache(settings, avisar_aqui=True):
+    """
+    Reemplaza la copia en memoria y avisa de las claves que han cambiado.
+    Con avisar_aqui=False (cambio hecho por otro proceso y detectado desde un
+    hilo secundario) los avisos esperan a la próxima lectura del hilo principal,
+    porque los suscriptores de la interfaz solo pueden tocar Tk desde ese hilo.
+    """
+    global _cache, _cache_mtime
+    anterior = _cache
+    _cache = dict(settings)
+    _cache_mtime = _mtime_archivo()
+    if anterior is None:
+        return
+    cambios = {key: value for key, value in _cache.items() if anterior.get(key) != value}
+    if not avisar_aqui:
+        with _cerrojo_avisos:
+            _avisos_pendientes.update(cambios)
+        return
+    for key, value in cambios.items():
+        _notificar(key, value)
+
+def _es_hilo_principal() -> bool:
+    return threading.current_thread() is threading.main_thread()
+
+def _entregar_avisos_pendientes():
+    """Avisa, desde el hilo principal, de los cambios que detectó otro hilo."""
+    with _cerrojo_avisos:
+        cambios = dict(_avisos_pendientes)
+        _avisos_pendientes.clear()
+    for key, value in cambios.items():
+        _notificar(key, value)
+
+def _obtener_cache():
+    """Devuelve la configuración en memoria, releyendo el archivo solo si cambió en disco."""
+    principal = _es_hilo_principal()
+    if _cache is None or _mtime_archivo() != _cache_mtime:
+        _actualizar_cache(_leer_archivo(), avisar_aqui=principal)
+    if principal and _avisos_pendientes:
+        _entregar_avisos_pendientes()
+    return _cache
+
+@medido("config.load_settings")
+def load_settings():
+    """Carga la configuración desde el archivo JSON.
+    Si el archivo no existe, crea uno con los valores por defecto.
+    Mientras el archivo no cambie en disco se sirve una copia en memoria.
+    """
+    return _obtener_cache().copy()
+
 def save_settings(settings_to_save):
-    """Guarda el diccionario de configuración en el archivo JSON."""
+    """
+    Guarda el diccionario de configuración en el archivo JSON. Los suscriptores
+    se avisan en el hilo que llama (en la aplicación, el de Tk).
+    """
+    if not _escribir_archivo(settings_to_save):
+        return False
+    _actualizar_cache(settings_to_save)
+    return True
+
+def _escribir_archivo(settings) -> bool:
+    """Escribe el archivo JSON sin tocar la copia en memoria ni avisar a nadie."""
     try:
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(settings_to_save, f, indent=4)
-        return True
+            json.dump(settings, f, indent=4)
     except IOError:
         return False
+    return True
 
 def get_setting(key):
     """Obtiene un valor específico de la configuración."""
-    settings = load_settings()
-    return settings.get(key)
+    return _obtener_cache().get(key)
 
 def update_setting(key, value):
     """Actualiza un valor específico y lo guarda."""
     settings = load_settings()
     settings[key] = value
-    return save_settings(settings)
\ No newline at end of file
+    return save_settings(settings)
+
+def suscribir(callback):
+    """
+    Registra un callback que se llamará como callback(clave, valor) cuando cambie
+    un ajuste: en el hilo que llamó a save_settings o, si el cambio lo hizo otro
+    proceso, en el hilo principal la próxima vez que lea la configuración.
+    """
+    if callback not in _suscriptores:
+        _suscriptores.append(callback)
+
+def cancelar_suscripcion(callback):
+    """Deja de notificar al callback indicado."""
+    if callback in _suscriptores:
+        _suscriptores.remove(callback)
+
+def _notificar(key, value):
+    """Avisa a todos los suscriptores del cambio de un ajuste."""
+    for callback in list(_suscriptores):
+        try:
+            callback(key, value)
+        except Exception as e:
+            print(f"Error al notificar un cambio de configuración: {e}")
@@ -0,0 +1,89 @@
+# db.py
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Conexiones máximas abiertas por cada base de datos
+TAMANO_POOL = 4
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite reutilizables y seguras entre hilos.
+    Cada conexión se abre una sola vez en modo WAL y conserva su caché de
+    sentencias preparadas, de modo que las consultas repetidas no vuelven a
+    pagar la conexión ni la compilación del SQL.
+    """
+    def __init__(self, ruta: str, tamano: int = TAMANO_POOL, inicializar=None):
+        self.ruta = ruta
+        self.tamano = tamano
+        self._inicializar = inicializar   # Crea el esquema; se ejecuta una vez por proceso
+        self._libres = queue.LifoQueue()
+        self._todas = []
+        self._cerrojo = threading.Lock()
+
+    def _nueva_conexion(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.ruta, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._todas and self._inicializar is not None:
+            with conn:
+                self._inicializar(conn)
+        return conn
+
+    def _obtener(self) -> sqlite3.Connection:
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._cerrojo:
+            if len(self._todas) < self.tamano:
+                conn = self._nueva_conexion()
+                self._todas.append(conn)
+                return conn
+        # Pool lleno: esperar a que otro hilo devuelva una conexión
+        return self._libres.get()
+
+    @contextmanager
+    def conexion(self):
+        """
+        Presta una conexión del pool durante el bloque with.
+
+        Ejemplo:
+            with pool.conexion() as conn:
+                with conn:  # transacción
+                    conn.execute(...)
+        """
+        conn = self._obtener()
+        try:
+            yield conn
+        finally:
+            self._libres.put(conn)
+
+    def cerrar(self):
+        """Cierra todas las conexiones del pool."""
+        with self._cerrojo:
+            for conn in self._todas:
+                conn.close()
+            self._todas.clear()
+            self._libres = queue.LifoQueue()
+
+# Un pool por archivo de base de datos para todo el proceso
+_pools = {}
+_cerrojo_pools = threading.Lock()
+
+def obtener_pool(ruta: str, inicializar=None) -> PoolConexiones:
+    """
+    Devuelve el pool de conexiones del proceso para la base de datos indicada,
+    creándolo la primera vez. inicializar(conn) se ejecuta solo al abrir la
+    primera conexión (útil para CREATE TABLE IF NOT EXISTS).
+    """
+    ruta = os.path.abspath(ruta)
+    with _cerrojo_pools:
+        pool = _pools.get(ruta)
+        if pool is None:
+            pool = _pools[ruta] = PoolConexiones(ruta, inicializar=inicializar)
+        return pool
@@ -0,0 +1,141 @@
+# dialogo_rendimiento.py
+
+import ttkbootstrap as ttk
+from tkinter import messagebox, filedialog
+from datetime import datetime
+from config import get_setting, update_setting
+import rendimiento
+from tabla_virtual import TablaVirtual
+
+# Cada cuánto se refrescan las tablas mientras el diálogo está abierto
+INTERVALO_REFRESCO_MS = 1000
+
+class DialogoRendimiento(ttk.Toplevel):
+    """
+    Diálogo de administración con los tiempos medidos de las operaciones
+    principales (carga y guardado del inventario, llenado de tablas,
+    búsquedas, historial, configuración, usuarios y bcrypt) y la lista de
+    operaciones lentas recientes. No es modal, para poder dejarlo abierto
+    mientras se reproduce el problema.
+    """
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("⏱️ Rendimiento")
+        self.geometry("850x600")
+        self.resizable(True, True)
+        self.transient(parent)
+
+        self._refresco = None
+
+        self.crear_widgets()
+        self.actualizar()
+        self.centrar_ventana()
+
+    def centrar_ventana(self):
+        """Centra el diálogo en la pantalla."""
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'{width}x{height}+{x}+{y}')
+
+    def destroy(self):
+        if self._refresco is not None:
+            self.after_cancel(self._refresco)
+            self._refresco = None
+        super().destroy()
+
+    def crear_widgets(self):
+        # Botones y activación
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill="x", padx=10, pady=5)
+
+        self.activo = ttk.BooleanVar(value=bool(get_setting("medir_rendimiento")))
+        ttk.Checkbutton(button_frame, text="Medir rendimiento", variable=self.activo,
+                        command=self._cambiar_activacion, bootstyle="round-toggle").pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Exportar...", command=self.exportar, bootstyle="SUCCESS").pack(side="right", padx=5)
+        ttk.Button(button_frame, text="Reiniciar", command=self.reiniciar, bootstyle="WARNING").pack(side="right", padx=5)
+
+        # Tiempos por operación
+        operaciones_frame = ttk.Labelframe(self, text="Operaciones (ordenadas por tiempo total)", padding=5)
+        operaciones_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tabla_operaciones = TablaVirtual(operaciones_frame, ('nombre', 'llamadas', 'total', 'media', 'maximo', 'ultima'),
+                                              bootstyle="PRIMARY",
+                                              mensaje_vacio="Sin mediciones. Activa la medición y usa la aplicación.")
+        self.tabla_operaciones.pack(fill="both", expand=True)
+        tree = self.tabla_operaciones.tree
+        tree.column("nombre", anchor="w", width=260)
+        for columna, texto in (("llamadas", "Llamadas"), ("total", "Total (ms)"), ("media", "Media (ms)"),
+                               ("maximo", "Máximo (ms)"), ("ultima", "Última (ms)")):
+            tree.column(columna, anchor="e", width=100, stretch=False)
+            tree.heading(columna, text=texto, anchor="e")
+        tree.heading("nombre", text="Operación", anchor="w")
+
+        # Operaciones lentas recientes
+        lentas_frame = ttk.Labelframe(self, text=f"Operaciones lentas recientes (≥ {rendimiento.UMBRAL_LENTA_S * 1000:.0f} ms)",
+                                      padding=5)
+        lentas_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tabla_lentas = TablaVirtual(lentas_frame, ('fecha', 'nombre', 'duracion'), bootstyle="WARNING",
+                                         mensaje_vacio="No se han registrado operaciones lentas.")
+        self.tabla_lentas.pack(fill="both", expand=True)
+        tree = self.tabla_lentas.tree
+        tree.column("fecha", anchor="center", width=150, stretch=False)
+        tree.column("nombre", anchor="w", width=300)
+        tree.column("duracion", anchor="e", width=120, stretch=False)
+        tree.heading("fecha", text="Fecha", anchor="center")
+        tree.heading("nombre", text="Operación", anchor="w")
+        tree.heading("duracion", text="Duración (ms)", anchor="e")
+
+        self.contadores_label = ttk.Label(self, text="", wraplength=800, justify="left")
+        self.contadores_label.pack(fill="x", padx=10, pady=(0, 10))
+
+    def _cambiar_activacion(self):
+        # La suscripción de rendimiento a la configuración activa o desactiva las mediciones
+        if not update_setting("medir_rendimiento", self.activo.get()):
+            messagebox.showerror("Error", "No se pudo guardar la configuración.", parent=self)
+
+    def actualizar(self):
+        """Muestra las mediciones actuales y programa el siguiente refresco."""
+        datos = rendimiento.instantanea()
+        operaciones = datos["operaciones"]
+        self.tabla_operaciones.cargar([
+            [o["nombre"] for o in operaciones],
+            [o["llamadas"] for o in operaciones],
+            [f"{o['total_s'] * 1000:.1f}" for o in operaciones],
+            [f"{o['media_s'] * 1000:.2f}" for o in operaciones],
+            [f"{o['max_s'] * 1000:.1f}" for o in operaciones],
+            [f"{o['ultima_s'] * 1000:.2f}" for o in operaciones],
+        ])
+        lentas = datos["lentas"]
+        self.tabla_lentas.cargar([
+            [fecha for fecha, _, _ in lentas],
+            [nombre for _, nombre, _ in lentas],
+            [f"{segundos * 1000:.0f}" for _, _, segundos in lentas],
+        ])
+        contadores = ", ".join(f"{nombre}: {valor}" for nombre, valor in sorted(datos["contadores"].items()))
+        self.contadores_label.config(text=f"Contadores: {contadores}" if contadores else "")
+        self._refresco = self.after(INTERVALO_REFRESCO_MS, self.actualizar)
+
+    def reiniciar(self):
+        rendimiento.reiniciar()
+        if self._refresco is not None:
+            self.after_cancel(self._refresco)
+        self.actualizar()
+
+    def exportar(self):
+        ruta = filedialog.asksaveasfilename(
+            parent=self,
+            title="Exportar mediciones de rendimiento",
+            defaultextension=".json",
+            initialfile=f"rendimiento_{datetime.now():%Y%m%d_%H%M%S}.json",
+            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")]
+        )
+        if not ruta:
+            return
+        try:
+            rendimiento.exportar(ruta)
+        except OSError as e:
+            messagebox.showerror("Error al Exportar", f"No se pudieron guardar las mediciones.\nError: {e}", parent=self)
+            return
+        messagebox.showinfo("Exportación Completa", f"Mediciones guardadas en:\n{ruta}", parent=self)
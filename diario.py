@@ -0,0 +1,117 @@
+# diario.py
+
+import os
+import json
+from bloqueo import firma_archivo
+
+# Entradas del diario a partir de las cuales se compacta en el archivo principal
+DIARIO_MAX_ENTRADAS = 20000
+
+class Diario:
+    """
+    Diario de cambios del inventario, de solo añadir (write-ahead log).
+    Cada línea es una operación en JSON:
+        ["u", codigo, descripcion, cantidad]   alta o actualización
+        ["d", codigo]                          baja
+    Guardar unos pocos cambios solo añade sus líneas al final del archivo, en
+    lugar de reescribir el inventario completo. Las operaciones son
+    idempotentes (fijan valores absolutos), así que volver a aplicarlas sobre
+    un archivo principal que ya las incluye no cambia el resultado.
+
+    Varios procesos pueden compartir el diario: ``posicion`` marca hasta qué
+    byte lo ha leído este proceso, y leer_nuevas() devuelve solo lo que otros
+    añadieron después.
+    """
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.entradas = 0  # Operaciones que contiene el archivo
+        self.posicion = 0  # Bytes del archivo ya leídos (o escritos) por este proceso
+
+    def existe(self) -> bool:
+        return os.path.exists(self.ruta)
+
+    def firma(self):
+        """Firma del archivo (ver bloqueo.firma_archivo), o None si no existe."""
+        return firma_archivo(self.ruta)
+
+    @staticmethod
+    def _leer_lineas(f, operaciones: list) -> int:
+        """Añade a operaciones las líneas completas y válidas de f. Devuelve los bytes que ocupan."""
+        valido = 0
+        for linea in f:
+            if not linea.endswith(b"\n"):
+                break
+            try:
+                operacion = json.loads(linea)
+            except ValueError:
+                break
+            if not isinstance(operacion, list) or not operacion or operacion[0] not in ("u", "d"):
+                break
+            operaciones.append(operacion)
+            valido += len(linea)
+        return valido
+
+    def leer(self) -> list:
+        """
+        Devuelve las operaciones guardadas, en orden. Si la última línea quedó a
+        medio escribir (cierre inesperado), se descarta y se recorta el archivo
+        para que las siguientes escrituras empiecen en una línea limpia.
+        """
+        operaciones = []
+        if not self.existe():
+            self.entradas = 0
+            self.posicion = 0
+            return operaciones
+        with open(self.ruta, 'rb') as f:
+            valido = self._leer_lineas(f, operaciones)  # Bytes con operaciones completas
+        if valido != os.path.getsize(self.ruta):
+            print(f"Advertencia: se descartó el final incompleto del diario '{self.ruta}'.")
+            with open(self.ruta, 'r+b') as f:
+                f.truncate(valido)
+        self.entradas = len(operaciones)
+        self.posicion = valido
+        return operaciones
+
+    def leer_nuevas(self):
+        """
+        Devuelve las operaciones añadidas al diario desde ``posicion``, o None
+        si el archivo se vació o se recortó desde entonces (hay que volver a
+        leerlo entero junto con el archivo principal). Como leer(), recorta
+        una última línea a medio escribir, para que la siguiente escritura no
+        se pegue a ella; debe llamarse con el bloqueo del inventario tomado.
+        """
+        tamano = os.path.getsize(self.ruta) if self.existe() else 0
+        if tamano < self.posicion:
+            return None
+        operaciones = []
+        if tamano == self.posicion:
+            return operaciones
+        with open(self.ruta, 'rb') as f:
+            f.seek(self.posicion)
+            self.posicion += self._leer_lineas(f, operaciones)
+        if self.posicion != tamano:
+            print(f"Advertencia: se descartó el final incompleto del diario '{self.ruta}'.")
+            with open(self.ruta, 'r+b') as f:
+                f.truncate(self.posicion)
+        self.entradas += len(operaciones)
+        return operaciones
+
+    def anadir(self, operaciones: list):
+        """Añade las operaciones al final del diario y fuerza su escritura en disco."""
+        if not operaciones:
+            return
+        texto = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in operaciones)
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        with open(self.ruta, 'a', encoding='utf-8') as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+            self.posicion = os.fstat(f.fileno()).st_size
+        self.entradas += len(operaciones)
+
+    def vaciar(self):
+        """Elimina el diario (tras compactarlo en el archivo principal)."""
+        if self.existe():
+            os.remove(self.ruta)
+        self.entradas = 0
+        self.posicion = 0
@@ -2,19 +2,41 @@
 
 import ttkbootstrap as ttk
 from tkinter import messagebox
-from log import HISTORY_FILE, clear_history
+from datetime import datetime, timedelta
+from log import (clear_history, consultar_historial, contar_historial, valores_historial, resumen_archivo,
+                 ENTRADAS_POR_PAGINA)
+from tabla_virtual import TablaVirtual
+
+# Opciones del filtro de fechas: etiqueta -> días hacia atrás (None = sin límite)
+PERIODOS = {
+    "Todo": None,
+    "Hoy": 0,
+    "Últimos 7 días": 7,
+    "Últimos 30 días": 30,
+    "Últimos 365 días": 365,
+}
+TODOS = "(Todos)"
 
 class HistoryDialog(ttk.Toplevel):
-    """Dialogo para ver el historial de cambios."""
+    """
+    Dialogo para ver el historial de cambios.
+    Solo se consulta la página visible (ENTRADAS_POR_PAGINA entradas), filtrada
+    por usuario, acción, periodo y texto directamente en la base de datos.
+    Opcionalmente, las páginas continúan en el historial archivado.
+    """
     def __init__(self, parent):
         super().__init__(parent)
         self.title("📜 Historial de Cambios")
-        self.geometry("800x600")
+        self.geometry("900x600")
         self.resizable(True, True)
-        
+
         self.transient(parent)
         self.grab_set()
 
+        self._paginas = []   # Entrada anterior al inicio de cada página visitada (None = la más reciente)
+        self._ultima_entrada = None
+        self._hay_mas = False
+
         self.crear_widgets()
         self.cargar_historial()
         self.centrar_ventana()
@@ -36,40 +58,144 @@ class HistoryDialog(ttk.Toplevel):
         ttk.Button(button_frame, text="Actualizar", command=self.cargar_historial, bootstyle="INFO").pack(side="left", padx=5)
         ttk.Button(button_frame, text="Limpiar Historial", command=self.limpiar_historial, bootstyle="WARNING").pack(side="right", padx=5)
 
-        # Frame para el texto del historial
-        history_frame = ttk.Frame(self)
-        history_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        # Filtros
+        filtros_frame = ttk.Labelframe(self, text="🔍 Filtrar", padding=10)
+        filtros_frame.pack(fill="x", padx=10, pady=5)
+
+        ttk.Label(filtros_frame, text="Usuario:").grid(row=0, column=0, sticky="w")
+        self.usuario_combo = ttk.Combobox(filtros_frame, width=15, state="readonly",
+                                          postcommand=lambda: self._cargar_opciones(self.usuario_combo, "usuario"))
+        self.usuario_combo.set(TODOS)
+        self.usuario_combo.grid(row=0, column=1, padx=(5, 15))
+
+        ttk.Label(filtros_frame, text="Acción:").grid(row=0, column=2, sticky="w")
+        self.accion_combo = ttk.Combobox(filtros_frame, width=20, state="readonly",
+                                         postcommand=lambda: self._cargar_opciones(self.accion_combo, "accion"))
+        self.accion_combo.set(TODOS)
+        self.accion_combo.grid(row=0, column=3, padx=(5, 15))
+
+        ttk.Label(filtros_frame, text="Periodo:").grid(row=0, column=4, sticky="w")
+        self.periodo_combo = ttk.Combobox(filtros_frame, width=15, state="readonly", values=list(PERIODOS))
+        self.periodo_combo.set("Todo")
+        self.periodo_combo.grid(row=0, column=5, padx=(5, 15))
+
+        ttk.Label(filtros_frame, text="Texto:").grid(row=1, column=0, sticky="w", pady=(5, 0))
+        self.texto_entry = ttk.Entry(filtros_frame, bootstyle="PRIMARY")
+        self.texto_entry.grid(row=1, column=1, columnspan=5, sticky="ew", padx=(5, 15), pady=(5, 0))
+        self.texto_entry.bind("<Return>", lambda e: self.cargar_historial())
+        ttk.Button(filtros_frame, text="Aplicar", command=self.cargar_historial, bootstyle="PRIMARY").grid(row=0, column=6, rowspan=2, sticky="ns")
+
+        # Las entradas antiguas se archivan comprimidas; solo se leen si se pide
+        self.incluir_archivo = ttk.BooleanVar(value=False)
+        self.archivo_check = ttk.Checkbutton(filtros_frame, variable=self.incluir_archivo,
+                                             command=self.cargar_historial, bootstyle="round-toggle")
+        self.archivo_check.grid(row=2, column=0, columnspan=6, sticky="w", pady=(8, 0))
+        filtros_frame.columnconfigure(5, weight=1)
+
+        for combo in (self.usuario_combo, self.accion_combo, self.periodo_combo):
+            combo.bind("<<ComboboxSelected>>", lambda e: self.cargar_historial())
+
+        # Tabla con la página actual
+        self.tabla = TablaVirtual(self, ('fecha', 'usuario', 'accion', 'detalles'), bootstyle="PRIMARY",
+                                  mensaje_vacio="No hay entradas en el historial para estos filtros.")
+        self.tabla.pack(fill="both", expand=True, padx=10, pady=5)
+        tree = self.tabla.tree
+        tree.column("fecha", anchor="center", width=140, stretch=False)
+        tree.column("usuario", anchor="w", width=100, stretch=False)
+        tree.column("accion", anchor="w", width=160, stretch=False)
+        tree.column("detalles", anchor="w", width=450)
+        tree.heading("fecha", text="Fecha", anchor="center")
+        tree.heading("usuario", text="Usuario", anchor="w")
+        tree.heading("accion", text="Acción", anchor="w")
+        tree.heading("detalles", text="Detalles", anchor="w")
 
-        # Scrollbar para el texto
-        history_scroll = ttk.Scrollbar(history_frame)
-        history_scroll.pack(side="right", fill="y")
+        # Navegación entre páginas
+        paginas_frame = ttk.Frame(self)
+        paginas_frame.pack(fill="x", padx=10, pady=(0, 10))
+        self.anterior_button = ttk.Button(paginas_frame, text="◀ Más recientes", command=self.pagina_anterior, bootstyle="SECONDARY")
+        self.anterior_button.pack(side="left")
+        self.siguiente_button = ttk.Button(paginas_frame, text="Más antiguas ▶", command=self.pagina_siguiente, bootstyle="SECONDARY")
+        self.siguiente_button.pack(side="right")
+        self.pagina_label = ttk.Label(paginas_frame, text="")
+        self.pagina_label.pack(side="top")
 
-        # Widget de texto para mostrar el historial
-        self.history_text = ttk.Text(history_frame, wrap="word", font=("Consolas", 10), state="disabled", yscrollcommand=history_scroll.set)
-        self.history_text.pack(fill="both", expand=True)
-        history_scroll.config(command=self.history_text.yview)
+    def _cargar_opciones(self, combo, campo):
+        """Rellena un desplegable de filtro con los valores presentes en el historial."""
+        try:
+            combo.configure(values=[TODOS] + valores_historial(campo))
+        except Exception as e:
+            print(f"Error al cargar las opciones del historial: {e}")
+
+    def _filtros(self) -> dict:
+        """Devuelve los filtros elegidos en la ventana como argumentos de consultar_historial."""
+        usuario = self.usuario_combo.get()
+        accion = self.accion_combo.get()
+        dias = PERIODOS.get(self.periodo_combo.get())
+        desde = None
+        if dias is not None:
+            desde = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=dias)
+        return {
+            "usuario": None if usuario == TODOS else usuario,
+            "accion": None if accion == TODOS else accion,
+            "desde": desde,
+            "texto": self.texto_entry.get().strip() or None,
+        }
+
+    def _actualizar_texto_archivo(self):
+        archivo = resumen_archivo()
+        self.archivo_check.configure(
+            text=f"Incluir historial archivado ({archivo['entradas']} entradas en {archivo['segmentos']} archivos comprimidos)")
 
     def cargar_historial(self):
-        """Carga el contenido del archivo de historial en el widget de texto."""
+        """Vuelve a la primera página (entradas más recientes) con los filtros actuales."""
+        self._paginas = [None]
+        self._actualizar_texto_archivo()
+        self._mostrar_pagina()
+
+    def pagina_siguiente(self):
+        if self._hay_mas:
+            self._paginas.append(self._ultima_entrada)
+            self._mostrar_pagina()
+
+    def pagina_anterior(self):
+        if len(self._paginas) > 1:
+            self._paginas.pop()
+            self._mostrar_pagina()
+
+    def _mostrar_pagina(self):
+        """Consulta y muestra solo la página actual."""
         try:
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                contenido = f.read()
-            
-            self.history_text.config(state="normal")
-            self.history_text.delete('1.0', "end")
-            self.history_text.insert('1.0', contenido)
-            self.history_text.config(state="disabled")
-            self.history_text.see("end") # Desplazarse al final
-        except FileNotFoundError:
-            self.history_text.config(state="normal")
-            self.history_text.delete('1.0', "end")
-            self.history_text.insert('1.0', "No hay historial de cambios disponible.")
-            self.history_text.config(state="disabled")
+            filtros = self._filtros()
+            # Se pide una entrada de más para saber si existe una página siguiente
+            incluir_archivo = self.incluir_archivo.get()
+            entradas = consultar_historial(antes_de=self._paginas[-1], limite=ENTRADAS_POR_PAGINA + 1,
+                                           incluir_archivo=incluir_archivo, **filtros)
+            # El total solo cuenta la base de datos: contar en el archivo obligaría a descomprimirlo
+            total = None if incluir_archivo else contar_historial(**filtros)
         except Exception as e:
             messagebox.showerror("Error al Cargar Historial", f"No se pudo cargar el historial.\nError: {e}", parent=self)
+            return
+
+        self._hay_mas = len(entradas) > ENTRADAS_POR_PAGINA
+        entradas = entradas[:ENTRADAS_POR_PAGINA]
+        self._ultima_entrada = entradas[-1] if entradas else None
+
+        columnas = list(zip(*entradas))[1:] if entradas else [[], [], [], []]
+        # Los detalles de varias líneas se muestran en una sola
+        detalles = [d.replace("\n", " ⏎ ") for d in columnas[3]]
+        self.tabla.cargar([columnas[0], columnas[1], columnas[2], detalles])
+
+        pagina = len(self._paginas)
+        if total is None:
+            self.pagina_label.config(text=f"Página {pagina}")
+        else:
+            paginas_totales = max(1, -(-total // ENTRADAS_POR_PAGINA))
+            self.pagina_label.config(text=f"Página {pagina} de {paginas_totales} · {total} entradas")
+        self.anterior_button.configure(state="normal" if pagina > 1 else "disabled")
+        self.siguiente_button.configure(state="normal" if self._hay_mas else "disabled")
 
     def limpiar_historial(self):
-        """Limpia el archivo de historial y la vista."""
+        """Limpia el historial y la vista."""
         confirmacion = messagebox.askyesno(
             "Confirmar Limpieza",
             "¿Estás seguro de que quieres limpiar todo el historial de cambios?\n\nEsta acción no se puede deshacer.",
@@ -78,10 +204,7 @@ class HistoryDialog(ttk.Toplevel):
 
         if confirmacion:
             if clear_history():
-                self.history_text.config(state="normal")
-                self.history_text.delete('1.0', "end")
-                self.history_text.insert('1.0', "El historial ha sido limpiado.")
-                self.history_text.config(state="disabled")
+                self.cargar_historial()
                 messagebox.showinfo("Historial Limpiado", "El historial de cambios se ha eliminado correctamente.", parent=self)
             else:
-                messagebox.showerror("Error al Limpiar", "No se pudo limpiar el archivo de historial.", parent=self)
\ No newline at end of file
+                messagebox.showerror("Error al Limpiar", "No se pudo limpiar el historial.", parent=self)
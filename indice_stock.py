@@ -0,0 +1,97 @@
+# indice_stock.py
+
+from bisect import bisect_left, insort
+import numpy as np
+
+# Tamaño de referencia de cada bloque de la lista ordenada
+TAMANO_BLOQUE = 1000
+
+class IndiceStock:
+    """
+    Índice de productos ordenado por cantidad, para responder "qué productos
+    tienen menos de N unidades" sin recorrer todo el inventario.
+
+    Guarda pares (cantidad, codigo) en bloques ordenados de unos pocos miles de
+    elementos: localizar un valor es una búsqueda binaria sobre los bloques y
+    otra dentro del bloque, y insertar o borrar solo desplaza los elementos de
+    un bloque. Así las altas, cambios y bajas no dependen del tamaño total, y
+    un cambio del límite de stock bajo es solo una consulta por rango.
+    """
+    def __init__(self, codigos=(), cantidades=()):
+        self._cantidades = dict(zip(codigos, (int(c) for c in cantidades)))  # codigo -> cantidad
+        # Ordenación inicial vectorizada por (cantidad, codigo)
+        cantidades = np.fromiter(self._cantidades.values(), dtype=np.int64, count=len(self._cantidades))
+        codigos = np.array(list(self._cantidades), dtype=str)
+        orden = np.lexsort((codigos, cantidades))
+        pares = list(zip(cantidades[orden].tolist(), codigos[orden].tolist()))
+        self._bloques = [pares[i:i + TAMANO_BLOQUE] for i in range(0, len(pares), TAMANO_BLOQUE)]
+        self._maximos = [bloque[-1] for bloque in self._bloques]
+
+    def __len__(self):
+        return len(self._cantidades)
+
+    def __contains__(self, codigo):
+        return codigo in self._cantidades
+
+    def _insertar(self, par):
+        if not self._bloques:
+            self._bloques.append([par])
+            self._maximos.append(par)
+            return
+        i = min(bisect_left(self._maximos, par), len(self._bloques) - 1)
+        bloque = self._bloques[i]
+        insort(bloque, par)
+        self._maximos[i] = bloque[-1]
+        if len(bloque) > 2 * TAMANO_BLOQUE:
+            # Partir el bloque para que las inserciones sigan siendo baratas
+            self._bloques[i:i + 1] = [bloque[:TAMANO_BLOQUE], bloque[TAMANO_BLOQUE:]]
+            self._maximos[i:i + 1] = [bloque[TAMANO_BLOQUE - 1], bloque[-1]]
+
+    def _quitar(self, par):
+        i = bisect_left(self._maximos, par)
+        bloque = self._bloques[i]
+        del bloque[bisect_left(bloque, par)]
+        if bloque:
+            self._maximos[i] = bloque[-1]
+        else:
+            del self._bloques[i]
+            del self._maximos[i]
+
+    def actualizar(self, codigo: str, cantidad: int):
+        """Da de alta el producto o cambia su cantidad."""
+        cantidad = int(cantidad)
+        anterior = self._cantidades.get(codigo)
+        if anterior == cantidad:
+            return
+        if anterior is not None:
+            self._quitar((anterior, codigo))
+        self._cantidades[codigo] = cantidad
+        self._insertar((cantidad, codigo))
+
+    def eliminar(self, codigo: str):
+        """Quita el producto del índice si estaba."""
+        anterior = self._cantidades.pop(codigo, None)
+        if anterior is not None:
+            self._quitar((anterior, codigo))
+
+    def _posicion_limite(self, limite: int):
+        """Devuelve (bloque, posición en el bloque) del primer elemento con cantidad >= limite."""
+        # (limite, "") es menor que cualquier par con esa cantidad
+        clave = (int(limite), "")
+        i = bisect_left(self._maximos, clave)
+        if i == len(self._bloques):
+            return i, 0
+        return i, bisect_left(self._bloques[i], clave)
+
+    def contar_menores(self, limite: int) -> int:
+        """Número de productos con cantidad < limite."""
+        i, j = self._posicion_limite(limite)
+        return sum(len(bloque) for bloque in self._bloques[:i]) + j
+
+    def codigos_menores(self, limite: int) -> list:
+        """Códigos de los productos con cantidad < limite, de menor a mayor cantidad."""
+        i, j = self._posicion_limite(limite)
+        codigos = [codigo for bloque in self._bloques[:i] for _, codigo in bloque]
+        if i < len(self._bloques):
+            codigos.extend(codigo for _, codigo in self._bloques[i][:j])
+        return codigos
@@ -0,0 +1,143 @@
+# intercambio.py
+
+import os
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from almacenamiento import reemplazar_atomicamente
+from models import normalizar_importacion
+
+# Filas procesadas entre dos avisos de progreso / comprobaciones de cancelación
+FILAS_POR_BLOQUE = 5000
+# Filas de cada bloque de importación que se fusiona con el inventario.
+# Acota la memoria usada al importar, sea cual sea el tamaño del archivo.
+FILAS_POR_BLOQUE_IMPORTACION = 20000
+# Columnas del archivo que se usan al importar; el resto se ignora al leer
+COLUMNAS_IMPORTACION = ('codigo', 'descripcion', 'cantidad')
+
+class FormatoInvalido(Exception):
+    """El archivo importado no tiene las columnas obligatorias."""
+    pass
+
+def _validar_columnas(columnas):
+    if 'codigo' not in columnas or 'cantidad' not in columnas:
+        raise FormatoInvalido("El archivo debe contener las columnas 'codigo' y 'cantidad'.")
+
+def _bloques_excel(ruta: str, filas_por_bloque: int, al_avanzar):
+    """Recorre la primera hoja en modo solo lectura, sin cargar el libro entero en memoria."""
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        hoja = libro.worksheets[0]
+        total = hoja.max_row or 0
+        filas = hoja.iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            raise FormatoInvalido("El archivo está vacío.")
+        columnas = [str(c).strip() if c is not None else "" for c in encabezado]
+        _validar_columnas(columnas)
+        # Posición de cada columna útil (si se repite, vale la primera)
+        posiciones = {}
+        for i, nombre in enumerate(columnas):
+            if nombre in COLUMNAS_IMPORTACION:
+                posiciones.setdefault(nombre, i)
+        nombres = list(posiciones)
+        indices = [posiciones[n] for n in nombres]
+
+        leidas = 0
+        datos = []
+        for fila in filas:
+            datos.append([fila[i] if i < len(fila) else None for i in indices])
+            if len(datos) == filas_por_bloque:
+                leidas += len(datos)
+                yield pd.DataFrame(datos, columns=nombres)
+                datos = []
+                if total:
+                    al_avanzar(leidas / total, f"Leyendo fila {leidas} de {total}...")
+        if datos:
+            yield pd.DataFrame(datos, columns=nombres)
+    finally:
+        libro.close()
+
+def _bloques_csv(ruta: str, filas_por_bloque: int, al_avanzar):
+    """Recorre el CSV por bloques, usando la posición en el archivo como progreso."""
+    try:
+        # Solo el encabezado: el formato se valida antes de leer ningún dato
+        _validar_columnas(pd.read_csv(ruta, nrows=0).columns)
+    except pd.errors.EmptyDataError:
+        raise FormatoInvalido("El archivo está vacío.")
+    tamano = os.path.getsize(ruta) or 1
+    with open(ruta, 'rb') as f:
+        # El código se lee como texto para no perder ceros a la izquierda
+        lector = pd.read_csv(f, dtype={'codigo': str}, chunksize=filas_por_bloque,
+                             usecols=lambda c: c in COLUMNAS_IMPORTACION)
+        for bloque in lector:
+            yield bloque
+            al_avanzar(f.tell() / tamano, "Leyendo archivo CSV...")
+
+def leer_por_bloques(ruta: str, filas_por_bloque: int = FILAS_POR_BLOQUE_IMPORTACION, al_avanzar=None):
+    """
+    Lee un archivo Excel o CSV de importación como una secuencia de DataFrames
+    de como mucho filas_por_bloque filas. Las columnas obligatorias se validan
+    con el encabezado, antes de leer ninguna fila (lanza FormatoInvalido).
+    al_avanzar(fraccion, mensaje), si se indica, recibe el progreso de la lectura.
+    """
+    al_avanzar = al_avanzar or (lambda fraccion, mensaje: None)
+    if ruta.lower().endswith(".csv"):
+        return _bloques_csv(ruta, filas_por_bloque, al_avanzar)
+    return _bloques_excel(ruta, filas_por_bloque, al_avanzar)
+
+def leer_importacion(tarea, ruta: str) -> int:
+    """
+    Trabajo de importación: lee el archivo por bloques y entrega cada bloque
+    ya normalizado con tarea.entregar(), para que la interfaz lo fusione con
+    Inventario.merge_dataframe. Como la tarea espera a que se consuman los
+    bloques anteriores, en memoria solo hay unos pocos a la vez.
+
+    Returns:
+        int: Número de filas leídas del archivo.
+    """
+    tarea.informar_progreso(0, "Abriendo archivo...")
+    filas = 0
+    for bloque in leer_por_bloques(ruta, al_avanzar=tarea.informar_progreso):
+        tarea.comprobar_cancelacion()
+        filas += len(bloque)
+        tarea.entregar(normalizar_importacion(bloque))
+    tarea.informar_progreso(1, "Terminando...")
+    return filas
+
+def _escribir_excel(tarea, df: pd.DataFrame, ruta: str):
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append([str(c) for c in df.columns])
+    total = len(df) or 1
+    for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+        tarea.comprobar_cancelacion()
+        for fila in df.iloc[inicio:inicio + FILAS_POR_BLOQUE].itertuples(index=False, name=None):
+            hoja.append(fila)
+        tarea.informar_progreso((inicio + FILAS_POR_BLOQUE) / total, f"Escribiendo fila {min(inicio + FILAS_POR_BLOQUE, len(df))} de {len(df)}...")
+    tarea.informar_progreso(None, "Guardando archivo...")
+    libro.save(ruta)
+
+def _escribir_csv(tarea, df: pd.DataFrame, ruta: str):
+    total = len(df) or 1
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        df.iloc[:0].to_csv(f, index=False)
+        for inicio in range(0, len(df), FILAS_POR_BLOQUE * 10):
+            tarea.comprobar_cancelacion()
+            df.iloc[inicio:inicio + FILAS_POR_BLOQUE * 10].to_csv(f, index=False, header=False)
+            tarea.informar_progreso((inicio + FILAS_POR_BLOQUE * 10) / total, "Escribiendo archivo CSV...")
+
+def exportar_dataframe(tarea, df: pd.DataFrame, ruta: str) -> str:
+    """
+    Trabajo de exportación: escribe el DataFrame en Excel o CSV según la
+    extensión. Se escribe en un archivo temporal y solo se reemplaza el
+    destino al terminar, así una exportación cancelada no deja archivos a medias.
+    """
+    tarea.informar_progreso(0, "Exportando...")
+    escribir = _escribir_csv if ruta.lower().endswith(".csv") else _escribir_excel
+    try:
+        reemplazar_atomicamente(ruta, lambda temporal: escribir(tarea, df, temporal))
+    except BaseException:
+        if os.path.exists(ruta + ".tmp"):
+            os.remove(ruta + ".tmp")
+        raise
+    return ruta
@@ -2,21 +2,65 @@
 
 import ttkbootstrap as ttk
 from tkinter import messagebox, filedialog
-from models import Inventario
+from models import obtener_inventario_compartido, ConflictoEdicion, describir_valor
+from tabla_virtual import TablaVirtual
+from panel_tareas import PanelTareas
+from tareas import Tarea
+from intercambio import leer_importacion, exportar_dataframe, FormatoInvalido
+import config
 from config import get_setting # <-- Asegúrate de que esta importación exista
-import pandas as pd
+from rendimiento import medido
+import perfilado
+
+# Milisegundos de espera tras la última tecla antes de lanzar la búsqueda
+RETARDO_BUSQUEDA_MS = 150
+# Conflictos de edición listados como máximo en el aviso
+MAX_CONFLICTOS_LISTADOS = 10
 
 class InventarioFrame(ttk.Frame):
     def __init__(self, parent, controller, usuario_actual, nombre_usuario):
         super().__init__(parent)
         self.controller = controller
         self.usuario_actual = usuario_actual
-        self.inventario = Inventario()
+        self.inventario = obtener_inventario_compartido()
         self.stock_low_limit = get_setting("stock_low_limit") # Valor inicial
+        self._refresco_pendiente = None
+        self._busqueda_programada = None  # after() pendiente del debounce
+        self._busqueda_en_curso = None    # after() del siguiente paso de la búsqueda
+        self._sesion_busqueda = None      # Perfilado de la búsqueda en curso (si el modo está armado)
 
         self.crear_widgets()
         self.cargar_datos_en_treeview()
         self.actualizar_resumen_texto()
+        self.inventario.suscribir(self._on_inventario_cambiado)
+        config.suscribir(self._on_setting_cambiado)
+
+    def destroy(self):
+        self.inventario.cancelar_suscripcion(self._on_inventario_cambiado)
+        config.cancelar_suscripcion(self._on_setting_cambiado)
+        if self._refresco_pendiente is not None:
+            self.after_cancel(self._refresco_pendiente)
+        self._cancelar_busqueda()
+        self.panel_tareas.cancelar_todas()
+        super().destroy()
+
+    def _on_inventario_cambiado(self, evento, codigos):
+        self._programar_refresco()
+
+    def _on_setting_cambiado(self, clave, valor):
+        if clave == "stock_low_limit":
+            self.stock_low_limit = valor
+            self._programar_refresco()
+
+    def _programar_refresco(self):
+        """Agrupa los cambios del inventario o de la configuración en un único refresco de la vista."""
+        if self._refresco_pendiente is None:
+            self._refresco_pendiente = self.after_idle(self._refrescar_vista)
+
+    def _refrescar_vista(self):
+        self._refresco_pendiente = None
+        self._perform_search()
+        self.actualizar_resumen_texto()
 
     def crear_widgets(self):
         button_frame = ttk.Frame(self)
@@ -26,73 +70,104 @@ class InventarioFrame(ttk.Frame):
         ttk.Button(button_frame, text="Eliminar Seleccionado", command=self.eliminar_producto_seleccionado, bootstyle="DANGER").pack(side="left", padx=5)
         ttk.Button(button_frame, text="Actualizar Vista", command=self.cargar_datos_en_treeview, bootstyle="SECONDARY").pack(side="right", padx=5)
 
+        # Importaciones y exportaciones en curso (solo visible mientras hay alguna)
+        self.panel_tareas = PanelTareas(self)
+        self.panel_tareas.pack(fill="x", padx=15, pady=(0, 5), after=button_frame)
+
         search_frame = ttk.Labelframe(self, text="🔍 Buscar Producto", padding=10)
         search_frame.pack(fill="x", padx=10, pady=(5, 10))
         self.search_entry = ttk.Entry(search_frame, bootstyle="PRIMARY")
         self.search_entry.pack(fill="x")
-        self.search_entry.bind("<KeyRelease>", self._perform_search)
+        self.search_entry.bind("<KeyRelease>", self._programar_busqueda)
 
         resumen_frame = ttk.Labelframe(self, text="📄 Resumen del Inventario", padding=10)
         resumen_frame.pack(fill="x", padx=10, pady=(5, 10))
         self.resumen_text = ttk.Text(resumen_frame, height=4, state="disabled", wrap="word", font=("Helvetica", 10))
         self.resumen_text.pack(fill="x")
 
-        tree_frame = ttk.Frame(self)
-        tree_frame.pack(fill="both", expand=True, padx=10, pady=5)
-        tree_scroll = ttk.Scrollbar(tree_frame)
-        tree_scroll.pack(side="right", fill="y")
-        self.tree = ttk.Treeview(tree_frame, yscrollcommand=tree_scroll.set, bootstyle="PRIMARY")
-        self.tree.pack(fill="both", expand=True)
-        tree_scroll.config(command=self.tree.yview)
+        self.tabla = TablaVirtual(self, ('codigo', 'descripcion', 'cantidad'), bootstyle="PRIMARY")
+        self.tabla.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tree = self.tabla.tree
 
-        self.tree['columns'] = ('codigo', 'descripcion', 'cantidad')
-        self.tree.column("#0", width=0, stretch='NO')
         self.tree.column("codigo", anchor="center", width=150)
         self.tree.column("descripcion", anchor="w", width=500)
         self.tree.column("cantidad", anchor="center", width=100)
-        self.tree.heading("#0", text="", anchor='center')
         self.tree.heading("codigo", text="Código", anchor='center')
         self.tree.heading("descripcion", text="Descripción", anchor='w')
         self.tree.heading("cantidad", text="Cantidad", anchor='center')
 
+    @medido("vista.inventario.llenar_tabla")
     def _populate_treeview(self, df):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for index, row in df.iterrows():
-            self.tree.insert(parent='', index='end', iid=index, text='',
-                             values=(row['codigo'], row['descripcion'], row['cantidad']))
+        self.tabla.cargar([df['codigo'], df['descripcion'], df['cantidad']])
 
-    def _perform_search(self, event=None):
-        search_term = self.search_entry.get().lower().strip()
-        df = self.inventario.obtener_dataframe()
-        if not search_term:
-            self._populate_treeview(df)
+    def _mostrar_todo(self):
+        """Muestra el inventario completo; con SQLite se lee por páginas en lugar de cargarlo entero."""
+        if hasattr(self.inventario, "vista_paginada"):
+            self.tabla.cargar_fuente(self.inventario.vista_paginada())
         else:
-            mask = (df['codigo'].str.lower().str.contains(search_term, na=False)) | \
-                   (df['descripcion'].str.lower().str.contains(search_term, na=False))
-            df_filtrado = df[mask]
-            self._populate_treeview(df_filtrado)
+            self._populate_treeview(self.inventario.obtener_dataframe())
+
+    def _programar_busqueda(self, event=None):
+        """Espera a que el usuario deje de teclear para lanzar una única búsqueda."""
+        if self._busqueda_programada is not None:
+            self.after_cancel(self._busqueda_programada)
+        self._busqueda_programada = self.after(RETARDO_BUSQUEDA_MS, self._perform_search)
+
+    def _cancelar_busqueda(self):
+        if self._busqueda_programada is not None:
+            self.after_cancel(self._busqueda_programada)
+            self._busqueda_programada = None
+        if self._busqueda_en_curso is not None:
+            self.after_cancel(self._busqueda_en_curso)
+            self._busqueda_en_curso = None
+        self._terminar_perfilado_busqueda()
+
+    def _terminar_perfilado_busqueda(self):
+        perfilado.terminar_sesion(self._sesion_busqueda)
+        self._sesion_busqueda = None
+
+    @medido("vista.inventario.buscar")
+    def _perform_search(self, event=None):
+        self._cancelar_busqueda()
+        search_term = self.search_entry.get()
+        if not search_term.strip():
+            self._mostrar_todo()
+            return
+        self._sesion_busqueda = perfilado.iniciar_sesion("Búsqueda en inventario")
+        busqueda = self.inventario.buscador.buscar_incremental(search_term)
+        self._continuar_busqueda(busqueda)
+
+    @medido("vista.inventario.buscar_paso")
+    def _continuar_busqueda(self, busqueda):
+        """Ejecuta un paso de la búsqueda y cede el control a Tk hasta el siguiente."""
+        with perfilado.perfilar(self._sesion_busqueda):
+            try:
+                next(busqueda)
+            except StopIteration as fin:
+                self._busqueda_en_curso = None
+                self._populate_treeview(fin.value)
+                terminada = True
+            else:
+                terminada = False
+        if terminada:
+            self._terminar_perfilado_busqueda()
+            return
+        self._busqueda_en_curso = self.after(1, self._continuar_busqueda, busqueda)
 
     def cargar_datos_en_treeview(self):
-        df = self.inventario.obtener_dataframe()
-        self._populate_treeview(df)
+        self._cancelar_busqueda()
+        self._mostrar_todo()
         self.search_entry.delete(0, 'end')
 
     def actualizar_resumen_texto(self):
-        # CAMBIO CLAVE: Volver a leer el límite de stock ANTES de calcular
-        self.stock_low_limit = get_setting("stock_low_limit")
-        
+        # El límite de stock se mantiene al día mediante config.suscribir
         try:
-            df = self.inventario.obtener_dataframe()
-            total_productos = len(df)
-            total_unidades = df['cantidad'].sum()
-            # Usar el valor recién leído
-            productos_bajo_stock = len(df[df['cantidad'] < self.stock_low_limit])
+            resumen_datos = self.inventario.obtener_resumen(self.stock_low_limit)
 
             resumen = (
-                f"Total de productos únicos: {total_productos}\n"
-                f"Total de unidades en stock: {total_unidades}\n"
-                f"Productos con stock bajo (< {self.stock_low_limit} unidades): {productos_bajo_stock}"
+                f"Total de productos únicos: {resumen_datos['total_productos']}\n"
+                f"Total de unidades en stock: {resumen_datos['total_unidades']}\n"
+                f"Productos con stock bajo (< {self.stock_low_limit} unidades): {resumen_datos['productos_stock_bajo']}"
             )
 
             self.resumen_text.config(state="normal")
@@ -105,59 +180,122 @@ class InventarioFrame(ttk.Frame):
     def importar_excel(self):
         filepath = filedialog.askopenfilename(
             title="Seleccionar archivo Excel para importar",
-            filetypes=(("Archivos Excel", "*.xlsx"), ("Todos los archivos", "*.*"))
+            filetypes=(("Archivos Excel", "*.xlsx"), ("Archivos CSV", "*.csv"), ("Todos los archivos", "*.*"))
         )
         if not filepath:
             return
-        try:
-            df_importado = pd.read_excel(filepath)
-            if 'codigo' not in df_importado.columns or 'cantidad' not in df_importado.columns:
-                messagebox.showerror("Error de Formato", "El archivo Excel debe contener las columnas 'codigo' y 'cantidad'.")
-                return
-            productos_agregados = 0
-            productos_actualizados = 0
-            for index, row in df_importado.iterrows():
-                if pd.isna(row['codigo']) or str(row['codigo']).strip() == '':
-                    continue
-                codigo = str(row['codigo']).strip()
-                descripcion = str(row.get('descripcion', '')).strip()
-                cantidad = int(row.get('cantidad', 0))
-                if self.inventario._datos[self.inventario._datos['codigo'] == codigo].empty:
-                    productos_agregados += 1
-                else:
-                    productos_actualizados += 1
-                self.inventario.agregar_o_actualizar_producto(codigo, descripcion, cantidad)
-            self.inventario.guardar_datos()
-            self.cargar_datos_en_treeview()
-            self.actualizar_resumen_texto()
-            messagebox.showinfo("Importación Completa", 
-                                f"Se importaron los datos con éxito.\n\n"
-                                f"Productos agregados: {productos_agregados}\n"
-                                f"Productos actualizados: {productos_actualizados}")
-        except Exception as e:
-            messagebox.showerror("Error al Importar", f"Ocurrió un error al leer el archivo Excel.\nError: {e}")
+        # El archivo se lee en segundo plano y cada bloque leído se fusiona aquí,
+        # en el hilo de la interfaz, así la memoria no depende del tamaño del archivo
+        resultado = {"agregados": 0, "actualizados": 0, "sin_cambios": 0}
+
+        def aplicar_bloque(bloque):
+            for clave, valor in self.inventario.merge_dataframe(bloque).items():
+                resultado[clave] += valor
+
+        def terminar(mensaje=None):
+            # Los bloques ya fusionados se guardan también si la importación se interrumpe
+            guardado = True
+            if resultado["agregados"] or resultado["actualizados"]:
+                guardado = self.guardar_inventario()
+            if mensaje is not None:
+                mensaje(resultado)
+            if not guardado:
+                self._avisar_sin_guardar("Los productos importados")
+
+        def fallar(error):
+            terminar()
+            self._on_importacion_fallida(error, resultado)
+
+        tarea = Tarea("Importando", leer_importacion, filepath)
+        self.panel_tareas.lanzar(
+            tarea,
+            lambda filas: terminar(self._mostrar_importacion_completa),
+            al_fallar=fallar,
+            al_cancelar=lambda: terminar(self._mostrar_importacion_cancelada),
+            al_recibir=aplicar_bloque)
+
+    def guardar_inventario(self) -> bool:
+        """
+        Guarda el inventario. Si otro puesto cambió a la vez los mismos
+        productos, pregunta qué valores conservar. Devuelve False si el usuario
+        lo deja para más tarde (los cambios siguen sin guardar).
+        """
+        while True:
+            try:
+                self.inventario.guardar_datos()
+                return True
+            except ConflictoEdicion as e:
+                if not self._resolver_conflictos(e.conflictos):
+                    return False
+
+    def _avisar_sin_guardar(self, que: str):
+        """Avisa de que un cambio se aplicó en pantalla pero quedó sin guardar por un conflicto."""
+        messagebox.showwarning(
+            "Cambios sin Guardar",
+            f"{que} no se ha guardado todavía: quedó pendiente un conflicto con otro puesto.\n\n"
+            "Se volverá a preguntar qué valores conservar en el próximo guardado.")
+
+    def _resolver_conflictos(self, conflictos) -> bool:
+        lineas = [f"• {codigo}: otro puesto → {describir_valor(ajeno)}; tú → {describir_valor(local)}"
+                  for codigo, ajeno, local in conflictos[:MAX_CONFLICTOS_LISTADOS]]
+        if len(conflictos) > MAX_CONFLICTOS_LISTADOS:
+            lineas.append(f"... y {len(conflictos) - MAX_CONFLICTOS_LISTADOS} más")
+        respuesta = messagebox.askyesnocancel(
+            "Conflicto de Edición",
+            "Otro puesto guardó cambios en estos productos mientras los editabas:\n\n" +
+            "\n".join(lineas) +
+            "\n\n¿Conservar tus valores?\n\n"
+            "Sí: se guardan los tuyos.\n"
+            "No: se conservan los del otro puesto.\n"
+            "Cancelar: no se guarda nada por ahora; se volverá a preguntar al guardar.")
+        if respuesta is None:
+            return False
+        for codigo, _, _ in conflictos:
+            self.inventario.resolver_conflicto(codigo, conservar_local=respuesta)
+        return True
+
+    def _mostrar_importacion_completa(self, resultado):
+        messagebox.showinfo("Importación Completa", 
+                            f"Se importaron los datos con éxito.\n\n"
+                            f"Productos agregados: {resultado['agregados']}\n"
+                            f"Productos actualizados: {resultado['actualizados']}\n"
+                            f"Productos sin cambios: {resultado['sin_cambios']}")
+
+    def _mostrar_importacion_cancelada(self, resultado):
+        messagebox.showwarning("Importación Cancelada",
+                               f"La importación se canceló. Se conservan los productos ya procesados.\n\n"
+                               f"Productos agregados: {resultado['agregados']}\n"
+                               f"Productos actualizados: {resultado['actualizados']}")
+
+    def _on_importacion_fallida(self, error, resultado):
+        if isinstance(error, FormatoInvalido):
+            messagebox.showerror("Error de Formato", str(error))
+        else:
+            procesados = resultado['agregados'] + resultado['actualizados']
+            aviso = f"\n\nSe conservan {procesados} productos ya procesados." if procesados else ""
+            messagebox.showerror("Error al Importar", f"Ocurrió un error al leer el archivo Excel.\nError: {error}{aviso}")
 
     def exportar_excel(self):
         filepath = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
-            filetypes=(("Archivos Excel", "*.xlsx"), ("Todos los archivos", "*.*")),
+            filetypes=(("Archivos Excel", "*.xlsx"), ("Archivos CSV", "*.csv"), ("Todos los archivos", "*.*")),
             title="Guardar inventario completo como..."
         )
         if not filepath:
             return
-        try:
-            df = self.inventario.obtener_dataframe()
-            df.to_excel(filepath, index=False)
-            messagebox.showinfo("Exportación Completa", f"El inventario completo se ha guardado en:\n{filepath}")
-        except Exception as e:
-            messagebox.showerror("Error al Exportar", f"No se pudo guardar el archivo.\nError: {e}")
+        # Copia del estado actual: los cambios posteriores no afectan al archivo exportado
+        df = self.inventario.obtener_dataframe().copy()
+        tarea = Tarea("Exportando inventario", exportar_dataframe, df, filepath)
+        self.panel_tareas.lanzar(
+            tarea,
+            lambda ruta: messagebox.showinfo("Exportación Completa", f"El inventario completo se ha guardado en:\n{ruta}"),
+            al_fallar=lambda e: messagebox.showerror("Error al Exportar", f"No se pudo guardar el archivo.\nError: {e}"))
 
     def eliminar_producto_seleccionado(self):
-        selected_item = self.tree.focus()
-        if not selected_item:
+        item_values = self.tabla.fila_seleccionada()
+        if item_values is None:
             messagebox.showwarning("Selección Requerida", "Por favor, selecciona un producto de la lista para eliminar.")
             return
-        item_values = self.tree.item(selected_item, 'values')
         codigo_producto = item_values[0]
         descripcion_producto = item_values[1]
         confirmacion = messagebox.askyesno(
@@ -168,9 +306,9 @@ class InventarioFrame(ttk.Frame):
         )
         if confirmacion:
             if self.inventario.eliminar_producto(codigo_producto):
-                self.inventario.guardar_datos()
-                self.cargar_datos_en_treeview()
-                self.actualizar_resumen_texto()
-                messagebox.showinfo("Eliminado", "El producto fue eliminado correctamente.")
+                if self.guardar_inventario():
+                    messagebox.showinfo("Eliminado", "El producto fue eliminado correctamente.")
+                else:
+                    self._avisar_sin_guardar("La eliminación del producto")
             else:
                 messagebox.showerror("Error", "No se pudo eliminar el producto. Puede que ya no exista.")
\ No newline at end of file
@@ -1,43 +1,446 @@
 # log.py
 
 import os
-from datetime import datetime
-from utils import get_data_path
+import gzip
+import json
+import time
+import atexit
+import functools
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from utils import get_data_path, HISTORIAL_DB
+from db import obtener_pool
+from config import get_setting
+from rendimiento import medido, contar
 
-# Nombre del archivo de historial
+# Archivo de historial en texto de versiones anteriores (se migra a HISTORIAL_DB)
 HISTORY_FILE = os.path.join(get_data_path(), "historial_cambios.log")
+SEPARADOR_TEXTO = "--------------------------------------------------"
 
+# Número de entradas acumuladas a partir del cual un lote se escribe en segundo plano
+LOTE_MAX_ENTRADAS = 5000
+# Entradas por página en las consultas del historial
+ENTRADAS_POR_PAGINA = 200
+# Formato de fecha guardado: ordena igual como texto que como fecha
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+# Archivo histórico: segmentos JSONL comprimidos con gzip más un manifiesto
+ARCHIVO_DIR = os.path.join(get_data_path(), "historial_archivo")
+MANIFIESTO_FILE = os.path.join(ARCHIVO_DIR, "manifiesto.json")
+# Entradas máximas por segmento (acota lo que hay que descomprimir al consultarlo)
+SEGMENTO_MAX_ENTRADAS = 50000
+# Al superar historial_max_entradas se archiva hasta quedar en esta fracción del máximo
+FRACCION_TRAS_ROTAR = 0.75
+# Segundos mínimos entre dos comprobaciones automáticas de rotación
+INTERVALO_ROTACION_S = 600
+
+# Estado del registro por lotes (compartido por todos los hilos)
+_cerrojo = threading.RLock()
+_lote = []          # Entradas pendientes de escribir: (fecha, usuario, accion, detalles)
+_profundidad = 0    # Nivel de anidamiento de registro_por_lotes()
+_cola_escritura = queue.Queue()
+_hilo_escritor = None
+# Estado de la rotación
+_cerrojo_rotacion = threading.Lock()
+_ultima_rotacion = 0.0
+
+def _crear_tabla(conn):
+    """Crea la tabla del historial y sus índices, y migra el historial en texto si existe."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS historial (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            usuario TEXT NOT NULL,
+            accion TEXT NOT NULL,
+            detalles TEXT NOT NULL
+        )
+    """)
+    # Índices para las consultas típicas: por fecha, por usuario y por tipo de acción.
+    # Como SQLite añade el id al final de cada índice, recorrerlos en orden
+    # (fecha DESC, id DESC) no requiere ordenar y LIMIT corta la consulta enseguida.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial (fecha)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_historial_usuario ON historial (usuario, fecha)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_historial_accion ON historial (accion, fecha)")
+    _migrar_historial_texto(conn)
+
+def _leer_historial_texto(ruta: str):
+    """Recorre las entradas del historial en texto como tuplas (fecha, usuario, accion, detalles)."""
+    with open(ruta, 'r', encoding='utf-8', errors='replace') as f:
+        cabecera, detalles = None, []
+        for linea in f:
+            linea = linea.rstrip("\n")
+            if linea == SEPARADOR_TEXTO:
+                if cabecera is not None:
+                    yield cabecera + ("\n".join(detalles),)
+                cabecera, detalles = None, []
+            elif cabecera is None and linea.startswith("[") and "] Usuario: " in linea:
+                fecha, resto = linea[1:].split("] Usuario: ", 1)
+                usuario, _, accion = resto.partition(" | Acción: ")
+                cabecera = (fecha, usuario, accion)
+            elif cabecera is not None:
+                detalles.append(linea[len("Detalles: "):] if not detalles and linea.startswith("Detalles: ") else linea)
+        if cabecera is not None:
+            yield cabecera + ("\n".join(detalles),)
+
+def _migrar_historial_texto(conn):
+    """Importa una sola vez el historial_cambios.log de versiones anteriores."""
+    if not os.path.exists(HISTORY_FILE):
+        return
+    try:
+        conn.executemany("INSERT INTO historial (fecha, usuario, accion, detalles) VALUES (?, ?, ?, ?)",
+                         _leer_historial_texto(HISTORY_FILE))
+        conn.commit()
+        os.replace(HISTORY_FILE, HISTORY_FILE + ".migrado")
+        print(f"Historial migrado de '{HISTORY_FILE}' a '{HISTORIAL_DB}'.")
+    except (IOError, OSError) as e:
+        print(f"Error al migrar el historial en texto: {e}")
+
+def _pool():
+    return obtener_pool(HISTORIAL_DB, inicializar=_crear_tabla)
+
+@medido("historial.escribir")
+def _escribir(entradas: list):
+    """Inserta las entradas en la base de datos del historial en una sola transacción."""
+    try:
+        with _pool().conexion() as conn:
+            with conn:
+                conn.executemany("INSERT INTO historial (fecha, usuario, accion, detalles) VALUES (?, ?, ?, ?)",
+                                 entradas)
+        contar("historial.entradas_escritas", len(entradas))
+    except Exception as e:
+        # Si no se puede escribir, imprimir el error en la consola
+        # para no detener la aplicación.
+        print(f"Error al escribir en el historial: {e}")
+        return
+    _programar_rotacion()
+
+def _bucle_escritor():
+    """Hilo de fondo que escribe, en orden, los lotes encolados."""
+    while True:
+        entradas = _cola_escritura.get()
+        try:
+            _escribir(entradas)
+        finally:
+            _cola_escritura.task_done()
+
+def _encolar_lote():
+    """Entrega el lote acumulado al hilo escritor. Requiere tener _cerrojo."""
+    global _hilo_escritor
+    if not _lote:
+        return
+    if _hilo_escritor is None:
+        _hilo_escritor = threading.Thread(target=_bucle_escritor, name="escritor-historial", daemon=True)
+        _hilo_escritor.start()
+    _cola_escritura.put(list(_lote))
+    _lote.clear()
+
+@medido("historial.log_change")
 def log_change(usuario: str, accion: str, detalles: str):
     """
-    Registra un cambio en el archivo de historial.
-    
+    Registra un cambio en el historial.
+    Dentro de un bloque registro_por_lotes() la entrada se acumula y se escribe
+    junto con las demás al salir del bloque.
+
     Args:
         usuario (str): El nombre de usuario que realizó la acción.
         accion (str): Una descripción corta de la acción (ej. "Producto Agregado").
         detalles (str): Detalles adicionales sobre el cambio (ej. "Código: XXX, Cantidad: 50").
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    log_entry = (
-        f"[{timestamp}] Usuario: {usuario} | Acción: {accion}\n"
-        f"Detalles: {detalles}\n"
-        f"--------------------------------------------------\n"
-    )
-    
+    entrada = (datetime.now().strftime(FORMATO_FECHA), str(usuario), str(accion), str(detalles))
+
+    with _cerrojo:
+        if _profundidad:
+            _lote.append(entrada)
+            if len(_lote) >= LOTE_MAX_ENTRADAS:
+                _encolar_lote()
+            return
+        # Si hay lotes en vuelo, esperar a que terminen para conservar el orden
+        _cola_escritura.join()
+        _escribir([entrada])
+
+@contextmanager
+def registro_por_lotes():
+    """
+    Agrupa todas las llamadas a log_change del bloque en escrituras únicas.
+    Los lotes grandes se escriben en un hilo de fondo a medida que se llenan;
+    al salir del bloque más externo todo queda escrito en disco.
+
+    Ejemplo:
+        with registro_por_lotes():
+            for producto in productos:
+                log_change(...)
+    """
+    global _profundidad
+    with _cerrojo:
+        _profundidad += 1
     try:
-        # Usar 'a' para añadir al final del archivo (append mode)
-        with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-    except IOError as e:
-        # Si no se puede escribir, imprimir el error en la consola
-        # para no detener la aplicación.
-        print(f"Error al escribir en el historial: {e}")
+        yield
+    finally:
+        with _cerrojo:
+            _profundidad -= 1
+            if _profundidad == 0:
+                flush_history()
+
+def flush_history():
+    """Escribe en disco todas las entradas pendientes y espera al hilo de fondo."""
+    with _cerrojo:
+        _encolar_lote()
+        _cola_escritura.join()
+
+# Nada de lo registrado se pierde al cerrar la aplicación
+atexit.register(flush_history)
+
+def _filtros_sql(usuario=None, accion=None, desde=None, hasta=None, texto=None):
+    """Traduce los filtros de consulta a una cláusula WHERE y sus parámetros."""
+    condiciones, parametros = [], []
+    if usuario:
+        condiciones.append("usuario = ?")
+        parametros.append(usuario)
+    if accion:
+        condiciones.append("accion = ?")
+        parametros.append(accion)
+    if desde is not None:
+        condiciones.append("fecha >= ?")
+        parametros.append(desde.strftime(FORMATO_FECHA) if isinstance(desde, datetime) else str(desde))
+    if hasta is not None:
+        condiciones.append("fecha < ?")
+        parametros.append(hasta.strftime(FORMATO_FECHA) if isinstance(hasta, datetime) else str(hasta))
+    if texto:
+        condiciones.append("detalles LIKE ? ESCAPE '\\'")
+        parametros.append("%" + texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    return where, parametros
+
+def consultar_historial(usuario=None, accion=None, desde=None, hasta=None, texto=None,
+                        antes_de=None, limite=ENTRADAS_POR_PAGINA, incluir_archivo=False) -> list:
+    """
+    Devuelve una página del historial, de la entrada más reciente a la más antigua.
+    Cada entrada es una tupla (id, fecha, usuario, accion, detalles).
+
+    Args:
+        usuario, accion (str, opcional): Valor exacto a filtrar.
+        desde, hasta (datetime o str, opcional): Rango de fechas [desde, hasta).
+        texto (str, opcional): Texto contenido en los detalles.
+        antes_de (tuple, opcional): Última entrada de la página actual; se
+            devuelven solo las entradas más antiguas que ella (página siguiente).
+        limite (int): Número máximo de entradas.
+        incluir_archivo (bool): Si la base de datos no llena la página, seguir
+            buscando en los segmentos archivados (ver rotar_historial).
+    """
+    flush_history()
+    where, parametros = _filtros_sql(usuario, accion, desde, hasta, texto)
+    if antes_de is not None:
+        # Paginación por clave: no depende de cuántas páginas se hayan saltado
+        where += (" AND " if where else " WHERE ") + "(fecha, id) < (?, ?)"
+        parametros.extend([antes_de[1], antes_de[0]])
+    sql = f"SELECT id, fecha, usuario, accion, detalles FROM historial{where} ORDER BY fecha DESC, id DESC LIMIT ?"
+    with _pool().conexion() as conn:
+        entradas = conn.execute(sql, parametros + [limite]).fetchall()
+    if incluir_archivo and len(entradas) < limite:
+        desde_archivo = entradas[-1] if entradas else antes_de
+        entradas += _consultar_archivo(usuario, accion, desde, hasta, texto, desde_archivo, limite - len(entradas))
+    return entradas
+
+def contar_historial(usuario=None, accion=None, desde=None, hasta=None, texto=None) -> int:
+    """Número de entradas del historial que cumplen los filtros (ver consultar_historial)."""
+    flush_history()
+    where, parametros = _filtros_sql(usuario, accion, desde, hasta, texto)
+    with _pool().conexion() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM historial{where}", parametros).fetchone()[0]
+
+def valores_historial(campo: str) -> list:
+    """Devuelve los valores distintos de 'usuario' o 'accion', ordenados (para los filtros)."""
+    if campo not in ("usuario", "accion"):
+        raise ValueError(f"Campo de historial no válido: {campo}")
+    flush_history()
+    with _pool().conexion() as conn:
+        valores = {fila[0] for fila in conn.execute(f"SELECT DISTINCT {campo} FROM historial")}
+    # Los segmentos archivados guardan sus valores en el manifiesto
+    clave = "usuarios" if campo == "usuario" else "acciones"
+    for segmento in _leer_manifiesto():
+        valores.update(segmento[clave])
+    return sorted(valores)
 
 def clear_history():
-    """Borra el contenido del archivo de historial."""
+    """Borra todas las entradas del historial, incluidos los segmentos archivados."""
     try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            f.write("") # Escribe una cadena vacía para limpiar el archivo
+        with _cerrojo, _cerrojo_rotacion:
+            _lote.clear()
+            _cola_escritura.join()
+            with _pool().conexion() as conn:
+                with conn:
+                    conn.execute("DELETE FROM historial")
+            for segmento in _leer_manifiesto():
+                ruta = os.path.join(ARCHIVO_DIR, segmento["archivo"])
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            _guardar_manifiesto([])
+            _descomprimir_segmento.cache_clear()
         return True
-    except IOError:
-        return False
\ No newline at end of file
+    except Exception:
+        return False
+
+# --- Rotación y archivo del historial ---
+
+def _leer_manifiesto() -> list:
+    """Devuelve la lista de segmentos archivados, del más antiguo al más reciente."""
+    try:
+        with open(MANIFIESTO_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)["segmentos"]
+    except FileNotFoundError:
+        return []
+    except (json.JSONDecodeError, KeyError, IOError) as e:
+        print(f"Error al leer el manifiesto del historial archivado: {e}")
+        return []
+
+def _guardar_manifiesto(segmentos: list):
+    os.makedirs(ARCHIVO_DIR, exist_ok=True)
+    temporal = MANIFIESTO_FILE + ".tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({"segmentos": segmentos}, f, indent=1, ensure_ascii=False)
+    os.replace(temporal, MANIFIESTO_FILE)
+
+def _escribir_segmento(entradas: list) -> dict:
+    """Escribe las entradas (ordenadas por fecha, id) en un segmento gzip y devuelve su descripción."""
+    os.makedirs(ARCHIVO_DIR, exist_ok=True)
+    primera, ultima = entradas[0], entradas[-1]
+    nombre = f"historial_{primera[0]:012d}_{ultima[0]:012d}.jsonl.gz"
+    ruta = os.path.join(ARCHIVO_DIR, nombre)
+    with gzip.open(ruta + ".tmp", 'wt', encoding='utf-8') as f:
+        for id_, fecha, usuario, accion, detalles in entradas:
+            f.write(json.dumps({"id": id_, "fecha": fecha, "usuario": usuario,
+                                "accion": accion, "detalles": detalles}, ensure_ascii=False))
+            f.write("\n")
+    os.replace(ruta + ".tmp", ruta)
+    return {
+        "archivo": nombre,
+        "entradas": len(entradas),
+        "primera": [primera[1], primera[0]],   # Clave (fecha, id) de la entrada más antigua
+        "ultima": [ultima[1], ultima[0]],      # y de la más reciente
+        "usuarios": sorted({e[2] for e in entradas}),
+        "acciones": sorted({e[3] for e in entradas}),
+    }
+
+def _corte_rotacion(conn, max_entradas: int, max_dias: int):
+    """Devuelve la clave (fecha, id) de la última entrada que hay que archivar, o None."""
+    corte = None
+    if max_dias and max_dias > 0:
+        limite = (datetime.now() - timedelta(days=max_dias)).strftime(FORMATO_FECHA)
+        corte = conn.execute("SELECT fecha, id FROM historial WHERE fecha < ? "
+                             "ORDER BY fecha DESC, id DESC LIMIT 1", (limite,)).fetchone()
+    if max_entradas and max_entradas > 0:
+        total = conn.execute("SELECT COUNT(*) FROM historial").fetchone()[0]
+        if total > max_entradas:
+            sobrantes = total - int(max_entradas * FRACCION_TRAS_ROTAR)
+            por_tamano = conn.execute("SELECT fecha, id FROM historial ORDER BY fecha, id LIMIT 1 OFFSET ?",
+                                      (sobrantes - 1,)).fetchone()
+            if corte is None or (por_tamano is not None and tuple(por_tamano) > tuple(corte)):
+                corte = por_tamano
+    return corte
+
+def rotar_historial(max_entradas=None, max_dias=None) -> int:
+    """
+    Mueve las entradas antiguas de la base de datos a segmentos JSONL
+    comprimidos con gzip en ARCHIVO_DIR, registrados en un manifiesto.
+    Se archivan las entradas con más de max_dias días y, si la base de datos
+    supera max_entradas, las más antiguas hasta bajar al 75% del máximo.
+    Por defecto los umbrales salen de la configuración (historial_max_entradas
+    e historial_max_dias; 0 desactiva cada uno).
+
+    Returns:
+        int: Número de entradas archivadas.
+    """
+    if max_entradas is None:
+        max_entradas = get_setting("historial_max_entradas")
+    if max_dias is None:
+        max_dias = get_setting("historial_max_dias")
+    archivadas = 0
+    with _cerrojo_rotacion:
+        segmentos = _leer_manifiesto()
+        with _pool().conexion() as conn:
+            if segmentos:
+                # Si una rotación anterior se interrumpió tras escribir el segmento,
+                # sus entradas aún están en la base de datos: se quitan ahora.
+                with conn:
+                    conn.execute("DELETE FROM historial WHERE (fecha, id) <= (?, ?)", segmentos[-1]["ultima"])
+            corte = _corte_rotacion(conn, max_entradas, max_dias)
+            while corte is not None:
+                # Un segmento cada vez: la base de datos solo se bloquea durante un borrado pequeño
+                entradas = conn.execute(
+                    "SELECT id, fecha, usuario, accion, detalles FROM historial WHERE (fecha, id) <= (?, ?) "
+                    "ORDER BY fecha, id LIMIT ?", (corte[0], corte[1], SEGMENTO_MAX_ENTRADAS)).fetchall()
+                if not entradas:
+                    break
+                segmentos.append(_escribir_segmento(entradas))
+                _guardar_manifiesto(segmentos)
+                with conn:
+                    conn.execute("DELETE FROM historial WHERE (fecha, id) <= (?, ?)", (entradas[-1][1], entradas[-1][0]))
+                archivadas += len(entradas)
+    if archivadas:
+        print(f"Historial: {archivadas} entradas archivadas en '{ARCHIVO_DIR}'.")
+    return archivadas
+
+def _programar_rotacion():
+    """Lanza en segundo plano una comprobación de rotación, como mucho una vez por intervalo."""
+    global _ultima_rotacion
+    ahora = time.monotonic()
+    if _ultima_rotacion and ahora - _ultima_rotacion < INTERVALO_ROTACION_S:
+        return
+    _ultima_rotacion = ahora
+
+    def rotar():
+        try:
+            rotar_historial()
+        except Exception as e:
+            print(f"Error al rotar el historial: {e}")
+    threading.Thread(target=rotar, name="rotacion-historial", daemon=True).start()
+
+def _leer_segmento(segmento: dict) -> tuple:
+    """Devuelve las entradas de un segmento como tuplas (id, fecha, usuario, accion, detalles)."""
+    return _descomprimir_segmento(segmento["archivo"])
+
+@functools.lru_cache(maxsize=2)
+def _descomprimir_segmento(archivo: str) -> tuple:
+    # Se guardan los últimos segmentos leídos: pasar de página no vuelve a descomprimir
+    with gzip.open(os.path.join(ARCHIVO_DIR, archivo), 'rt', encoding='utf-8') as f:
+        return tuple((e["id"], e["fecha"], e["usuario"], e["accion"], e["detalles"]) for e in map(json.loads, f))
+
+def _consultar_archivo(usuario, accion, desde, hasta, texto, antes_de, limite) -> list:
+    """
+    Continúa una consulta en los segmentos archivados, del más reciente al más
+    antiguo. Solo se descomprimen los segmentos que el manifiesto no descarta
+    por fechas, usuario o acción, y solo hasta completar la página.
+    """
+    desde = desde.strftime(FORMATO_FECHA) if isinstance(desde, datetime) else desde
+    hasta = hasta.strftime(FORMATO_FECHA) if isinstance(hasta, datetime) else hasta
+    texto = texto.lower() if texto else None
+    clave_max = (antes_de[1], antes_de[0]) if antes_de is not None else None
+    resultado = []
+    for segmento in reversed(_leer_manifiesto()):
+        if clave_max is not None and tuple(segmento["primera"]) >= clave_max:
+            continue
+        if desde is not None and segmento["ultima"][0] < desde:
+            break  # Los segmentos siguientes son todavía más antiguos
+        if hasta is not None and segmento["primera"][0] >= hasta:
+            continue
+        if (usuario and usuario not in segmento["usuarios"]) or (accion and accion not in segmento["acciones"]):
+            continue
+        for entrada in reversed(_leer_segmento(segmento)):
+            id_, fecha, usuario_e, accion_e, detalles = entrada
+            if clave_max is not None and (fecha, id_) >= clave_max:
+                continue
+            if ((usuario and usuario_e != usuario) or (accion and accion_e != accion)
+                    or (desde is not None and fecha < desde) or (hasta is not None and fecha >= hasta)
+                    or (texto and texto not in detalles.lower())):
+                continue
+            resultado.append(entrada)
+            if len(resultado) >= limite:
+                return resultado
+    return resultado
+
+def resumen_archivo() -> dict:
+    """Devuelve el número de segmentos archivados y de entradas que contienen."""
+    segmentos = _leer_manifiesto()
+    return {"segmentos": len(segmentos), "entradas": sum(s["entradas"] for s in segmentos)}
@@ -2,7 +2,7 @@
 
 import ttkbootstrap as ttk
 from tkinter import messagebox
-from usuarios import GestionUsuarios
+from autenticacion import ServicioAutenticacion, esperar_resultado
 
 class LoginFrame(ttk.Frame):
     """Frame de inicio de sesión que puede ser embebido."""
@@ -11,7 +11,7 @@ class LoginFrame(ttk.Frame):
         self.controller = controller
         self.on_success_callback = on_success_callback
         
-        self.gestion_usuarios = GestionUsuarios()
+        self.autenticacion = ServicioAutenticacion()
         
         self.crear_widgets()
 
@@ -38,8 +38,8 @@ class LoginFrame(ttk.Frame):
         self.password_entry.pack(fill="x", pady=(0, 20))
 
         # Botón de Login
-        login_button = ttk.Button(main_frame, text="Iniciar Sesión", command=self._login, bootstyle="SUCCESS")
-        login_button.pack(fill="x", pady=5)
+        self.login_button = ttk.Button(main_frame, text="Iniciar Sesión", command=self._login, bootstyle="SUCCESS")
+        self.login_button.pack(fill="x", pady=5)
         
         # Información del admin
         info_label = ttk.Label(main_frame, text="Usuario por defecto: admin / admin", font=("Helvetica", 9), foreground="gray")
@@ -54,12 +54,22 @@ class LoginFrame(ttk.Frame):
             messagebox.showwarning("Campos Vacíos", "Por favor, ingresa usuario y contraseña.")
             return
 
-        datos_usuario = self.gestion_usuarios.verificar_usuario(usuario, password)
-        
+        # bcrypt es lento a propósito: se verifica en segundo plano para no congelar la ventana
+        self.login_button.configure(state="disabled", text="Verificando...")
+        futuro = self.autenticacion.verificar_usuario(usuario, password)
+        esperar_resultado(self, futuro, self._on_login_verificado, self._on_login_fallido)
+
+    def _on_login_verificado(self, datos_usuario):
+        """Recibe en el hilo de Tk el resultado de la verificación."""
+        self.login_button.configure(state="normal", text="Iniciar Sesión")
         if datos_usuario:
             messagebox.showinfo("Bienvenido", f"¡Hola, {datos_usuario['nombre_completo']}!")
             # Llama a la función de callback para notificar a la ventana principal
             self.on_success_callback(datos_usuario)
         else:
             messagebox.showerror("Error de Autenticación", "Usuario o contraseña incorrectos.")
-            self.password_entry.delete(0, 'end')
\ No newline at end of file
+            self.password_entry.delete(0, 'end')
+
+    def _on_login_fallido(self, error):
+        self.login_button.configure(state="normal", text="Iniciar Sesión")
+        messagebox.showerror("Error", f"No se pudo verificar el usuario: {error}")
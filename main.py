@@ -2,18 +2,41 @@
 #Copyright (c) 2025 Roberto Gómez Gonzalez <redescryptogomez@gmail.com>
 #https://github.com/AfroXpress
 
+import sys
+import threading
 import tkinter as tk
 from tkinter import messagebox
 import ttkbootstrap as ttkb
 from dashboard import DashboardFrame
-from inventario import InventarioFrame
 from login import LoginFrame
-from user_management import UserManagementFrame
-from alerts import AlertsFrame
-from settings import SettingsDialog
-from history import HistoryDialog # <-- NUEVA IMPORTACIÓN
 from usuarios import GestionUsuarios
-from config import load_settings
+from config import load_settings, get_setting
+from log import flush_history
+import rendimiento
+import perfilado
+# Los módulos de Inventario, Alertas, Gestión de Usuarios, Configuración e
+# Historial (y con ellos pandas) se importan al abrirlos por primera vez,
+# para que la ventana de login aparezca sin esperar a cargarlos.
+
+# Frames que se crean tras el login, la primera vez que se muestran
+FRAMES_PRINCIPALES = ("Dashboard", "Inventario", "Alerts", "UserManagement")
+# Cada cuánto mira Tk si terminó la comprobación de cambios en segundo plano
+INTERVALO_SONDEO_COMPROBACION_MS = 100
+
+def precargar(es_admin: bool):
+    """
+    Importa los módulos pesados y carga el inventario compartido en segundo
+    plano, mientras el usuario está en el Dashboard. Solo toca datos, nunca
+    widgets: los frames se siguen creando en el hilo de Tk al mostrarse.
+    """
+    try:
+        import inventario, alerts
+        if es_admin:
+            import user_management
+        from models import obtener_inventario_compartido
+        obtener_inventario_compartido()
+    except Exception as e:
+        print(f"Error al precargar el inventario: {e}")
 
 class App(ttkb.Window):
     def __init__(self):
@@ -21,8 +44,14 @@ class App(ttkb.Window):
         theme_name = settings.get("theme", "superhero")
         
         super().__init__(themename=theme_name)
+        rendimiento.configurar_desde_ajustes()
+        perfilado.suscribir(self._on_perfil_guardado)
         
         self.usuario_actual = None
+        self.es_admin = False
+        self._precarga = None
+        self._perfilado_solicitado = False
+        self._comprobacion = None
 
         self.container = ttkb.Frame(self)
         self.container.pack(fill="both", expand=True, padx=10, pady=10)
@@ -37,31 +66,60 @@ class App(ttkb.Window):
     def crear_frames(self):
         self.frames["Login"] = LoginFrame(self.container, self, self.on_login_success)
         self.frames["Login"].grid(row=0, column=0, sticky="nsew")
-        
-        self.frames["Dashboard"] = None
-        self.frames["Inventario"] = None
-        self.frames["UserManagement"] = None
-        self.frames["Alerts"] = None
-
-    def crear_frames_principales(self):
-        self.frames["Dashboard"] = DashboardFrame(self.container, self, self.usuario_actual)
-        self.frames["Dashboard"].grid(row=0, column=0, sticky="nsew")
 
-        # CAMBIO: Pasar el usuario actual al crear el frame de Inventario
-        self.frames["Inventario"] = InventarioFrame(self.container, self, self.usuario_actual, self.usuario_actual['nombre_usuario'])
-        self.frames["Inventario"].grid(row=0, column=0, sticky="nsew")
+        for nombre in FRAMES_PRINCIPALES:
+            self.frames[nombre] = None
 
-        self.frames["Alerts"] = AlertsFrame(self.container, self, self.usuario_actual)
-        self.frames["Alerts"].grid(row=0, column=0, sticky="nsew")
+    def construir_frame(self, frame_name):
+        """
+        Crea un frame principal la primera vez que se muestra, importando su
+        módulo solo entonces. Devuelve None si el usuario no tiene acceso.
+        """
+        nombre_usuario = self.usuario_actual['nombre_usuario']
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            if frame_name in ("Inventario", "Alerts") and not self._cargar_inventario():
+                return None
+            if frame_name == "Dashboard":
+                frame = DashboardFrame(self.container, self, self.usuario_actual)
+            elif frame_name == "Inventario":
+                from inventario import InventarioFrame
+                frame = InventarioFrame(self.container, self, self.usuario_actual, nombre_usuario)
+            elif frame_name == "Alerts":
+                from alerts import AlertsFrame
+                frame = AlertsFrame(self.container, self, self.usuario_actual)
+            elif frame_name == "UserManagement" and self.es_admin:
+                from user_management import UserManagementFrame
+                frame = UserManagementFrame(self.container, self, self.usuario_actual, nombre_usuario)
+            else:
+                return None
+        finally:
+            self.config(cursor="")
+        frame.grid(row=0, column=0, sticky="nsew")
+        self.frames[frame_name] = frame
+        return frame
 
-        gestor = GestionUsuarios()
-        if gestor.es_admin(self.usuario_actual['nombre_usuario']):
-            # CAMBIO: Pasar el usuario actual al crear el frame de UserManagement
-            self.frames["UserManagement"] = UserManagementFrame(self.container, self, self.usuario_actual, self.usuario_actual['nombre_usuario'])
-            self.frames["UserManagement"].grid(row=0, column=0, sticky="nsew")
+    def _cargar_inventario(self) -> bool:
+        """
+        Carga el inventario compartido antes de crear las vistas que lo usan. Con
+        el backend remoto, si el servidor no responde lo avisa y devuelve False.
+        """
+        from models import obtener_inventario_compartido
+        from models_remoto import ErrorServidor
+        try:
+            obtener_inventario_compartido()
+        except ErrorServidor as e:
+            messagebox.showerror("Servidor no disponible",
+                                 f"No se pudo conectar con el servidor del inventario en "
+                                 f"{get_setting('servidor_url')}.\n\n{e}")
+            return False
+        return True
 
     def mostrar_frame(self, frame_name):
         frame = self.frames.get(frame_name)
+        if frame is None and frame_name in FRAMES_PRINCIPALES and self.usuario_actual:
+            frame = self.construir_frame(frame_name)
         if frame:
             frame.tkraise()
             if frame_name == "Login":
@@ -75,8 +133,58 @@ class App(ttkb.Window):
 
     def on_login_success(self, datos_usuario):
         self.usuario_actual = datos_usuario
-        self.crear_frames_principales()
+        self.es_admin = GestionUsuarios().es_admin(datos_usuario['nombre_usuario'])
         self.mostrar_frame("Dashboard")
+        if get_setting("precargar_en_segundo_plano"):
+            # Se lanza cuando el Dashboard ya está dibujado, para no retrasarlo
+            self.after_idle(self.iniciar_precarga)
+        self._programar_comprobacion()
+
+    def _programar_comprobacion(self):
+        try:
+            intervalo_ms = max(1, int(get_setting("intervalo_comprobacion_s"))) * 1000
+        except (TypeError, ValueError):
+            intervalo_ms = 5000
+        self._comprobacion = self.after(intervalo_ms, self.comprobar_cambios_externos)
+
+    def comprobar_cambios_externos(self):
+        """
+        Busca periódicamente cambios del inventario hechos desde otros puestos;
+        las vistas se refrescan solas. La consulta (una petición HTTP con el
+        backend remoto) se hace en un hilo, para que un servidor lento o caído
+        no congele la ventana; solo la incorporación de los cambios vuelve a Tk.
+        """
+        self._comprobacion = None
+        if self.usuario_actual is None:
+            return
+        # Solo si el inventario ya se está usando: comprobarlo no debe obligar a cargarlo
+        if "models" not in sys.modules:
+            self._programar_comprobacion()
+            return
+        models = sys.modules["models"]
+        resultado = {}
+        hilo = threading.Thread(target=lambda: resultado.update(cambios=models.detectar_cambios_externos()),
+                                name="comprobacion", daemon=True)
+        hilo.start()
+        self._esperar_comprobacion(hilo, resultado)
+
+    def _esperar_comprobacion(self, hilo, resultado):
+        if hilo.is_alive():
+            self._comprobacion = self.after(INTERVALO_SONDEO_COMPROBACION_MS, self._esperar_comprobacion, hilo, resultado)
+            return
+        self._comprobacion = None
+        if self.usuario_actual is None:
+            return
+        if resultado.get("cambios"):
+            sys.modules["models"].comprobar_cambios_externos()
+        self._programar_comprobacion()
+
+    def iniciar_precarga(self):
+        """Lanza la precarga del inventario en un hilo, si no hay otra en curso."""
+        if self._precarga is not None and self._precarga.is_alive():
+            return
+        self._precarga = threading.Thread(target=precargar, args=(self.es_admin,), name="precarga", daemon=True)
+        self._precarga.start()
 
     def crear_menu(self):
         menubar = tk.Menu(self)
@@ -92,30 +200,52 @@ class App(ttkb.Window):
         nav_menu.add_command(label="Dashboard", command=lambda: self.mostrar_frame("Dashboard"))
         nav_menu.add_command(label="Inventario", command=lambda: self.mostrar_frame("Inventario"))
         nav_menu.add_command(label="Alertas de Stock", command=lambda: self.mostrar_frame("Alerts"))
-        
-        gestor = GestionUsuarios()
-        if gestor.es_admin(self.usuario_actual['nombre_usuario']):
+
+        if self.es_admin:
             nav_menu.add_separator()
             nav_menu.add_command(label="Gestión de Usuarios", command=lambda: self.mostrar_frame("UserManagement"))
 
-        if gestor.es_admin(self.usuario_actual['nombre_usuario']):
+        if self.es_admin:
             tools_menu = tk.Menu(menubar, tearoff=0)
             menubar.add_cascade(label="Herramientas", menu=tools_menu)
             tools_menu.add_command(label="Configuración", command=self.abrir_configuracion)
             # NUEVO: Añadir opción de historial
             tools_menu.add_command(label="Ver Historial de Cambios", command=self.abrir_historial)
+            tools_menu.add_command(label="Rendimiento", command=self.abrir_rendimiento)
+            tools_menu.add_command(label="Perfilar la Próxima Operación", command=self.armar_perfilado)
 
         nav_menu.add_separator()
         nav_menu.add_command(label=f"Cerrar Sesión ({self.usuario_actual['nombre_usuario']})", command=self.logout)
         nav_menu.add_command(label="Salir", command=self.quit)
 
     def abrir_configuracion(self):
+        from settings import SettingsDialog
         SettingsDialog(self, on_save_callback=self._refresh_current_frame)
 
     # NUEVO: Método para abrir el diálogo de historial
     def abrir_historial(self):
+        from history import HistoryDialog
         HistoryDialog(self)
 
+    def abrir_rendimiento(self):
+        from dialogo_rendimiento import DialogoRendimiento
+        DialogoRendimiento(self)
+
+    def armar_perfilado(self):
+        perfilado.armar()
+        self._perfilado_solicitado = True
+        messagebox.showinfo(
+            "Perfilado Activado",
+            "La próxima importación, exportación o búsqueda se medirá con cProfile y tracemalloc "
+            "(irá más lenta de lo normal).\n\n"
+            f"El informe se guardará en:\n{perfilado.carpeta_informes()}")
+
+    def _on_perfil_guardado(self, ruta):
+        # Con INVENTARIO_PERFILAR se perfila todo; solo se avisa de lo pedido desde el menú
+        if self._perfilado_solicitado:
+            self._perfilado_solicitado = False
+            messagebox.showinfo("Informe de Perfilado", f"Informe de perfilado guardado en:\n{ruta}")
+
     def _refresh_current_frame(self):
         current_frame_name = None
         for name, frame in self.frames.items():
@@ -136,20 +266,18 @@ class App(ttkb.Window):
     def logout(self):
         if messagebox.askyesno("Cerrar Sesión", "¿Estás seguro de que quieres cerrar la sesión?"):
             self.usuario_actual = None
-            if self.frames.get("Dashboard"):
-                self.frames["Dashboard"].destroy()
-            if self.frames.get("Inventario"):
-                self.frames["Inventario"].destroy()
-            if self.frames.get("Alerts"):
-                self.frames["Alerts"].destroy()
-            if self.frames.get("UserManagement"):
-                self.frames["UserManagement"].destroy()
-            self.frames["Dashboard"] = None
-            self.frames["Inventario"] = None
-            self.frames["Alerts"] = None
-            self.frames["UserManagement"] = None
+            self.es_admin = False
+            if self._comprobacion is not None:
+                self.after_cancel(self._comprobacion)
+                self._comprobacion = None
+            for nombre in FRAMES_PRINCIPALES:
+                if self.frames.get(nombre):
+                    self.frames[nombre].destroy()
+                self.frames[nombre] = None
             self.mostrar_frame("Login")
 
 if __name__ == "__main__":
     app = App()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    # Asegurar que todo el historial pendiente quede escrito antes de salir
+    flush_history()
\ No newline at end of file
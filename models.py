@@ -1,15 +1,56 @@
 # models.py
 
+import threading
+from itertools import repeat
 import pandas as pd
-import os
-from utils import INVENTARIO_FILE
-from log import log_change # <-- NUEVA IMPORTACIÓN
+import numpy as np
+from almacenamiento import COLUMNAS, almacenamiento_por_defecto, dataframe_vacio, AlmacenamientoCSV
+from log import log_change, registro_por_lotes # <-- NUEVA IMPORTACIÓN
+from busqueda import BuscadorInventario
+from indice_stock import IndiceStock
+from diario import Diario, DIARIO_MAX_ENTRADAS
+from bloqueo import obtener_bloqueo, firma_archivo, BloqueoOcupado
+from config import get_setting
+from rendimiento import medido, contar
 
-# Constantes
-COLUMNAS = ['codigo', 'descripcion', 'cantidad']
+def normalizar_importacion(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza un DataFrame importado a las columnas del inventario.
+    Descarta filas sin código, limpia espacios, convierte la cantidad a entero
+    y, si un código aparece varias veces, conserva su última aparición.
+    """
+    df = df[df['codigo'].notna()]
+    codigos = df['codigo'].astype(str).str.strip()
+    if 'descripcion' in df.columns:
+        descripciones = df['descripcion'].fillna('').astype(str).str.strip()
+    else:
+        descripciones = pd.Series('', index=df.index)
+    cantidades = pd.to_numeric(df['cantidad'], errors='coerce').fillna(0).astype(int)
+
+    normalizado = pd.DataFrame({'codigo': codigos, 'descripcion': descripciones, 'cantidad': cantidades})
+    normalizado = normalizado[normalizado['codigo'] != '']
+    return normalizado.drop_duplicates('codigo', keep='last').reset_index(drop=True)
+
+class ConflictoEdicion(Exception):
+    """
+    Otro proceso guardó cambios en productos que aquí también se cambiaron y
+    aún no se guardaron, así que no se guardó nada. ``conflictos`` es una
+    lista de (codigo, valor_ajeno, valor_local), cada valor como
+    (descripcion, cantidad) o None si el producto está eliminado. Hay que
+    elegir con Inventario.resolver_conflicto() qué valor conservar y volver a guardar.
+    """
+    def __init__(self, conflictos: list):
+        super().__init__(f"{len(conflictos)} productos se cambiaron también desde otro puesto.")
+        self.conflictos = conflictos
+
+def describir_valor(valor) -> str:
+    """Texto de un valor de ConflictoEdicion, para mensajes e historial."""
+    return "eliminado" if valor is None else f"{valor[0]} ({valor[1]} unidades)"
 
 class Producto:
     """Representa un único producto en el inventario."""
+    __slots__ = ('codigo', 'descripcion', 'cantidad')  # Sin __dict__ por instancia
+
     def __init__(self, codigo: str, descripcion: str, cantidad: int):
         self.codigo = str(codigo)
         self.descripcion = str(descripcion)
@@ -18,33 +59,427 @@ class Producto:
     def __repr__(self):
         return f"Producto(Código: {self.codigo}, Descripción: {self.descripcion}, Cantidad: {self.cantidad})"
 
+class ColeccionProductos:
+    """
+    Lista de productos de solo lectura guardada por columnas (un array por
+    campo) en lugar de un objeto por fila. Se comporta como una secuencia de
+    Producto: admite len(), índices e iteración, y cada Producto se crea solo
+    al pedirlo. Para procesar o exportar muchas filas conviene usar
+    columnas() o a_dataframe(), que no crean ningún objeto por fila.
+    """
+    __slots__ = ('_codigos', '_descripciones', '_cantidades')
+
+    def __init__(self, codigos, descripciones, cantidades):
+        self._codigos = np.asarray(codigos, dtype=object)
+        self._descripciones = np.asarray(descripciones, dtype=object)
+        self._cantidades = np.asarray(cantidades, dtype=np.int64)
+
+    @classmethod
+    def desde_dataframe(cls, df: pd.DataFrame) -> "ColeccionProductos":
+        """Crea la colección a partir de las columnas del inventario de un DataFrame."""
+        return cls(df['codigo'].to_numpy(dtype=object), df['descripcion'].to_numpy(dtype=object),
+                   df['cantidad'].to_numpy())
+
+    def __len__(self):
+        return len(self._codigos)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return ColeccionProductos(self._codigos[indice], self._descripciones[indice], self._cantidades[indice])
+        return Producto(self._codigos[indice], self._descripciones[indice], self._cantidades[indice])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"ColeccionProductos({len(self)} productos)"
+
+    def columnas(self) -> tuple:
+        """Devuelve los arrays (codigos, descripciones, cantidades), sin copiarlos."""
+        return self._codigos, self._descripciones, self._cantidades
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Devuelve los productos como DataFrame con las columnas del inventario."""
+        return pd.DataFrame({'codigo': self._codigos, 'descripcion': self._descripciones,
+                             'cantidad': self._cantidades}, columns=COLUMNAS)
+
 class Inventario:
-    """Gestiona toda la colección de productos del inventario."""
-    def __init__(self, usuario_actual=None): # <-- NUEVO PARÁMETRO
+    """Gestiona toda la colección de productos del inventario.
+
+    Mantiene un índice ``codigo -> posición`` sincronizado con ``_datos`` para
+    que buscar, actualizar y eliminar un producto cueste O(1). Las altas se
+    acumulan en ``_pendientes`` y las bajas se marcan en ``_eliminados``; ambas
+    se consolidan en el DataFrame de una sola vez (ver ``_sincronizar``) antes de
+    entregar o guardar los datos.
+
+    Las consultas de stock bajo usan un ``IndiceStock`` ordenado por cantidad
+    que se construye la primera vez que se necesita y después se mantiene al
+    día con cada alta, cambio o baja.
+
+    Guardar no reescribe el archivo completo cada vez: los cambios se añaden a
+    un ``Diario`` junto al archivo principal, que se compacta en él (escritura
+    a un temporal y renombrado) cuando el diario crece o el cambio es grande.
+    Al cargar, el diario se vuelve a aplicar sobre el archivo principal.
+
+    Varios procesos pueden compartir la carpeta de datos. Cargar y guardar se
+    hacen con un ``BloqueoArchivo`` tomado, y antes de escribir se incorpora lo
+    que otros procesos hayan guardado (normalmente, solo las líneas nuevas de
+    su diario): los cambios de cada uno se conservan en lugar de que el último
+    en guardar sobrescriba a los demás. ``_originales`` recuerda el valor en
+    disco de cada producto cambiado y aún sin guardar, para detectar los
+    conflictos (el mismo producto cambiado en dos sitios a la vez): mientras
+    haya alguno sin resolver, guardar lanza ConflictoEdicion sin escribir nada.
+    comprobar_cambios() hace lo mismo bajo demanda, y si nadie guardó nada solo
+    cuesta comparar la fecha y el tamaño de dos archivos.
+    """
+    def __init__(self, usuario_actual=None, almacenamiento=None, diario=None): # <-- NUEVO PARÁMETRO
+        self.almacenamiento = almacenamiento or almacenamiento_por_defecto()
+        self.diario = diario or Diario(self.almacenamiento.ruta + ".diario")
+        self._bloqueo = obtener_bloqueo(self.almacenamiento.ruta)
+        self._bloqueo.adquirir()
+        try:
+            self._inicializar(usuario_actual)
+        finally:
+            self._bloqueo.liberar()
+
+    def _inicializar(self, usuario_actual):
+        """Carga el archivo principal y el diario (con el bloqueo tomado, para leerlos a la par)."""
         self._datos = self._cargar_datos()
         self.usuario_actual = usuario_actual # <-- GUARDAR USUARIO
+        self._pendientes = []    # Filas nuevas aún no volcadas a _datos
+        self._eliminados = set() # Posiciones de _datos marcadas como eliminadas
+        self._indice = self._construir_indice(self._datos['codigo'])
+        self._sin_guardar = []   # Operaciones del diario aún no guardadas
+        self._compactar = False  # El próximo guardado reescribe el archivo principal
+        self._suscriptores = []  # Callbacks avisados tras cada cambio
+        self.version = 0         # Se incrementa con cada cambio de los datos
+        self.buscador = BuscadorInventario(self)
+        self._stock = None       # IndiceStock, se construye bajo demanda
+        self._originales = {}    # codigo -> (descripcion, cantidad) en disco, o None, de los cambios sin guardar
+        self._conflictos = {}    # codigo -> (valor ajeno, valor local) pendientes de resolver
+        operaciones = self.diario.leer()
+        self._firma_vista = self._firmas()  # Estado de los archivos tras la última lectura o escritura
+        self._aplicar_diario(operaciones)
 
+    @medido("inventario.cargar")
     def _cargar_datos(self) -> pd.DataFrame:
-        """Carga los datos desde el archivo CSV o crea un DataFrame vacío si no existe."""
-        if os.path.exists(INVENTARIO_FILE):
-            try:
-                df = pd.read_csv(INVENTARIO_FILE)
-                for col in COLUMNAS:
-                    if col not in df.columns:
-                        df[col] = "" if col == 'descripcion' else 0
-                df['codigo'] = df['codigo'].astype(str)
-                df['cantidad'] = pd.to_numeric(df['cantidad'], errors='coerce').fillna(0).astype(int)
-                return df[COLUMNAS]
-            except (pd.errors.EmptyDataError, FileNotFoundError):
-                return pd.DataFrame(columns=COLUMNAS)
+        """Carga los datos desde el almacenamiento configurado (Feather o CSV)."""
+        return self.almacenamiento.cargar()
+
+    @staticmethod
+    def _construir_indice(codigos) -> dict:
+        """Construye el índice codigo -> posición. Ante códigos repetidos gana el primero."""
+        indice = {}
+        for posicion, codigo in enumerate(codigos.astype(str).str.strip()):
+            indice.setdefault(codigo, posicion)
+        return indice
+
+    def _sincronizar(self):
+        """Vuelca las altas pendientes y las bajas marcadas en el DataFrame."""
+        if not self._pendientes and not self._eliminados:
+            return
+        n = len(self._datos)
+        partes = []
+        if self._eliminados:
+            conservar = np.ones(n, dtype=bool)
+            conservar[[p for p in self._eliminados if p < n]] = False
+            partes.append(self._datos[conservar])
+        else:
+            partes.append(self._datos)
+        nuevas = [fila for i, fila in enumerate(self._pendientes) if n + i not in self._eliminados]
+        if nuevas:
+            partes.append(pd.DataFrame(nuevas, columns=COLUMNAS))
+        partes = [p for p in partes if not p.empty]
+        datos = pd.concat(partes, ignore_index=True) if partes else dataframe_vacio()
+
+        if self._eliminados:
+            # Las posiciones se desplazan al compactar: hay que reconstruir el índice.
+            self._indice = self._construir_indice(datos['codigo'])
+        # Sin bajas, las posiciones de las altas ya coinciden con las definitivas.
+        self._datos = datos
+        self._pendientes = []
+        self._eliminados = set()
+
+    def _aplicar_diario(self, operaciones: list):
+        """Aplica sobre los datos cargados los cambios guardados en el diario, sin registrarlos de nuevo."""
+        if not operaciones:
+            return
+        self._aplicar_operaciones(operaciones)
+        if self.diario.entradas > DIARIO_MAX_ENTRADAS:
+            self._compactar = True
+            self.guardar_datos()
+
+    def _aplicar_operaciones(self, operaciones: list):
+        """Aplica operaciones con el formato del diario sobre los datos en memoria."""
+        if not operaciones:
+            return
+        for operacion in operaciones:
+            codigo = operacion[1]
+            if operacion[0] == "d":
+                posicion = self._indice.pop(codigo, None)
+                if posicion is not None:
+                    self._eliminados.add(posicion)
+                continue
+            posicion = self._indice.get(codigo)
+            if posicion is None:
+                self._indice[codigo] = len(self._datos) + len(self._pendientes)
+                self._pendientes.append([codigo, operacion[2], operacion[3]])
+            else:
+                self._escribir_fila(posicion, operacion[2], operacion[3])
+        self._sincronizar()
+
+    def _firmas(self) -> tuple:
+        """Firmas (fecha, tamaño, inodo) del archivo principal y del diario."""
+        return firma_archivo(self.almacenamiento.ruta), self.diario.firma()
+
+    def _valor_actual(self, codigo: str):
+        """Devuelve (descripcion, cantidad) del producto en memoria, o None si no existe."""
+        posicion = self._indice.get(codigo)
+        if posicion is None:
+            return None
+        _, descripcion, cantidad = self._leer_fila(posicion)
+        return (descripcion if isinstance(descripcion, str) else "", int(cantidad))
+
+    def _anotar_originales(self, codigos, valores):
+        """Recuerda el valor en disco de los productos que se van a cambiar (solo la primera vez)."""
+        if not self._originales:
+            self._originales = dict(zip(codigos, valores))
+            return
+        for codigo, valor in zip(codigos, valores):
+            self._originales.setdefault(codigo, valor)
+
+    def _recargar(self):
+        """Vuelve a leer el archivo principal y el diario completos."""
+        self._datos = self._cargar_datos()
+        self._pendientes = []
+        self._eliminados = set()
+        self._indice = self._construir_indice(self._datos['codigo'])
+        self._aplicar_operaciones(self.diario.leer())
+
+    def _incorporar_cambios_externos(self):
+        """
+        Trae a memoria lo que otros procesos guardaron desde la última lectura,
+        conservando los cambios locales aún sin guardar. Se llama con el bloqueo
+        tomado. Devuelve los códigos cambiados desde fuera (lista vacía si hubo
+        que recargarlo todo), o None si los archivos no cambiaron.
+
+        Si otro proceso cambió un producto que aquí también se cambió, el valor
+        local se mantiene en memoria pero sin guardar, y el producto queda en
+        ``_conflictos`` hasta que se resuelva con resolver_conflicto().
+        """
+        firmas = self._firmas()
+        if firmas == self._firma_vista:
+            return None
+        locales = {codigo: self._valor_actual(codigo) for codigo in self._originales}
+        operaciones = self.diario.leer_nuevas() if firmas[0] == self._firma_vista[0] else None
+        if operaciones is None:
+            # Otro proceso compactó (o el diario se recortó): hay que leerlo todo
+            self._recargar()
+            codigos = []
+            afectados = list(locales)
+        else:
+            self._aplicar_operaciones(operaciones)
+            codigos = list(dict.fromkeys(operacion[1] for operacion in operaciones))
+            afectados = [codigo for codigo in codigos if codigo in locales]
+
+        reponer = []
+        for codigo in afectados:
+            en_disco = self._valor_actual(codigo)
+            local = locales[codigo]
+            if en_disco == local or en_disco == self._originales[codigo]:
+                # Mismo valor en ambos sitios, o nadie más lo tocó: no hay conflicto
+                self._conflictos.pop(codigo, None)
+                self._originales[codigo] = en_disco
+            else:
+                self._conflictos[codigo] = (en_disco, local)
+            if en_disco != local:
+                reponer.append(["d", codigo] if local is None else ["u", codigo, local[0], local[1]])
+        self._aplicar_operaciones(reponer)
+        self._stock = None
+        self._firma_vista = self._firmas()
+        return codigos
+
+    def _comprobar_conflictos(self):
+        """Lanza ConflictoEdicion si quedan conflictos sin resolver."""
+        if self._conflictos:
+            raise ConflictoEdicion([(codigo, ajeno, local) for codigo, (ajeno, local) in self._conflictos.items()])
+
+    def resolver_conflicto(self, codigo: str, conservar_local: bool):
+        """
+        Resuelve un conflicto de ConflictoEdicion: conserva el valor de este
+        puesto (se guardará encima del otro) o acepta el del otro puesto
+        (se descarta el cambio local). Después hay que volver a guardar.
+        """
+        ajeno, local = self._conflictos.pop(codigo)
+        self._originales[codigo] = ajeno
+        if not conservar_local:
+            operacion = ["d", codigo] if ajeno is None else ["u", codigo, ajeno[0], ajeno[1]]
+            self._aplicar_operaciones([operacion])
+            self._registrar_operaciones([operacion])
+            self._stock = None
+        log_change(
+            usuario=self.usuario_actual or "Sistema",
+            accion="Conflicto de Edición",
+            detalles=f"Código: {codigo}, Valor de otro puesto: {describir_valor(ajeno)}, "
+                     f"Valor de este puesto: {describir_valor(local)}, "
+                     f"Se conserva: {'el de este puesto' if conservar_local else 'el del otro puesto'}"
+        )
+        if not conservar_local:
+            self._notificar("actualizado", [codigo])
+
+    def _guardado(self):
+        """Anota que memoria y disco coinciden tras una escritura propia."""
+        self._originales = {}
+        self._firma_vista = self._firmas()
+
+    def _avisar_cambios_externos(self, codigos):
+        if codigos is not None:
+            self._notificar("externo", codigos)
+
+    def detectar_cambios(self) -> bool:
+        """Indica si otro proceso guardó cambios desde la última lectura, sin incorporarlos (seguro desde otro hilo)."""
+        return self._firmas() != self._firma_vista
+
+    def comprobar_cambios(self) -> bool:
+        """
+        Si otro proceso guardó cambios desde la última lectura, los incorpora y
+        avisa a los suscriptores con el evento 'externo'. Devuelve True si los
+        había. Mientras nadie guarde, no lee ningún archivo.
+        """
+        if not self.detectar_cambios():
+            return False
+        try:
+            self._bloqueo.adquirir(espera_max=0)
+        except BloqueoOcupado:
+            return False  # Alguien está guardando; se verá en la próxima comprobación
+        try:
+            codigos = self._incorporar_cambios_externos()
+        finally:
+            self._bloqueo.liberar()
+        self._avisar_cambios_externos(codigos)
+        return codigos is not None
+
+    def _registrar_operaciones(self, operaciones: list):
+        """Anota operaciones para el diario; si son demasiadas, se compactará al guardar."""
+        if self._compactar:
+            return
+        self._sin_guardar.extend(operaciones)
+        if self.diario.entradas + len(self._sin_guardar) > DIARIO_MAX_ENTRADAS:
+            self._compactar = True
+            self._sin_guardar = []
+
+    def _indice_stock(self) -> IndiceStock:
+        """Devuelve el índice por cantidad, construyéndolo si aún no existe."""
+        if self._stock is None:
+            self._sincronizar()
+            codigos = list(self._indice)
+            posiciones = np.fromiter(self._indice.values(), dtype=np.int64, count=len(codigos))
+            self._stock = IndiceStock(codigos, self._datos['cantidad'].to_numpy()[posiciones])
+        return self._stock
+
+    def _leer_fila(self, posicion: int) -> list:
+        """Devuelve [codigo, descripcion, cantidad] de la fila en la posición indicada."""
+        n = len(self._datos)
+        if posicion >= n:
+            return list(self._pendientes[posicion - n])
+        return [self._datos.iat[posicion, i] for i in range(len(COLUMNAS))]
+
+    def _escribir_fila(self, posicion: int, descripcion: str, cantidad: int):
+        """Reemplaza descripción y cantidad de la fila en la posición indicada."""
+        n = len(self._datos)
+        if posicion >= n:
+            self._pendientes[posicion - n][1] = descripcion
+            self._pendientes[posicion - n][2] = cantidad
         else:
-            os.makedirs(os.path.dirname(INVENTARIO_FILE), exist_ok=True)
-            return pd.DataFrame(columns=COLUMNAS)
+            self._datos.iat[posicion, COLUMNAS.index('descripcion')] = descripcion
+            self._datos.iat[posicion, COLUMNAS.index('cantidad')] = cantidad
+
+    def suscribir(self, callback):
+        """
+        Registra un callback que se llamará tras cada cambio del inventario
+        como callback(evento, codigos), con evento en 'agregado', 'actualizado',
+        'eliminado', 'importado' o 'externo' (cambios guardados por otro
+        proceso) y codigos la lista de códigos afectados (vacía si no se conocen).
+        """
+        if callback not in self._suscriptores:
+            self._suscriptores.append(callback)
+
+    def cancelar_suscripcion(self, callback):
+        """Deja de notificar al callback indicado."""
+        if callback in self._suscriptores:
+            self._suscriptores.remove(callback)
+
+    def _notificar(self, evento: str, codigos: list):
+        """Incrementa la versión de los datos y avisa a todos los suscriptores de un cambio."""
+        self.version += 1
+        for callback in list(self._suscriptores):
+            try:
+                callback(evento, codigos)
+            except Exception as e:
+                print(f"Error al notificar un cambio del inventario: {e}")
 
+    @medido("inventario.guardar")
     def guardar_datos(self):
-        """Guarda el DataFrame actual en el archivo CSV."""
-        self._datos.to_csv(INVENTARIO_FILE, index=False)
+        """
+        Guarda los cambios. Normalmente solo se añaden al diario (coste
+        proporcional al cambio); si el diario es grande, se compacta. Antes se
+        incorporan los cambios que otros procesos hayan guardado; si chocan con
+        los de aquí, no se guarda nada y se lanza ConflictoEdicion.
+        """
+        with self._bloqueo:
+            externos = self._incorporar_cambios_externos()
+            if not self._conflictos:
+                if self._compactar or not self.almacenamiento.existe():
+                    self.compactar()
+                elif self._sin_guardar:
+                    self.diario.anadir(self._sin_guardar)
+                    self._sin_guardar = []
+                    self._guardado()
+        self._avisar_cambios_externos(externos)
+        self._comprobar_conflictos()
+
+    @medido("inventario.compactar")
+    def compactar(self):
+        """
+        Reescribe el archivo principal con el estado actual y vacía el diario.
+        El archivo se sustituye de forma atómica; si el proceso se interrumpe
+        antes de vaciar el diario, volver a aplicarlo no cambia los datos.
+        """
+        with self._bloqueo:
+            externos = self._incorporar_cambios_externos()
+            if not self._conflictos:
+                self._sincronizar()
+                self.almacenamiento.guardar(self._datos)
+                self.diario.vaciar()
+                self._sin_guardar = []
+                self._compactar = False
+                self._guardado()
+        self._avisar_cambios_externos(externos)
+        self._comprobar_conflictos()
+
+    def exportar_csv(self, ruta: str):
+        """Exporta el inventario completo a un archivo CSV."""
+        AlmacenamientoCSV(ruta).guardar(self.obtener_dataframe())
+
+    @medido("inventario.buscar")
+    def buscar(self, termino: str) -> pd.DataFrame:
+        """Devuelve los productos cuyo código o descripción contienen el término (sin distinguir mayúsculas)."""
+        return self.buscador.buscar(termino)
+
+    def existe_producto(self, codigo: str) -> bool:
+        """Indica si existe un producto con el código dado."""
+        return str(codigo).strip() in self._indice
 
+    def obtener_producto(self, codigo: str):
+        """Devuelve el Producto con el código dado, o None si no existe."""
+        posicion = self._indice.get(str(codigo).strip())
+        if posicion is None:
+            return None
+        codigo, descripcion, cantidad = self._leer_fila(posicion)
+        return Producto(codigo, descripcion, int(cantidad))
+
+    @medido("inventario.agregar_o_actualizar")
     def agregar_o_actualizar_producto(self, codigo: str, descripcion: str, cantidad: int):
         """
         Agrega un nuevo producto o actualiza la cantidad y descripción de uno existente.
@@ -58,13 +493,16 @@ class Inventario:
             print("Advertencia: Se intentó agregar un producto con código vacío. Ignorando.")
             return
 
-        mascara = self._datos['codigo'].astype(str).str.strip() == codigo
-        indice = self._datos[mascara].index
+        posicion = self._indice.get(codigo)
 
-        if indice.empty:
-            # El producto no existe, lo agregamos
-            nuevo_producto = pd.DataFrame([[codigo, descripcion, cantidad]], columns=COLUMNAS)
-            self._datos = pd.concat([self._datos, nuevo_producto], ignore_index=True)
+        if posicion is None:
+            # El producto no existe, lo agregamos al final de las altas pendientes
+            self._originales.setdefault(codigo, None)
+            self._indice[codigo] = len(self._datos) + len(self._pendientes)
+            self._pendientes.append([codigo, descripcion, cantidad])
+            self._registrar_operaciones([["u", codigo, descripcion, cantidad]])
+            if self._stock is not None:
+                self._stock.actualizar(codigo, cantidad)
             print(f"Producto '{codigo}' agregado.")
             # NUEVO: Registrar en el historial
             log_change(
@@ -72,11 +510,15 @@ class Inventario:
                 accion="Producto Agregado",
                 detalles=f"Código: {codigo}, Descripción: {descripcion}, Cantidad: {cantidad}"
             )
+            self._notificar("agregado", [codigo])
         else:
             # El producto existe, REEMPLAZAMOS su cantidad y descripción
-            cantidad_anterior = self._datos.loc[indice[0], 'cantidad']
-            self._datos.loc[indice[0], 'cantidad'] = cantidad
-            self._datos.loc[indice[0], 'descripcion'] = descripcion
+            self._originales.setdefault(codigo, self._valor_actual(codigo))
+            cantidad_anterior = self._leer_fila(posicion)[2]
+            self._escribir_fila(posicion, descripcion, cantidad)
+            self._registrar_operaciones([["u", codigo, descripcion, cantidad]])
+            if self._stock is not None:
+                self._stock.actualizar(codigo, cantidad)
             print(f"Producto '{codigo}' actualizado.")
             # NUEVO: Registrar en el historial
             log_change(
@@ -84,19 +526,121 @@ class Inventario:
                 accion="Cantidad Actualizada",
                 detalles=f"Código: {codigo}, Cantidad Anterior: {cantidad_anterior}, Cantidad Nueva: {cantidad}"
             )
+            self._notificar("actualizado", [codigo])
+
+    @medido("inventario.merge")
+    def merge_dataframe(self, df: pd.DataFrame) -> dict:
+        """
+        Agrega o actualiza en bloque todos los productos de un DataFrame.
+        Equivale a llamar a agregar_o_actualizar_producto por cada fila, pero
+        aplica altas y actualizaciones de forma vectorizada.
+
+        Returns:
+            dict: Conteo con las claves 'agregados', 'actualizados' y 'sin_cambios'.
+        """
+        nuevos = normalizar_importacion(df)
+        contar("inventario.filas_fusionadas", len(nuevos))
+        self._sincronizar()
+
+        posiciones = nuevos['codigo'].map(self._indice)
+        existentes = posiciones.notna().to_numpy()
 
+        # Actualizaciones: solo se escriben las filas cuyo contenido cambia
+        pos = posiciones[existentes].astype(int).to_numpy()
+        descripciones = nuevos['descripcion'].to_numpy()[existentes]
+        cantidades = nuevos['cantidad'].to_numpy()[existentes]
+        cambian = (self._datos['descripcion'].to_numpy()[pos] != descripciones) | \
+                  (self._datos['cantidad'].to_numpy()[pos] != cantidades)
+        cantidades_anteriores = self._datos['cantidad'].to_numpy()[pos[cambian]]
+        codigos_actualizados = nuevos['codigo'].to_numpy()[existentes][cambian]
+        altas = nuevos[~existentes]
+        self._anotar_originales(altas['codigo'].tolist(), repeat(None))
+        self._anotar_originales(codigos_actualizados.tolist(),
+                                zip(self._datos['descripcion'].iloc[pos[cambian]].fillna("").tolist(),
+                                    cantidades_anteriores.tolist()))
+        if cambian.any():
+            self._datos.iloc[pos[cambian], COLUMNAS.index('descripcion')] = descripciones[cambian]
+            self._datos.iloc[pos[cambian], COLUMNAS.index('cantidad')] = cantidades[cambian]
+
+        # Altas: un único concat para todos los productos nuevos
+        if not altas.empty:
+            inicio = len(self._datos)
+            if self._datos.empty:
+                self._datos = altas.reset_index(drop=True)
+            else:
+                self._datos = pd.concat([self._datos, altas], ignore_index=True)
+            self._indice.update(zip(altas['codigo'], range(inicio, inicio + len(altas))))
+
+        resultado = {
+            "agregados": len(altas),
+            "actualizados": int(cambian.sum()),
+            "sin_cambios": int((~cambian).sum()),
+        }
+
+        cambios = resultado["agregados"] + resultado["actualizados"]
+        if self.diario.entradas + len(self._sin_guardar) + cambios > DIARIO_MAX_ENTRADAS:
+            # Cambio grande: sale más barato reescribir el archivo que anotar cada fila
+            self._compactar = True
+            self._sin_guardar = []
+        elif cambios:
+            self._registrar_operaciones(
+                [["u", c, d, q] for c, d, q in zip(altas['codigo'].tolist(), altas['descripcion'].tolist(),
+                                                   altas['cantidad'].tolist())] +
+                [["u", c, d, q] for c, d, q in zip(codigos_actualizados.tolist(), descripciones[cambian].tolist(),
+                                                   cantidades[cambian].tolist())])
+
+        if self._stock is not None:
+            if resultado["agregados"] + resultado["actualizados"] > len(self._stock) // 10:
+                # Con muchos cambios sale más barato reconstruir el índice cuando se necesite
+                self._stock = None
+            else:
+                for codigo, cantidad in zip(altas['codigo'], altas['cantidad']):
+                    self._stock.actualizar(codigo, cantidad)
+                for codigo, cantidad in zip(codigos_actualizados, cantidades[cambian]):
+                    self._stock.actualizar(codigo, cantidad)
+
+        # Registrar en el historial con una sola escritura para toda la importación
+        usuario = self.usuario_actual or "Sistema"
+        with registro_por_lotes():
+            for codigo, descripcion, cantidad in altas.itertuples(index=False):
+                log_change(
+                    usuario=usuario,
+                    accion="Producto Agregado",
+                    detalles=f"Código: {codigo}, Descripción: {descripcion}, Cantidad: {cantidad}"
+                )
+            for codigo, anterior, cantidad in zip(codigos_actualizados, cantidades_anteriores, cantidades[cambian]):
+                log_change(
+                    usuario=usuario,
+                    accion="Cantidad Actualizada",
+                    detalles=f"Código: {codigo}, Cantidad Anterior: {anterior}, Cantidad Nueva: {cantidad}"
+                )
+            log_change(
+                usuario=usuario,
+                accion="Importación Masiva",
+                detalles=(f"Productos agregados: {resultado['agregados']}, "
+                          f"Productos actualizados: {resultado['actualizados']}, "
+                          f"Sin cambios: {resultado['sin_cambios']}")
+            )
+        if resultado["agregados"] or resultado["actualizados"]:
+            self._notificar("importado", list(altas['codigo']) + list(codigos_actualizados))
+        return resultado
+
+    @medido("inventario.eliminar")
     def eliminar_producto(self, codigo: str):
         """Elimina un producto del inventario por su código."""
         codigo = str(codigo).strip()
-        mascara = self._datos['codigo'].astype(str).str.strip() == codigo
-        indice = self._datos[mascara].index
+        posicion = self._indice.pop(codigo, None)
         
-        if not indice.empty:
+        if posicion is not None:
             # NUEVO: Obtener detalles antes de eliminar
-            producto_a_eliminar = self._datos.loc[indice[0]]
-            detalles = f"Código: {producto_a_eliminar['codigo']}, Descripción: {producto_a_eliminar['descripcion']}, Cantidad: {producto_a_eliminar['cantidad']}"
+            codigo_fila, descripcion, cantidad = self._leer_fila(posicion)
+            detalles = f"Código: {codigo_fila}, Descripción: {descripcion}, Cantidad: {cantidad}"
+            self._originales.setdefault(codigo, (descripcion if isinstance(descripcion, str) else "", int(cantidad)))
             
-            self._datos.drop(indice, inplace=True)
+            self._eliminados.add(posicion)
+            self._registrar_operaciones([["d", codigo]])
+            if self._stock is not None:
+                self._stock.eliminar(codigo)
             print(f"Producto '{codigo}' eliminado.")
             
             # NUEVO: Registrar en el historial
@@ -105,26 +649,107 @@ class Inventario:
                 accion="Producto Eliminado",
                 detalles=detalles
             )
+            self._notificar("eliminado", [codigo])
             return True
         else:
             print(f"Error: Producto con código '{codigo}' no encontrado.")
             return False
 
-    def obtener_todos_los_productos(self) -> list[Producto]:
-        """Devuelve una lista de objetos Producto."""
-        productos = []
-        for _, row in self._datos.iterrows():
-            productos.append(Producto(row['codigo'], row['descripcion'], row['cantidad']))
-        return productos
+    def obtener_todos_los_productos(self) -> ColeccionProductos:
+        """Devuelve todos los productos como una secuencia de objetos Producto."""
+        return ColeccionProductos.desde_dataframe(self.obtener_dataframe())
 
+    @medido("inventario.obtener_dataframe")
     def obtener_dataframe(self) -> pd.DataFrame:
         """Devuelve el DataFrame completo para mostrarlo en tablas."""
+        self._sincronizar()
         return self._datos
 
-    def obtener_productos_stock_bajo(self, limite: int = 50) -> list[Producto]:
-        """Devuelve una lista de productos con stock por debajo del límite especificado."""
-        df_filtrado = self._datos[self._datos['cantidad'] < limite]
-        productos = []
-        for _, row in df_filtrado.iterrows():
-            productos.append(Producto(row['codigo'], row['descripcion'], row['cantidad']))
-        return productos
\ No newline at end of file
+    @medido("inventario.resumen")
+    def obtener_resumen(self, limite: int = 50) -> dict:
+        """Devuelve el total de productos, de unidades y de productos con stock bajo."""
+        df = self.obtener_dataframe()
+        if self._stock is not None:
+            productos_stock_bajo = self._stock.contar_menores(limite)
+        else:
+            # Sin índice aún, contar por columnas es más barato que construirlo solo para esto
+            productos_stock_bajo = int((df['cantidad'] < limite).sum())
+        return {
+            "total_productos": len(df),
+            "total_unidades": int(df['cantidad'].sum()),
+            "productos_stock_bajo": productos_stock_bajo,
+        }
+
+    @medido("inventario.stock_bajo")
+    def obtener_dataframe_stock_bajo(self, limite: int = 50) -> pd.DataFrame:
+        """
+        Devuelve un DataFrame con los productos cuyo stock está por debajo del
+        límite, en el orden del inventario. Se resuelve con una consulta por
+        rango sobre el índice de cantidades, sin recorrer todo el inventario.
+        """
+        codigos = self._indice_stock().codigos_menores(limite)
+        self._sincronizar()
+        posiciones = np.sort(np.fromiter((self._indice[c] for c in codigos), dtype=np.int64, count=len(codigos)))
+        return self._datos.iloc[posiciones].reset_index(drop=True)
+
+    def obtener_productos_stock_bajo(self, limite: int = 50) -> ColeccionProductos:
+        """Devuelve los productos con stock por debajo del límite especificado."""
+        return ColeccionProductos.desde_dataframe(self.obtener_dataframe_stock_bajo(limite))
+
+# Instancia única compartida por todas las vistas del proceso
+_inventario_compartido = None
+_cerrojo_inventario = threading.Lock()
+
+def obtener_inventario_compartido() -> Inventario:
+    """
+    Devuelve el inventario compartido por todo el proceso, cargándolo la
+    primera vez. Así el archivo se lee una sola vez y todas las vistas ven
+    los mismos datos. El ajuste 'inventario_backend' elige entre el archivo
+    ("archivo", por defecto), la base de datos SQLite ("sqlite") y un
+    servidor.py en 'servidor_url' ("remoto").
+    Puede llamarse desde el hilo de precarga: si la carga ya está en curso,
+    se espera a que termine en lugar de leer el archivo otra vez.
+    """
+    global _inventario_compartido
+    if _inventario_compartido is None:
+        with _cerrojo_inventario:
+            if _inventario_compartido is None:
+                if get_setting("inventario_backend") == "sqlite":
+                    from models_sqlite import InventarioSQLite
+                    _inventario_compartido = InventarioSQLite()
+                elif get_setting("inventario_backend") == "remoto":
+                    from models_remoto import InventarioRemoto
+                    _inventario_compartido = InventarioRemoto()
+                else:
+                    _inventario_compartido = Inventario()
+    return _inventario_compartido
+
+def detectar_cambios_externos() -> bool:
+    """
+    Como comprobar_cambios_externos(), pero solo indica si hay cambios, sin
+    incorporarlos ni avisar a nadie. Puede llamarse desde cualquier hilo: con
+    el backend remoto hace una petición al servidor.
+    """
+    inventario = _inventario_compartido
+    if inventario is None or not hasattr(inventario, "detectar_cambios"):
+        return False
+    try:
+        return inventario.detectar_cambios()
+    except Exception as e:
+        print(f"Error al comprobar cambios del inventario: {e}")
+        return False
+
+def comprobar_cambios_externos() -> bool:
+    """
+    Si el inventario compartido ya está cargado y puede detectar cambios hechos
+    desde fuera de este proceso, los comprueba y avisa a sus suscriptores.
+    Devuelve True si había cambios.
+    """
+    inventario = _inventario_compartido
+    if inventario is None or not hasattr(inventario, "comprobar_cambios"):
+        return False
+    try:
+        return inventario.comprobar_cambios()
+    except Exception as e:
+        print(f"Error al comprobar cambios del inventario: {e}")
+        return False
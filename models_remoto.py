@@ -0,0 +1,319 @@
+# models_remoto.py
+
+import gzip
+import json
+import threading
+import http.client
+from collections import OrderedDict
+from urllib.parse import urlsplit, quote, urlencode
+import pandas as pd
+from almacenamiento import COLUMNAS, normalizar_tipos, dataframe_vacio
+from models import ColeccionProductos, Producto, normalizar_importacion
+from config import get_setting
+from rendimiento import medido
+
+# Segundos máximos de espera por una respuesta del servidor
+TIEMPO_ESPERA_S = 30
+# Espera máxima al consultar periódicamente la versión (un servidor caído no debe retener la comprobación)
+TIEMPO_ESPERA_VERSION_S = 3
+# Filas por petición al fusionar un DataFrame grande
+FILAS_POR_ENVIO = 50000
+# Respuestas distintas (p. ej. términos de búsqueda) que se guardan en la caché
+MAX_RESPUESTAS_CACHE = 16
+
+class ErrorServidor(Exception):
+    """El servidor del inventario respondió con un error o no se pudo contactar."""
+    pass
+
+class ClienteHTTP:
+    """
+    Conexiones HTTP/1.1 persistentes (keep-alive) con el servidor del inventario,
+    una por hilo. Guarda la última respuesta de cada consulta con su ETag: si
+    los datos no cambiaron, el servidor responde 304 y se reutiliza la copia.
+    La caché guarda como mucho MAX_RESPUESTAS_CACHE respuestas (las usadas más
+    recientemente), y al llegar una versión nueva se descartan las de las
+    anteriores, que ya no podrían reutilizarse.
+    """
+    def __init__(self, url: str, token: str = "", usuario=None):
+        partes = urlsplit(url)
+        self.host = partes.hostname or "127.0.0.1"
+        self.puerto = partes.port or 80
+        self.token = token
+        self.usuario = usuario
+        self._local = threading.local()
+        self._cache = OrderedDict()   # ruta -> (etag, datos), de la menos a la más usada
+        self._cerrojo = threading.Lock()
+        # Última (instancia, versión) de los datos vista en el servidor; la
+        # instancia cambia si el servidor se reinicia, y con ella la numeración
+        self.version_servidor = None
+
+    def _conexion(self) -> http.client.HTTPConnection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=TIEMPO_ESPERA_S)
+            self._local.conexion = conexion
+        return conexion
+
+    def _cerrar(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is not None:
+            conexion.close()
+            self._local.conexion = None
+
+    def peticion(self, metodo: str, ruta: str, datos=None, usar_cache: bool = False, convertir=None,
+                 tiempo_espera: float = TIEMPO_ESPERA_S):
+        """
+        Envía la petición y devuelve el JSON de la respuesta, pasado por
+        convertir() si se indica (reintenta una vez si la conexión se cerró).
+        Con usar_cache, se guarda el resultado ya convertido y se reutiliza
+        mientras el servidor responda 304.
+        """
+        cabeceras = {"Accept-Encoding": "gzip"}
+        if self.token:
+            cabeceras["Authorization"] = f"Bearer {self.token}"
+        if self.usuario:
+            cabeceras["X-Usuario"] = quote(str(self.usuario), safe=" ()")
+        cuerpo = None
+        if datos is not None:
+            cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+            cabeceras["Content-Type"] = "application/json; charset=utf-8"
+        en_cache = None
+        if usar_cache:
+            with self._cerrojo:
+                en_cache = self._cache.get(ruta)
+        if en_cache is not None:
+            cabeceras["If-None-Match"] = en_cache[0]
+
+        for intento in range(2):
+            conexion = self._conexion()
+            conexion.timeout = tiempo_espera
+            if conexion.sock is not None:
+                conexion.sock.settimeout(tiempo_espera)
+            try:
+                conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+                respuesta = conexion.getresponse()
+                contenido = respuesta.read()
+                break
+            except (http.client.HTTPException, ConnectionError, OSError) as e:
+                # El servidor puede cerrar una conexión inactiva; se abre otra y se reintenta
+                self._cerrar()
+                if intento:
+                    raise ErrorServidor(f"No se pudo contactar con el servidor del inventario: {e}")
+
+        version = respuesta.getheader("X-Version")
+        if version is not None:
+            self.version_servidor = (respuesta.getheader("X-Instancia"), int(version))
+        if respuesta.status == 304 and en_cache is not None:
+            with self._cerrojo:
+                if ruta in self._cache:
+                    self._cache.move_to_end(ruta)
+            return en_cache[1]
+        if respuesta.getheader("Content-Encoding") == "gzip":
+            contenido = gzip.decompress(contenido)
+        resultado = json.loads(contenido) if contenido else {}
+        if respuesta.status >= 400:
+            raise ErrorServidor(resultado.get("error", f"Error {respuesta.status} del servidor."))
+        if convertir is not None:
+            resultado = convertir(resultado)
+        etag = respuesta.getheader("ETag")
+        if usar_cache and etag:
+            with self._cerrojo:
+                for anterior in [r for r, (e, _) in self._cache.items() if e != etag]:
+                    del self._cache[anterior]
+                self._cache[ruta] = (etag, resultado)
+                self._cache.move_to_end(ruta)
+                while len(self._cache) > MAX_RESPUESTAS_CACHE:
+                    self._cache.popitem(last=False)
+        return resultado
+
+def _dataframe(columnas: dict) -> pd.DataFrame:
+    """Convierte una lista de productos por columnas (formato de la API) en DataFrame."""
+    if not columnas.get("codigo"):
+        return dataframe_vacio()
+    return normalizar_tipos(pd.DataFrame({columna: columnas[columna] for columna in COLUMNAS}))
+
+class InventarioRemoto:
+    """
+    Inventario servido por servidor.py, con la misma interfaz pública que
+    models.Inventario. Cada consulta es una petición al servidor, que es quien
+    guarda los datos; las respuestas se reutilizan mientras la versión de los
+    datos no cambie. detectar_cambios() pregunta al servidor si otro puesto
+    cambió algo, y comprobar_cambios() avisa entonces a las vistas para que
+    se refresquen. ``version`` es local, como en
+    los otros inventarios: sube con cada aviso a los suscriptores.
+    """
+    def __init__(self, usuario_actual=None, url=None, token=None):
+        self._cliente = ClienteHTTP(url or get_setting("servidor_url"),
+                                    token if token is not None else (get_setting("servidor_token") or ""))
+        self.usuario_actual = usuario_actual
+        self._suscriptores = []
+        self.buscador = BuscadorRemoto(self)
+        self._cliente.peticion("GET", "/version")
+        self.version = 0
+        self._version_vista = self._cliente.version_servidor  # Versión del servidor del último aviso
+
+    @property
+    def usuario_actual(self):
+        return self._cliente.usuario
+
+    @usuario_actual.setter
+    def usuario_actual(self, usuario):
+        self._cliente.usuario = usuario
+
+    # --- Notificaciones (misma interfaz que models.Inventario) ---
+
+    def suscribir(self, callback):
+        """Registra un callback que se llamará como callback(evento, codigos) tras cada cambio."""
+        if callback not in self._suscriptores:
+            self._suscriptores.append(callback)
+
+    def cancelar_suscripcion(self, callback):
+        """Deja de notificar al callback indicado."""
+        if callback in self._suscriptores:
+            self._suscriptores.remove(callback)
+
+    def _notificar(self, evento: str, codigos: list):
+        """Incrementa la versión, anota la del servidor y avisa a todos los suscriptores de un cambio."""
+        self.version += 1
+        self._version_vista = self._cliente.version_servidor
+        for callback in list(self._suscriptores):
+            try:
+                callback(evento, codigos)
+            except Exception as e:
+                print(f"Error al notificar un cambio del inventario: {e}")
+
+    def detectar_cambios(self) -> bool:
+        """
+        Consulta la versión del servidor (con una espera corta) e indica si
+        cambió desde el último aviso. Puede llamarse desde otro hilo.
+        """
+        self._cliente.peticion("GET", "/version", tiempo_espera=TIEMPO_ESPERA_VERSION_S)
+        return self._cliente.version_servidor != self._version_vista
+
+    def comprobar_cambios(self) -> bool:
+        """
+        Avisa a los suscriptores si la última versión recibida del servidor (en
+        detectar_cambios() o en cualquier otra respuesta) no es la del último
+        aviso. No hace ninguna petición: no bloquea la interfaz.
+        """
+        if self._cliente.version_servidor != self._version_vista:
+            self._notificar("remoto", [])
+            return True
+        return False
+
+    # --- Operaciones ---
+
+    @medido("inventario.guardar")
+    def guardar_datos(self):
+        """El servidor guarda cada cambio al recibirlo; no hay nada pendiente."""
+
+    def exportar_csv(self, ruta: str):
+        """Exporta el inventario completo a un archivo CSV."""
+        self.obtener_dataframe().to_csv(ruta, index=False)
+
+    def existe_producto(self, codigo: str) -> bool:
+        """Indica si existe un producto con el código dado."""
+        return self.obtener_producto(codigo) is not None
+
+    def obtener_producto(self, codigo: str):
+        """Devuelve el Producto con el código dado, o None si no existe."""
+        try:
+            datos = self._cliente.peticion("GET", f"/productos/{quote(str(codigo).strip(), safe='')}")
+        except ErrorServidor:
+            return None
+        return Producto(datos["codigo"], datos["descripcion"], datos["cantidad"])
+
+    @medido("inventario.buscar")
+    def buscar(self, termino: str) -> pd.DataFrame:
+        """Devuelve los productos cuyo código o descripción contienen el término (sin distinguir mayúsculas)."""
+        return self._cliente.peticion("GET", "/buscar?" + urlencode({"q": termino}), usar_cache=True, convertir=_dataframe)
+
+    @medido("inventario.agregar_o_actualizar")
+    def agregar_o_actualizar_producto(self, codigo: str, descripcion: str, cantidad: int):
+        """Agrega un nuevo producto o reemplaza la cantidad y descripción de uno existente."""
+        codigo = str(codigo).strip()
+        if not codigo:
+            print("Advertencia: Se intentó agregar un producto con código vacío. Ignorando.")
+            return
+        self._cliente.peticion("PUT", f"/productos/{quote(codigo, safe='')}",
+                               {"descripcion": str(descripcion).strip(), "cantidad": int(cantidad)})
+        self._notificar("actualizado", [codigo])
+
+    @medido("inventario.merge")
+    def merge_dataframe(self, df: pd.DataFrame) -> dict:
+        """
+        Agrega o actualiza en bloque todos los productos de un DataFrame, en
+        peticiones de como mucho FILAS_POR_ENVIO filas.
+
+        Returns:
+            dict: Conteo con las claves 'agregados', 'actualizados' y 'sin_cambios'.
+        """
+        nuevos = normalizar_importacion(df)
+        resultado = {"agregados": 0, "actualizados": 0, "sin_cambios": 0}
+        for inicio in range(0, len(nuevos), FILAS_POR_ENVIO):
+            bloque = nuevos.iloc[inicio:inicio + FILAS_POR_ENVIO]
+            respuesta = self._cliente.peticion("POST", "/productos", {
+                "codigo": bloque['codigo'].tolist(),
+                "descripcion": bloque['descripcion'].tolist(),
+                "cantidad": [int(c) for c in bloque['cantidad'].tolist()],
+            })
+            for clave in resultado:
+                resultado[clave] += respuesta.get(clave, 0)
+        if resultado["agregados"] or resultado["actualizados"]:
+            self._notificar("importado", list(nuevos['codigo']))
+        return resultado
+
+    @medido("inventario.eliminar")
+    def eliminar_producto(self, codigo: str):
+        """Elimina un producto del inventario por su código."""
+        codigo = str(codigo).strip()
+        try:
+            self._cliente.peticion("DELETE", f"/productos/{quote(codigo, safe='')}")
+        except ErrorServidor as e:
+            print(f"Error: {e}")
+            return False
+        self._notificar("eliminado", [codigo])
+        return True
+
+    def obtener_todos_los_productos(self) -> ColeccionProductos:
+        """Devuelve todos los productos como una secuencia de objetos Producto."""
+        return ColeccionProductos.desde_dataframe(self.obtener_dataframe())
+
+    @medido("inventario.obtener_dataframe")
+    def obtener_dataframe(self) -> pd.DataFrame:
+        """Devuelve el inventario completo (la copia local se reutiliza mientras no cambie en el servidor)."""
+        return self._cliente.peticion("GET", "/productos", usar_cache=True, convertir=_dataframe)
+
+    @medido("inventario.resumen")
+    def obtener_resumen(self, limite: int = 50) -> dict:
+        """Devuelve los totales del inventario calculados en el servidor."""
+        return self._cliente.peticion("GET", f"/resumen?limite={int(limite)}", usar_cache=True)
+
+    @medido("inventario.stock_bajo")
+    def obtener_dataframe_stock_bajo(self, limite: int = 50) -> pd.DataFrame:
+        """Devuelve un DataFrame con los productos por debajo del límite."""
+        return self._cliente.peticion("GET", f"/stock-bajo?limite={int(limite)}", usar_cache=True, convertir=_dataframe)
+
+    def obtener_productos_stock_bajo(self, limite: int = 50) -> ColeccionProductos:
+        """Devuelve los productos con stock por debajo del límite especificado."""
+        return ColeccionProductos.desde_dataframe(self.obtener_dataframe_stock_bajo(limite))
+
+class BuscadorRemoto:
+    """Búsqueda resuelta en el servidor (en una sola petición)."""
+    def __init__(self, inventario):
+        self.inventario = inventario
+
+    def buscar_incremental(self, termino: str, filas_por_paso: int = None):
+        """
+        Generador con la misma interfaz que busqueda.BuscadorInventario.buscar_incremental:
+        cede el control una vez a la interfaz y devuelve (StopIteration.value) el DataFrame resultado.
+        """
+        yield
+        termino = termino.strip()
+        if not termino:
+            return self.inventario.obtener_dataframe()
+        return self.inventario.buscar(termino)
+
+    def buscar(self, termino: str) -> pd.DataFrame:
+        termino = termino.strip()
+        return self.inventario.buscar(termino) if termino else self.inventario.obtener_dataframe()
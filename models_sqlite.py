@@ -0,0 +1,405 @@
+# models_sqlite.py
+
+from collections import OrderedDict
+import pandas as pd
+from utils import INVENTARIO_DB
+from db import obtener_pool
+from bloqueo import firma_archivo
+from almacenamiento import COLUMNAS, normalizar_tipos, almacenamiento_por_defecto, AlmacenamientoCSV
+from log import log_change, registro_por_lotes
+from models import Inventario, ColeccionProductos, Producto, normalizar_importacion
+from rendimiento import medido, contar
+
+# Filas examinadas por cada paso de una búsqueda incremental
+FILAS_POR_PASO = 25000
+# Filas de cada página de la vista paginada y páginas que conserva en memoria
+FILAS_POR_PAGINA = 500
+MAX_PAGINAS_CACHE = 8
+
+def texto_busqueda(codigo: str, descripcion: str) -> str:
+    """
+    Texto en el que se busca un producto: "codigo\x00descripcion" en minúsculas,
+    igual que en busqueda.BuscadorInventario. Se pasa a minúsculas en Python
+    porque LOWER() y LIKE de SQLite solo entienden las letras ASCII (no la Ñ ni las tildes).
+    """
+    return f"{codigo}\x00{descripcion}".lower()
+
+def _crear_tabla(conn):
+    """Crea la tabla de productos y sus índices si no existen (una vez por proceso)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS productos (
+            codigo TEXT PRIMARY KEY,
+            descripcion TEXT NOT NULL DEFAULT '',
+            cantidad INTEGER NOT NULL DEFAULT 0,
+            busqueda TEXT NOT NULL DEFAULT ''
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_cantidad ON productos (cantidad)")
+    columnas = [fila[1] for fila in conn.execute("PRAGMA table_info(productos)")]
+    if "busqueda" not in columnas:
+        # Bases de datos creadas antes de existir la columna de búsqueda
+        conn.execute("ALTER TABLE productos ADD COLUMN busqueda TEXT NOT NULL DEFAULT ''")
+        conn.create_function("texto_busqueda", 2, texto_busqueda, deterministic=True)
+        conn.execute("UPDATE productos SET busqueda = texto_busqueda(codigo, descripcion)")
+
+class InventarioSQLite:
+    """
+    Inventario guardado en SQLite, con la misma interfaz pública que models.Inventario.
+    Cada alta, cambio o baja es una transacción sobre una sola fila, y las
+    consultas de stock bajo y de búsqueda se resuelven en la base de datos, sin
+    necesidad de tener todo el catálogo en memoria.
+    SQLite ya coordina a varios procesos sobre el mismo archivo; como cada
+    consulta lee la base de datos, comprobar_cambios() solo tiene que avisar
+    a las vistas cuando otro proceso escribió (lo delata el archivo -wal).
+    """
+    def __init__(self, usuario_actual=None, ruta=INVENTARIO_DB, migrar_desde=None):
+        self.usuario_actual = usuario_actual
+        self.ruta = ruta
+        self._suscriptores = []
+        self.version = 0
+        self.buscador = BuscadorSQLite(self)
+        self._pool = obtener_pool(ruta, inicializar=_crear_tabla)
+        self._migrar_si_vacio(migrar_desde if migrar_desde is not None else almacenamiento_por_defecto())
+        self._firma_vista = self._firmas()
+
+    def _migrar_si_vacio(self, origen):
+        """
+        La primera vez, copia a la BD el inventario guardado en archivo. No basta
+        con mirar si existe el origen: Feather migra antes el CSV antiguo si es
+        lo único que hay, así que se carga siempre y se omite solo si está vacío.
+        Se carga a través de models.Inventario, que lee el archivo y su diario
+        con el bloqueo tomado: el archivo solo no tiene los cambios sin compactar.
+        """
+        with self._pool.conexion() as conn:
+            if conn.execute("SELECT 1 FROM productos LIMIT 1").fetchone():
+                return
+            df = Inventario(almacenamiento=origen).obtener_dataframe()
+            if df.empty:
+                return
+            codigos = df['codigo'].str.strip()
+            descripciones = df['descripcion'].fillna('')
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO productos (codigo, descripcion, cantidad, busqueda) VALUES (?, ?, ?, ?)",
+                    zip(codigos, descripciones, df['cantidad'].astype(int).tolist(),
+                        (codigos + "\x00" + descripciones).str.lower())
+                )
+        print(f"Inventario migrado de '{origen.ruta}' a '{self.ruta}'.")
+
+    # --- Notificaciones (misma interfaz que models.Inventario) ---
+
+    def suscribir(self, callback):
+        """Registra un callback que se llamará como callback(evento, codigos) tras cada cambio."""
+        if callback not in self._suscriptores:
+            self._suscriptores.append(callback)
+
+    def cancelar_suscripcion(self, callback):
+        """Deja de notificar al callback indicado."""
+        if callback in self._suscriptores:
+            self._suscriptores.remove(callback)
+
+    def _notificar(self, evento: str, codigos: list):
+        """Incrementa la versión de los datos y avisa a todos los suscriptores de un cambio."""
+        self.version += 1
+        self._firma_vista = self._firmas()
+        for callback in list(self._suscriptores):
+            try:
+                callback(evento, codigos)
+            except Exception as e:
+                print(f"Error al notificar un cambio del inventario: {e}")
+
+    def _firmas(self) -> tuple:
+        return firma_archivo(self.ruta), firma_archivo(self.ruta + "-wal")
+
+    def detectar_cambios(self) -> bool:
+        """Indica si otro proceso escribió en la base de datos desde el último aviso (seguro desde otro hilo)."""
+        return self._firmas() != self._firma_vista
+
+    def comprobar_cambios(self) -> bool:
+        """Avisa a los suscriptores con el evento 'externo' si otro proceso escribió en la base de datos."""
+        if not self.detectar_cambios():
+            return False
+        self._notificar("externo", [])
+        return True
+
+    # --- Operaciones ---
+
+    @medido("inventario.guardar")
+    def guardar_datos(self):
+        """Cada operación ya se confirma en su propia transacción; no hay nada pendiente."""
+
+    def exportar_csv(self, ruta: str):
+        """Exporta el inventario completo a un archivo CSV."""
+        AlmacenamientoCSV(ruta).guardar(self.obtener_dataframe())
+
+    def existe_producto(self, codigo: str) -> bool:
+        """Indica si existe un producto con el código dado."""
+        with self._pool.conexion() as conn:
+            fila = conn.execute("SELECT 1 FROM productos WHERE codigo = ?", (str(codigo).strip(),)).fetchone()
+        return fila is not None
+
+    def obtener_producto(self, codigo: str):
+        """Devuelve el Producto con el código dado, o None si no existe."""
+        with self._pool.conexion() as conn:
+            fila = conn.execute("SELECT codigo, descripcion, cantidad FROM productos WHERE codigo = ?",
+                                (str(codigo).strip(),)).fetchone()
+        return Producto(*fila) if fila else None
+
+    @medido("inventario.buscar")
+    def buscar(self, termino: str) -> pd.DataFrame:
+        """Devuelve los productos cuyo código o descripción contienen el término (sin distinguir mayúsculas)."""
+        return self.buscador.buscar(termino)
+
+    @medido("inventario.agregar_o_actualizar")
+    def agregar_o_actualizar_producto(self, codigo: str, descripcion: str, cantidad: int):
+        """
+        Agrega un nuevo producto o actualiza la cantidad y descripción de uno existente.
+        Si el producto ya existe, su cantidad y descripción son REEMPLAZADAS por los nuevos valores.
+        """
+        codigo = str(codigo).strip()
+        descripcion = str(descripcion).strip()
+        cantidad = int(cantidad)
+
+        if not codigo:
+            print("Advertencia: Se intentó agregar un producto con código vacío. Ignorando.")
+            return
+
+        with self._pool.conexion() as conn, conn:
+            anterior = conn.execute("SELECT cantidad FROM productos WHERE codigo = ?", (codigo,)).fetchone()
+            conn.execute('''
+                INSERT INTO productos (codigo, descripcion, cantidad, busqueda) VALUES (?, ?, ?, ?)
+                ON CONFLICT (codigo) DO UPDATE SET descripcion = excluded.descripcion, cantidad = excluded.cantidad,
+                                                   busqueda = excluded.busqueda
+            ''', (codigo, descripcion, cantidad, texto_busqueda(codigo, descripcion)))
+
+        if anterior is None:
+            print(f"Producto '{codigo}' agregado.")
+            log_change(
+                usuario=self.usuario_actual or "Sistema",
+                accion="Producto Agregado",
+                detalles=f"Código: {codigo}, Descripción: {descripcion}, Cantidad: {cantidad}"
+            )
+            self._notificar("agregado", [codigo])
+        else:
+            print(f"Producto '{codigo}' actualizado.")
+            log_change(
+                usuario=self.usuario_actual or "Sistema",
+                accion="Cantidad Actualizada",
+                detalles=f"Código: {codigo}, Cantidad Anterior: {anterior[0]}, Cantidad Nueva: {cantidad}"
+            )
+            self._notificar("actualizado", [codigo])
+
+    @medido("inventario.merge")
+    def merge_dataframe(self, df: pd.DataFrame) -> dict:
+        """
+        Agrega o actualiza en bloque todos los productos de un DataFrame dentro de
+        una sola transacción.
+
+        Returns:
+            dict: Conteo con las claves 'agregados', 'actualizados' y 'sin_cambios'.
+        """
+        nuevos = normalizar_importacion(df)
+        contar("inventario.filas_fusionadas", len(nuevos))
+        with self._pool.conexion() as conn, conn:
+            conn.execute("DROP TABLE IF EXISTS temp.importacion")
+            conn.execute("CREATE TEMP TABLE importacion "
+                         "(codigo TEXT PRIMARY KEY, descripcion TEXT, cantidad INTEGER, busqueda TEXT)")
+            conn.executemany("INSERT INTO temp.importacion VALUES (?, ?, ?, ?)",
+                             zip(nuevos['codigo'], nuevos['descripcion'], nuevos['cantidad'].tolist(),
+                                 (nuevos['codigo'] + "\x00" + nuevos['descripcion']).str.lower()))
+            altas = conn.execute('''
+                SELECT i.codigo, i.descripcion, i.cantidad FROM temp.importacion i
+                WHERE NOT EXISTS (SELECT 1 FROM productos p WHERE p.codigo = i.codigo)
+            ''').fetchall()
+            cambios = conn.execute('''
+                SELECT i.codigo, p.cantidad, i.cantidad FROM temp.importacion i
+                JOIN productos p ON p.codigo = i.codigo
+                WHERE p.descripcion IS NOT i.descripcion OR p.cantidad IS NOT i.cantidad
+            ''').fetchall()
+            conn.execute('''
+                INSERT INTO productos (codigo, descripcion, cantidad, busqueda)
+                SELECT codigo, descripcion, cantidad, busqueda FROM temp.importacion WHERE true
+                ON CONFLICT (codigo) DO UPDATE SET descripcion = excluded.descripcion, cantidad = excluded.cantidad,
+                                                   busqueda = excluded.busqueda
+                WHERE productos.descripcion IS NOT excluded.descripcion OR productos.cantidad IS NOT excluded.cantidad
+            ''')
+            conn.execute("DROP TABLE temp.importacion")
+
+        resultado = {
+            "agregados": len(altas),
+            "actualizados": len(cambios),
+            "sin_cambios": len(nuevos) - len(altas) - len(cambios),
+        }
+
+        usuario = self.usuario_actual or "Sistema"
+        with registro_por_lotes():
+            for codigo, descripcion, cantidad in altas:
+                log_change(
+                    usuario=usuario,
+                    accion="Producto Agregado",
+                    detalles=f"Código: {codigo}, Descripción: {descripcion}, Cantidad: {cantidad}"
+                )
+            for codigo, anterior, cantidad in cambios:
+                log_change(
+                    usuario=usuario,
+                    accion="Cantidad Actualizada",
+                    detalles=f"Código: {codigo}, Cantidad Anterior: {anterior}, Cantidad Nueva: {cantidad}"
+                )
+            log_change(
+                usuario=usuario,
+                accion="Importación Masiva",
+                detalles=(f"Productos agregados: {resultado['agregados']}, "
+                          f"Productos actualizados: {resultado['actualizados']}, "
+                          f"Sin cambios: {resultado['sin_cambios']}")
+            )
+        if altas or cambios:
+            self._notificar("importado", [fila[0] for fila in altas] + [fila[0] for fila in cambios])
+        return resultado
+
+    @medido("inventario.eliminar")
+    def eliminar_producto(self, codigo: str):
+        """Elimina un producto del inventario por su código."""
+        codigo = str(codigo).strip()
+        with self._pool.conexion() as conn, conn:
+            fila = conn.execute("SELECT codigo, descripcion, cantidad FROM productos WHERE codigo = ?", (codigo,)).fetchone()
+            if fila is not None:
+                conn.execute("DELETE FROM productos WHERE codigo = ?", (codigo,))
+
+        if fila is not None:
+            print(f"Producto '{codigo}' eliminado.")
+            log_change(
+                usuario=self.usuario_actual or "Sistema",
+                accion="Producto Eliminado",
+                detalles=f"Código: {fila[0]}, Descripción: {fila[1]}, Cantidad: {fila[2]}"
+            )
+            self._notificar("eliminado", [codigo])
+            return True
+        else:
+            print(f"Error: Producto con código '{codigo}' no encontrado.")
+            return False
+
+    # --- Consultas ---
+
+    def _consultar(self, sql: str, parametros=()) -> list:
+        with self._pool.conexion() as conn:
+            return conn.execute(sql, parametros).fetchall()
+
+    def _consultar_dataframe(self, sql: str, parametros=()) -> pd.DataFrame:
+        return normalizar_tipos(pd.DataFrame(self._consultar(sql, parametros), columns=COLUMNAS))
+
+    def obtener_todos_los_productos(self) -> ColeccionProductos:
+        """Devuelve todos los productos como una secuencia de objetos Producto."""
+        return ColeccionProductos.desde_dataframe(self.obtener_dataframe())
+
+    @medido("inventario.obtener_dataframe")
+    def obtener_dataframe(self) -> pd.DataFrame:
+        """Devuelve el DataFrame completo para mostrarlo en tablas."""
+        return self._consultar_dataframe("SELECT codigo, descripcion, cantidad FROM productos ORDER BY rowid")
+
+    def vista_paginada(self) -> "VistaPaginadaSQLite":
+        """Devuelve el inventario completo como una vista que se lee de la BD por páginas (para TablaVirtual)."""
+        return VistaPaginadaSQLite(self)
+
+    @medido("inventario.resumen")
+    def obtener_resumen(self, limite: int = 50) -> dict:
+        """Devuelve el total de productos, de unidades y de productos con stock bajo."""
+        total_productos, total_unidades = self._consultar(
+            "SELECT COUNT(*), COALESCE(SUM(cantidad), 0) FROM productos")[0]
+        productos_stock_bajo = self._consultar(
+            "SELECT COUNT(*) FROM productos WHERE cantidad < ?", (limite,))[0][0]
+        return {
+            "total_productos": total_productos,
+            "total_unidades": total_unidades,
+            "productos_stock_bajo": productos_stock_bajo,
+        }
+
+    @medido("inventario.stock_bajo")
+    def obtener_dataframe_stock_bajo(self, limite: int = 50) -> pd.DataFrame:
+        """Devuelve un DataFrame con los productos por debajo del límite (usa el índice de cantidad)."""
+        return self._consultar_dataframe(
+            "SELECT codigo, descripcion, cantidad FROM productos WHERE cantidad < ? ORDER BY rowid", (limite,))
+
+    def obtener_productos_stock_bajo(self, limite: int = 50) -> ColeccionProductos:
+        """Devuelve los productos con stock por debajo del límite especificado (usa el índice de cantidad)."""
+        return ColeccionProductos.desde_dataframe(self.obtener_dataframe_stock_bajo(limite))
+
+class VistaPaginadaSQLite:
+    """
+    El inventario completo, en orden de rowid, leído de la base de datos por
+    páginas a medida que TablaVirtual pide sus filas (cargar_fuente). Cada
+    página empieza justo después del último rowid de la anterior (keyset), así
+    que desplazarse cuesta una consulta por índice; un salto con la barra de
+    desplazamiento parte de la página conocida más cercana.
+    Es una foto del momento en que se crea: la vista la sustituye en cada cambio.
+    """
+    def __init__(self, inventario, filas_por_pagina: int = FILAS_POR_PAGINA):
+        self.inventario = inventario
+        self.filas_por_pagina = filas_por_pagina
+        self._total = inventario._consultar("SELECT COUNT(*) FROM productos")[0][0]
+        self._inicios = {0: 0}         # página -> primer rowid de la página
+        self._paginas = OrderedDict()  # página -> filas (codigo, descripcion, cantidad), LRU
+
+    def __len__(self):
+        return self._total
+
+    def fila(self, indice: int) -> tuple:
+        """Devuelve los valores de la fila indicada, leyendo su página si no está en memoria."""
+        pagina, posicion = divmod(indice, self.filas_por_pagina)
+        filas = self._paginas.get(pagina)
+        if filas is None:
+            filas = self._paginas[pagina] = self._leer_pagina(pagina)
+            while len(self._paginas) > MAX_PAGINAS_CACHE:
+                self._paginas.popitem(last=False)
+        else:
+            self._paginas.move_to_end(pagina)
+        if posicion >= len(filas):  # Filas borradas después de contarlas
+            return ("", "", "")
+        return filas[posicion]
+
+    @medido("inventario.leer_pagina")
+    def _leer_pagina(self, pagina: int) -> list:
+        conocida = max(p for p in self._inicios if p <= pagina)
+        filas = self.inventario._consultar('''
+            SELECT rowid, codigo, descripcion, cantidad FROM productos
+            WHERE rowid >= ? ORDER BY rowid LIMIT ? OFFSET ?
+        ''', (self._inicios[conocida], self.filas_por_pagina, (pagina - conocida) * self.filas_por_pagina))
+        if filas:
+            self._inicios[pagina] = filas[0][0]
+            self._inicios[pagina + 1] = filas[-1][0] + 1
+        return [fila[1:] for fila in filas]
+
+class BuscadorSQLite:
+    """Búsqueda por código o descripción sobre la columna 'busqueda' (en minúsculas), por tramos de rowid."""
+    def __init__(self, inventario):
+        self.inventario = inventario
+
+    def buscar_incremental(self, termino: str, filas_por_paso: int = FILAS_POR_PASO):
+        """
+        Generador con la misma interfaz que busqueda.BuscadorInventario.buscar_incremental:
+        cede el control entre tramos y devuelve (StopIteration.value) el DataFrame resultado.
+        """
+        termino = termino.strip()
+        if not termino:
+            return self.inventario.obtener_dataframe()
+
+        termino = termino.lower()
+        maximo = self.inventario._consultar("SELECT COALESCE(MAX(rowid), 0) FROM productos")[0][0]
+        filas = []
+        for inicio in range(0, maximo, filas_por_paso):
+            filas.extend(self.inventario._consultar('''
+                SELECT codigo, descripcion, cantidad FROM productos
+                WHERE rowid > ? AND rowid <= ?
+                  AND instr(busqueda, ?) > 0
+                ORDER BY rowid
+            ''', (inicio, inicio + filas_por_paso, termino)))
+            if inicio + filas_por_paso < maximo:
+                yield
+        return normalizar_tipos(pd.DataFrame(filas, columns=COLUMNAS))
+
+    def buscar(self, termino: str) -> pd.DataFrame:
+        busqueda = self.buscar_incremental(termino)
+        while True:
+            try:
+                next(busqueda)
+            except StopIteration as fin:
+                return fin.value
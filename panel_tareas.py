@@ -0,0 +1,79 @@
+# panel_tareas.py
+
+import ttkbootstrap as ttk
+from tareas import lanzar_tarea
+
+class PanelTareas(ttk.Frame):
+    """
+    Muestra una fila con barra de progreso y botón de cancelar por cada tarea
+    en segundo plano. Varias tareas pueden estar activas a la vez; cada fila
+    desaparece cuando su tarea termina. El panel solo ocupa espacio mientras
+    hay tareas en curso.
+    """
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self._filas = {}
+        self._opciones_pack = None
+
+    def pack(self, **kwargs):
+        # Se recuerdan las opciones para mostrar el panel solo cuando hace falta
+        self._opciones_pack = kwargs
+        if self._filas:
+            super().pack(**kwargs)
+
+    def lanzar(self, tarea, al_terminar, al_fallar=None, al_cancelar=None, al_recibir=None):
+        """Ejecuta la tarea en segundo plano mostrando su progreso en el panel."""
+        fila = ttk.Frame(self)
+        fila.pack(fill="x", pady=2)
+        etiqueta = ttk.Label(fila, text=tarea.nombre, width=40)
+        etiqueta.pack(side="left", padx=(0, 5))
+        barra = ttk.Progressbar(fila, mode="indeterminate", bootstyle="INFO-STRIPED")
+        barra.pack(side="left", fill="x", expand=True, padx=5)
+        barra.start(15)
+        boton = ttk.Button(fila, text="Cancelar", bootstyle="DANGER-OUTLINE",
+                           command=lambda: self._cancelar(tarea, boton))
+        boton.pack(side="right")
+        self._filas[tarea] = (fila, etiqueta, barra)
+        if self._opciones_pack is not None and not self.winfo_ismapped():
+            super().pack(**self._opciones_pack)
+
+        def terminar(callback):
+            def envoltura(*args):
+                self._quitar(tarea)
+                if callback is not None:
+                    callback(*args)
+            return envoltura
+
+        lanzar_tarea(self, tarea, terminar(al_terminar), al_fallar=terminar(al_fallar),
+                     al_progresar=self._actualizar, al_cancelar=terminar(al_cancelar),
+                     al_recibir=al_recibir)
+        return tarea
+
+    def cancelar_todas(self):
+        """Pide cancelar todas las tareas en curso."""
+        for tarea in list(self._filas):
+            tarea.cancelar()
+
+    def _cancelar(self, tarea, boton):
+        tarea.cancelar()
+        boton.configure(state="disabled", text="Cancelando...")
+
+    def _actualizar(self, tarea):
+        fila, etiqueta, barra = self._filas[tarea]
+        etiqueta.configure(text=f"{tarea.nombre}: {tarea.mensaje}" if tarea.mensaje else tarea.nombre)
+        if tarea.progreso is None:
+            if str(barra.cget("mode")) != "indeterminate":
+                barra.configure(mode="indeterminate")
+                barra.start(15)
+        else:
+            if str(barra.cget("mode")) != "determinate":
+                barra.stop()
+                barra.configure(mode="determinate", maximum=100)
+            barra.configure(value=tarea.progreso * 100)
+
+    def _quitar(self, tarea):
+        fila, _, barra = self._filas.pop(tarea)
+        barra.stop()
+        fila.destroy()
+        if not self._filas:
+            self.pack_forget()
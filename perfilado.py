@@ -0,0 +1,188 @@
+# perfilado.py
+
+import os
+import io
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from utils import get_data_path
+
+# Si esta variable de entorno está definida, se perfilan todas las operaciones de la ejecución
+VARIABLE_ENTORNO = "INVENTARIO_PERFILAR"
+# Funciones listadas en el informe, por tiempo acumulado
+MAX_FUNCIONES_INFORME = 40
+# Líneas de código listadas en el informe, por memoria asignada
+MAX_LINEAS_MEMORIA = 25
+# Marcos de pila que guarda tracemalloc por cada asignación
+MARCOS_TRACEMALLOC = 10
+
+# Estado del modo de perfilado (compartido por todos los hilos)
+_cerrojo = threading.Lock()
+_pendientes = 0             # Próximas operaciones que se perfilarán
+_permanente = bool(os.environ.get(VARIABLE_ENTORNO))
+_sesion_activa = None
+_suscriptores = []          # Callbacks avisados con la ruta de cada informe guardado
+
+def carpeta_informes() -> str:
+    """Carpeta 'perfiles' junto a la carpeta de datos, donde se guardan los informes."""
+    return os.path.join(os.path.dirname(get_data_path()), "perfiles")
+
+def armar(operaciones: int = 1):
+    """Perfila las próximas 'operaciones' importaciones, exportaciones o búsquedas."""
+    global _pendientes
+    with _cerrojo:
+        _pendientes = max(_pendientes, operaciones)
+
+def desarmar():
+    global _pendientes
+    with _cerrojo:
+        _pendientes = 0
+
+def armado() -> bool:
+    return _permanente or _pendientes > 0
+
+def suscribir(callback):
+    """Registra un callback que se llamará como callback(ruta) al guardar cada informe."""
+    if callback not in _suscriptores:
+        _suscriptores.append(callback)
+
+def cancelar_suscripcion(callback):
+    if callback in _suscriptores:
+        _suscriptores.remove(callback)
+
+class SesionPerfilado:
+    """
+    Perfil de una operación (importación, exportación o búsqueda) con cProfile
+    y tracemalloc. La operación puede repartirse entre varios hilos (el que
+    lee el archivo y el de la interfaz que aplica los datos): cada hilo mide
+    su parte con perfilar() y el informe las suma.
+    """
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._perfiles = []
+        self._cerrojo = threading.Lock()
+        self._inicio = time.perf_counter()
+        self._fecha = datetime.now()
+        self._detener_tracemalloc = not tracemalloc.is_tracing()
+        if self._detener_tracemalloc:
+            tracemalloc.start(MARCOS_TRACEMALLOC)
+        tracemalloc.reset_peak()
+        self._instantanea_inicial = tracemalloc.take_snapshot()
+
+    @contextmanager
+    def perfilar(self):
+        """Perfila con cProfile el bloque, en el hilo actual."""
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Algunas versiones de Python solo admiten un perfilador activo a la vez
+            yield
+            return
+        try:
+            yield
+        finally:
+            perfil.disable()
+            with self._cerrojo:
+                self._perfiles.append(perfil)
+
+    def terminar(self) -> str:
+        """Detiene la medición de memoria y guarda el informe. Devuelve la ruta del informe."""
+        duracion = time.perf_counter() - self._inicio
+        _, pico = tracemalloc.get_traced_memory()
+        diferencias = tracemalloc.take_snapshot().compare_to(self._instantanea_inicial, "lineno")
+        if self._detener_tracemalloc:
+            tracemalloc.stop()
+
+        carpeta = carpeta_informes()
+        os.makedirs(carpeta, exist_ok=True)
+        base = os.path.join(carpeta, f"perfil_{self._fecha:%Y%m%d_%H%M%S}_{_nombre_archivo(self.nombre)}")
+
+        texto = io.StringIO()
+        texto.write(f"Operación: {self.nombre}\n")
+        texto.write(f"Fecha: {self._fecha:%Y-%m-%d %H:%M:%S}\n")
+        texto.write(f"Duración: {duracion:.3f} s\n")
+        texto.write(f"Memoria máxima durante la operación: {pico / 1024 / 1024:.1f} MB\n")
+        texto.write(f"Python {sys.version.split()[0]} en {sys.platform}\n\n")
+
+        with self._cerrojo:
+            perfiles = list(self._perfiles)
+        if perfiles:
+            estadisticas = pstats.Stats(perfiles[0], stream=texto)
+            for perfil in perfiles[1:]:
+                estadisticas.add(perfil)
+            estadisticas.dump_stats(base + ".prof")
+            texto.write("=== Funciones por tiempo acumulado ===\n")
+            estadisticas.sort_stats("cumulative").print_stats(MAX_FUNCIONES_INFORME)
+            texto.write("=== Funciones por tiempo propio ===\n")
+            estadisticas.sort_stats("tottime").print_stats(MAX_FUNCIONES_INFORME // 2)
+        else:
+            texto.write("No se pudo perfilar el tiempo de CPU (otro perfilador estaba activo).\n\n")
+
+        texto.write("=== Memoria: líneas que más memoria retienen al terminar ===\n")
+        for diferencia in diferencias[:MAX_LINEAS_MEMORIA]:
+            texto.write(f"{diferencia}\n")
+
+        ruta = base + ".txt"
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(texto.getvalue())
+        return ruta
+
+def _nombre_archivo(nombre: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in nombre.lower()).strip("_") or "operacion"
+
+def iniciar_sesion(nombre: str):
+    """
+    Empieza a perfilar la operación si el modo de perfilado está armado y no
+    hay otra sesión en curso. Devuelve la SesionPerfilado, o None si no se perfila.
+    """
+    global _pendientes, _sesion_activa
+    if not (_permanente or _pendientes):
+        return None
+    with _cerrojo:
+        if _sesion_activa is not None or not (_permanente or _pendientes):
+            return None
+        if not _permanente:
+            _pendientes -= 1
+        _sesion_activa = SesionPerfilado(nombre)
+        return _sesion_activa
+
+def perfilar(sesion):
+    """Context manager que perfila el bloque dentro de la sesión (o no hace nada si es None)."""
+    return sesion.perfilar() if sesion is not None else nullcontext()
+
+def en_sesion(sesion, funcion):
+    """Devuelve funcion envuelta para ejecutarse perfilada en la sesión (para hilos de fondo)."""
+    if sesion is None:
+        return funcion
+    def envoltura(*args, **kwargs):
+        with sesion.perfilar():
+            return funcion(*args, **kwargs)
+    return envoltura
+
+def terminar_sesion(sesion):
+    """Guarda el informe de la sesión y avisa a los suscriptores. Devuelve la ruta, o None."""
+    global _sesion_activa
+    if sesion is None:
+        return None
+    with _cerrojo:
+        if _sesion_activa is not sesion:
+            return None  # Ya terminada
+        _sesion_activa = None
+    try:
+        ruta = sesion.terminar()
+    except Exception as e:
+        print(f"Error al guardar el informe de perfilado: {e}")
+        return None
+    print(f"Informe de perfilado guardado en '{ruta}'.")
+    for callback in list(_suscriptores):
+        try:
+            callback(ruta)
+        except Exception as e:
+            print(f"Error al notificar el informe de perfilado: {e}")
+    return ruta
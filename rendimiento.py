@@ -0,0 +1,156 @@
+# rendimiento.py
+
+import csv
+import functools
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Duración a partir de la cual una operación se guarda en la lista de operaciones lentas
+UMBRAL_LENTA_S = 0.2
+# Operaciones lentas recientes que se conservan
+MAX_OPERACIONES_LENTAS = 200
+
+# Estado de las mediciones (compartido por todos los hilos)
+_activo = False
+_cerrojo = threading.Lock()
+_tiempos = {}       # nombre -> [llamadas, total_s, max_s, ultima_s]
+_contadores = {}    # nombre -> valor acumulado
+_lentas = deque(maxlen=MAX_OPERACIONES_LENTAS)  # (fecha, nombre, segundos)
+
+def activar(valor: bool = True):
+    """Activa o desactiva las mediciones. Desactivadas, su coste es una comprobación por llamada."""
+    global _activo
+    _activo = bool(valor)
+
+def activo() -> bool:
+    return _activo
+
+def configurar_desde_ajustes():
+    """Sigue el ajuste 'medir_rendimiento' de la configuración, ahora y cuando cambie."""
+    import config  # config también usa este módulo; se importa aquí para evitar el ciclo
+    activar(config.get_setting("medir_rendimiento"))
+    config.suscribir(lambda clave, valor: activar(valor) if clave == "medir_rendimiento" else None)
+
+def registrar(nombre: str, segundos: float):
+    """Añade una medición de tiempo a la operación indicada."""
+    if not _activo:
+        return
+    with _cerrojo:
+        medida = _tiempos.get(nombre)
+        if medida is None:
+            _tiempos[nombre] = [1, segundos, segundos, segundos]
+        else:
+            medida[0] += 1
+            medida[1] += segundos
+            medida[2] = max(medida[2], segundos)
+            medida[3] = segundos
+        if segundos >= UMBRAL_LENTA_S:
+            _lentas.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), nombre, segundos))
+
+def contar(nombre: str, cantidad: int = 1):
+    """Suma cantidad al contador indicado (filas importadas, entradas escritas, etc.)."""
+    if not _activo:
+        return
+    with _cerrojo:
+        _contadores[nombre] = _contadores.get(nombre, 0) + cantidad
+
+class _Medicion:
+    """Context manager que mide el tiempo de su bloque."""
+    __slots__ = ("nombre", "inicio")
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registrar(self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+class _SinMedicion:
+    """Context manager vacío usado mientras las mediciones están desactivadas."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_SIN_MEDICION = _SinMedicion()
+
+def medir(nombre: str):
+    """
+    Mide el tiempo de un bloque de código:
+
+        with medir("usuarios.bcrypt_verificar"):
+            bcrypt.checkpw(...)
+    """
+    return _Medicion(nombre) if _activo else _SIN_MEDICION
+
+def medido(nombre: str):
+    """
+    Decorador que mide cada llamada a la función con el nombre indicado. Los
+    tiempos son inclusivos: si una función medida llama a otra, ambas cuentan
+    el tiempo de la segunda.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activo:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                registrar(nombre, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+def instantanea() -> dict:
+    """
+    Devuelve una copia de las mediciones:
+        {"operaciones": [{nombre, llamadas, total_s, media_s, max_s, ultima_s}, ...] (de más a menos tiempo total),
+         "contadores": {nombre: valor}, "lentas": [(fecha, nombre, segundos), ...] (de más reciente a más antigua)}
+    """
+    with _cerrojo:
+        operaciones = [
+            {"nombre": nombre, "llamadas": llamadas, "total_s": total, "media_s": total / llamadas,
+             "max_s": maximo, "ultima_s": ultima}
+            for nombre, (llamadas, total, maximo, ultima) in _tiempos.items()
+        ]
+        contadores = dict(_contadores)
+        lentas = list(reversed(_lentas))
+    operaciones.sort(key=lambda o: o["total_s"], reverse=True)
+    return {"operaciones": operaciones, "contadores": contadores, "lentas": lentas}
+
+def reiniciar():
+    """Borra todas las mediciones acumuladas."""
+    with _cerrojo:
+        _tiempos.clear()
+        _contadores.clear()
+        _lentas.clear()
+
+def exportar(ruta: str):
+    """Guarda las mediciones en JSON o, si la ruta termina en .csv, en CSV (una fila por operación, contador u operación lenta)."""
+    datos = instantanea()
+    if ruta.lower().endswith(".csv"):
+        with open(ruta, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["tipo", "nombre", "llamadas", "total_s", "media_s", "max_s", "ultima_s", "fecha"])
+            for o in datos["operaciones"]:
+                escritor.writerow(["tiempo", o["nombre"], o["llamadas"], o["total_s"], o["media_s"], o["max_s"], o["ultima_s"], ""])
+            for nombre, valor in datos["contadores"].items():
+                escritor.writerow(["contador", nombre, valor, "", "", "", "", ""])
+            for fecha, nombre, segundos in datos["lentas"]:
+                escritor.writerow(["lenta", nombre, 1, segundos, segundos, segundos, segundos, fecha])
+        return
+    datos["fecha"] = datetime.now().isoformat(timespec="seconds")
+    datos["lentas"] = [{"fecha": f, "nombre": n, "segundos": s} for f, n, s in datos["lentas"]]
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
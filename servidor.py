@@ -0,0 +1,412 @@
+# servidor.py
+"""
+Servidor HTTP/JSON local sobre el inventario.
+
+Un solo proceso carga el inventario y atiende a varios puestos a la vez, de
+modo que todos ven los mismos datos y los guardados no se pisan. Los puestos
+con la aplicación de escritorio usan el backend "remoto" (models_remoto.py).
+
+    python servidor.py                          # escucha en 127.0.0.1:8765
+    python servidor.py --host 0.0.0.0 --puerto 8765
+
+Rutas (las listas de productos se envían por columnas:
+{"codigo": [...], "descripcion": [...], "cantidad": [...]}):
+
+    GET    /version                   {"version": n, "instancia": id}
+    GET    /productos                 todo el inventario
+    GET    /productos/<codigo>        un producto (404 si no existe)
+    GET    /buscar?q=texto            productos cuyo código o descripción contienen el texto
+    GET    /stock-bajo?limite=50      productos con cantidad < limite
+    GET    /resumen?limite=50         totales del inventario
+    PUT    /productos/<codigo>        {"descripcion": ..., "cantidad": ...}: alta o cambio
+    DELETE /productos/<codigo>        baja
+    POST   /productos                 alta o cambio en bloque (mismo formato por columnas)
+
+Las respuestas de lectura se guardan en caché junto con la versión del
+inventario e incluyen un ETag: mientras los datos no cambien, repetir una
+consulta no vuelve a calcularla, y un cliente que envía If-None-Match recibe
+un 304 sin cuerpo. La versión vuelve a empezar en 0 al reiniciar el
+servidor, así que el ETag y /version incluyen también un identificador de
+la instancia del servidor, elegido al arrancar. Si el ajuste 'servidor_token' no está vacío, cada petición
+debe llevar la cabecera "Authorization: Bearer <token>".
+"""
+
+import argparse
+import gzip
+import hmac
+import json
+import os
+import sys
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+# Dirección por defecto del servidor
+HOST_POR_DEFECTO = "127.0.0.1"
+PUERTO_POR_DEFECTO = 8765
+# Bytes máximos de respuestas (JSON y gzip) que se guardan en la caché
+MAX_BYTES_CACHE = 64 * 1024 * 1024
+# Las respuestas más grandes que esto se comprimen si el cliente lo acepta
+MIN_BYTES_GZIP = 1024
+# Tamaño máximo del cuerpo de una petición (alta en bloque)
+MAX_BYTES_PETICION = 256 * 1024 * 1024
+
+class ErrorPeticion(Exception):
+    """Error atribuible a la petición del cliente; se responde con el código indicado."""
+    def __init__(self, codigo: int, mensaje: str):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+def _descomprimir(datos: bytes) -> bytes:
+    """
+    Descomprime un cuerpo gzip sin pasar de MAX_BYTES_PETICION: el límite de
+    Content-Length solo mide el cuerpo comprimido, y unos pocos KB de gzip
+    pueden ocupar gigas al descomprimirse.
+    """
+    descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        resultado = descompresor.decompress(datos, MAX_BYTES_PETICION + 1)
+    except (zlib.error, OSError):
+        raise ErrorPeticion(400, "El cuerpo de la petición no es gzip válido.")
+    if len(resultado) > MAX_BYTES_PETICION:
+        raise ErrorPeticion(413, "La petición es demasiado grande.")
+    if not descompresor.eof:
+        raise ErrorPeticion(400, "El cuerpo de la petición no es gzip válido.")
+    return resultado
+
+def columnas_json(df) -> dict:
+    """Convierte un DataFrame del inventario al formato por columnas de la API."""
+    return {
+        "codigo": df['codigo'].tolist(),
+        "descripcion": df['descripcion'].tolist(),
+        "cantidad": [int(c) for c in df['cantidad'].tolist()],
+    }
+
+def crear_inventario():
+    """Carga el inventario que sirve este proceso, según el ajuste 'inventario_backend'."""
+    from config import get_setting
+    if get_setting("inventario_backend") == "sqlite":
+        from models_sqlite import InventarioSQLite
+        return InventarioSQLite()
+    from models import Inventario
+    return Inventario()
+
+class ServicioInventario:
+    """
+    Operaciones de la API sobre un inventario. El inventario no es seguro entre
+    hilos, así que todo acceso pasa por un cerrojo; las respuestas de lectura
+    se sirven desde la caché sin tomarlo mientras la versión no cambie.
+    """
+    def __init__(self, inventario):
+        self.inventario = inventario
+        self.instancia = uuid.uuid4().hex  # Distingue las versiones de esta ejecución de las de otras
+        self._cerrojo = threading.RLock()
+        self._cache = OrderedDict()   # (ruta, consulta) -> (version, cuerpo JSON, cuerpo gzip o None)
+        self._bytes_cache = 0
+        self._cerrojo_cache = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self.inventario.version
+
+    def comprobar_cambios(self):
+        """
+        Incorpora lo que otros procesos (p. ej. cli.py) hayan guardado en la
+        carpeta de datos. Comparar las firmas de los archivos no necesita el
+        cerrojo; solo se toma si cambiaron, y sin esperar: si hay una escritura
+        en curso, la lectura se sirve como está y la próxima volverá a mirar.
+        """
+        if not self.inventario.detectar_cambios():
+            return
+        if not self._cerrojo.acquire(blocking=False):
+            return
+        try:
+            self.inventario.comprobar_cambios()
+        finally:
+            self._cerrojo.release()
+
+    # --- Lecturas ---
+
+    def _leer(self, ruta: str, consulta: dict):
+        partes = ruta.strip("/").split("/")
+        if partes == ["version"]:
+            return {"version": self.version, "instancia": self.instancia}
+        if partes == ["productos"]:
+            return columnas_json(self.inventario.obtener_dataframe())
+        if len(partes) == 2 and partes[0] == "productos":
+            codigo = unquote(partes[1])
+            producto = self.inventario.obtener_producto(codigo)
+            if producto is None:
+                raise ErrorPeticion(404, f"Producto '{codigo}' no encontrado.")
+            return {"codigo": producto.codigo, "descripcion": producto.descripcion, "cantidad": producto.cantidad}
+        if partes == ["buscar"]:
+            return columnas_json(self.inventario.buscar(consulta.get("q", "")))
+        if partes == ["stock-bajo"]:
+            return columnas_json(self.inventario.obtener_dataframe_stock_bajo(_entero(consulta, "limite", 50)))
+        if partes == ["resumen"]:
+            resumen = self.inventario.obtener_resumen(_entero(consulta, "limite", 50))
+            return {clave: int(valor) for clave, valor in resumen.items()}
+        raise ErrorPeticion(404, f"Ruta desconocida: {ruta}")
+
+    def leer(self, ruta: str, consulta: dict, comprimir: bool) -> tuple:
+        """Devuelve (version, cuerpo) de una consulta, desde la caché si los datos no cambiaron."""
+        self.comprobar_cambios()
+        clave = (ruta, tuple(sorted(consulta.items())))
+        with self._cerrojo_cache:
+            en_cache = self._cache.get(clave)
+            if en_cache is not None and en_cache[0] == self.version:
+                self._cache.move_to_end(clave)
+                return en_cache[0], self._cuerpo(clave, en_cache, comprimir)
+        with self._cerrojo:
+            version = self.version
+            datos = self._leer(ruta, consulta)
+        # La serialización se hace fuera del cerrojo del inventario
+        entrada = (version, json.dumps(datos, ensure_ascii=False).encode("utf-8"), None)
+        with self._cerrojo_cache:
+            # Las respuestas de otras versiones ya no se servirán: se descartan todas
+            for vieja in [c for c, e in self._cache.items() if e[0] != version]:
+                self._quitar_de_cache(vieja)
+            self._poner_en_cache(clave, entrada)
+            return version, self._cuerpo(clave, entrada, comprimir)
+
+    @staticmethod
+    def _tamano(entrada) -> int:
+        return len(entrada[1]) + len(entrada[2] or b"")
+
+    def _quitar_de_cache(self, clave):
+        self._bytes_cache -= self._tamano(self._cache.pop(clave))
+
+    def _poner_en_cache(self, clave, entrada):
+        """Guarda una entrada (con _cerrojo_cache tomado) y descarta las menos usadas si se pasa de MAX_BYTES_CACHE."""
+        if clave in self._cache:
+            self._quitar_de_cache(clave)
+        self._cache[clave] = entrada
+        self._bytes_cache += self._tamano(entrada)
+        while self._bytes_cache > MAX_BYTES_CACHE and len(self._cache) > 1:
+            self._quitar_de_cache(next(iter(self._cache)))
+
+    def _cuerpo(self, clave, entrada, comprimir: bool):
+        """Cuerpo de la respuesta (bytes, comprimido) de una entrada de la caché; la versión gzip se calcula una vez."""
+        version, cuerpo, comprimido = entrada
+        if not comprimir or len(cuerpo) < MIN_BYTES_GZIP:
+            return cuerpo, False
+        if comprimido is None:
+            comprimido = gzip.compress(cuerpo, compresslevel=5)
+            if self._cache.get(clave) is entrada:
+                self._poner_en_cache(clave, (version, cuerpo, comprimido))
+        return comprimido, True
+
+    # --- Escrituras ---
+
+    def guardar_producto(self, codigo: str, datos: dict, usuario: str) -> dict:
+        try:
+            cantidad = int(datos["cantidad"])
+        except (KeyError, TypeError, ValueError):
+            raise ErrorPeticion(400, "Se necesita una 'cantidad' entera.")
+        with self._cerrojo:
+            self.inventario.usuario_actual = usuario
+            self.inventario.agregar_o_actualizar_producto(codigo, datos.get("descripcion", ""), cantidad)
+            self._guardar()
+            return {"version": self.version}
+
+    def eliminar_producto(self, codigo: str, usuario: str) -> dict:
+        with self._cerrojo:
+            self.inventario.usuario_actual = usuario
+            if not self.inventario.eliminar_producto(codigo):
+                raise ErrorPeticion(404, f"Producto '{codigo}' no encontrado.")
+            self._guardar()
+            return {"version": self.version}
+
+    def fusionar(self, datos: dict, usuario: str) -> dict:
+        import pandas as pd
+        if not isinstance(datos, dict) or "codigo" not in datos or "cantidad" not in datos:
+            raise ErrorPeticion(400, "Se necesitan las columnas 'codigo' y 'cantidad'.")
+        try:
+            df = pd.DataFrame({clave: datos[clave] for clave in ("codigo", "descripcion", "cantidad") if clave in datos})
+        except ValueError as e:
+            raise ErrorPeticion(400, f"Columnas inválidas: {e}")
+        with self._cerrojo:
+            self.inventario.usuario_actual = usuario
+            resultado = self.inventario.merge_dataframe(df)
+            if resultado["agregados"] or resultado["actualizados"]:
+                self._guardar()
+            return {**{clave: int(valor) for clave, valor in resultado.items()}, "version": self.version}
+
+    def _guardar(self):
+        """
+        Guarda los cambios de la petición. Si otro proceso (p. ej. cli.py)
+        cambió a la vez los mismos productos, se conservan sus valores y se
+        responde 409 con la lista de productos en conflicto.
+        """
+        from models import ConflictoEdicion
+        try:
+            self.inventario.guardar_datos()
+        except ConflictoEdicion as e:
+            for codigo, _, _ in e.conflictos:
+                self.inventario.resolver_conflicto(codigo, conservar_local=False)
+            self.inventario.guardar_datos()
+            codigos = ", ".join(codigo for codigo, _, _ in e.conflictos[:10])
+            raise ErrorPeticion(409, f"Otro proceso cambió a la vez estos productos y se conservan sus valores: {codigos}")
+
+    def guardar(self):
+        with self._cerrojo:
+            self._guardar()
+
+def _entero(consulta: dict, clave: str, por_defecto: int) -> int:
+    try:
+        return int(consulta.get(clave, por_defecto))
+    except ValueError:
+        raise ErrorPeticion(400, f"'{clave}' debe ser un número entero.")
+
+class ManejadorInventario(BaseHTTPRequestHandler):
+    """Atiende las peticiones HTTP. HTTP/1.1 mantiene abierta la conexión entre peticiones."""
+    protocol_version = "HTTP/1.1"
+    server_version = "InventarioServidor/1.0"
+
+    @property
+    def servicio(self) -> ServicioInventario:
+        return self.server.servicio
+
+    def log_message(self, formato, *args):
+        if self.server.detallado:
+            super().log_message(formato, *args)
+
+    def _etag(self, version: int) -> str:
+        return f'"{self.servicio.instancia}-{version}"'
+
+    def _responder(self, codigo: int, cuerpo: bytes = b"", version=None, comprimido=False):
+        self.send_response(codigo)
+        if cuerpo or codigo != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        if comprimido:
+            self.send_header("Content-Encoding", "gzip")
+        if version is not None:
+            self.send_header("ETag", self._etag(version))
+            self.send_header("X-Version", str(version))
+            self.send_header("X-Instancia", self.servicio.instancia)
+        self.end_headers()
+        if cuerpo:
+            self.wfile.write(cuerpo)
+
+    def _responder_json(self, codigo: int, datos: dict):
+        self._responder(codigo, json.dumps(datos, ensure_ascii=False).encode("utf-8"),
+                        version=datos.get("version"))
+
+    def _autorizado(self) -> bool:
+        token = self.server.token
+        if not token:
+            return True
+        recibido = self.headers.get("Authorization", "")
+        return hmac.compare_digest(recibido.encode("utf-8"), f"Bearer {token}".encode("utf-8"))
+
+    def _usuario(self) -> str:
+        return unquote(self.headers.get("X-Usuario") or "") or "Servidor"
+
+    def _leer_cuerpo(self):
+        longitud = int(self.headers.get("Content-Length") or 0)
+        if longitud > MAX_BYTES_PETICION:
+            raise ErrorPeticion(413, "La petición es demasiado grande.")
+        datos = self.rfile.read(longitud) if longitud else b"{}"
+        if self.headers.get("Content-Encoding") == "gzip":
+            datos = _descomprimir(datos)
+        try:
+            return json.loads(datos)
+        except ValueError:
+            raise ErrorPeticion(400, "El cuerpo de la petición no es JSON válido.")
+
+    def _atender(self, metodo: str):
+        try:
+            if not self._autorizado():
+                raise ErrorPeticion(401, "Token de acceso incorrecto.")
+            partes = urlsplit(self.path)
+            ruta = partes.path.rstrip("/") or "/"
+            consulta = {clave: valores[-1] for clave, valores in parse_qs(partes.query).items()}
+            segmentos = ruta.strip("/").split("/")
+            if metodo == "GET":
+                comprimir = "gzip" in self.headers.get("Accept-Encoding", "")
+                version, (cuerpo, comprimido) = self.servicio.leer(ruta, consulta, comprimir)
+                if self.headers.get("If-None-Match") == self._etag(version):
+                    self._responder(304, version=version)
+                else:
+                    self._responder(200, cuerpo, version=version, comprimido=comprimido)
+            elif metodo == "PUT" and len(segmentos) == 2 and segmentos[0] == "productos":
+                self._responder_json(200, self.servicio.guardar_producto(unquote(segmentos[1]), self._leer_cuerpo(), self._usuario()))
+            elif metodo == "DELETE" and len(segmentos) == 2 and segmentos[0] == "productos":
+                self._responder_json(200, self.servicio.eliminar_producto(unquote(segmentos[1]), self._usuario()))
+            elif metodo == "POST" and segmentos == ["productos"]:
+                self._responder_json(200, self.servicio.fusionar(self._leer_cuerpo(), self._usuario()))
+            else:
+                raise ErrorPeticion(405, f"Método {metodo} no admitido en {ruta}.")
+        except ErrorPeticion as e:
+            if metodo != "GET":
+                # El cuerpo puede no haberse leído: la conexión no se puede reutilizar
+                self.close_connection = True
+            self._responder_json(e.codigo, {"error": str(e)})
+        except Exception as e:
+            print(f"Error al atender {metodo} {self.path}: {e}")
+            self._responder_json(500, {"error": str(e)})
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_PUT(self):
+        self._atender("PUT")
+
+    def do_DELETE(self):
+        self._atender("DELETE")
+
+    def do_POST(self):
+        self._atender("POST")
+
+class ServidorInventario(ThreadingHTTPServer):
+    """Servidor HTTP con un hilo por conexión que comparte un ServicioInventario."""
+    daemon_threads = True
+
+    def __init__(self, direccion, servicio: ServicioInventario, token: str = "", detallado: bool = False):
+        super().__init__(direccion, ManejadorInventario)
+        self.servicio = servicio
+        self.token = token
+        self.detallado = detallado
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON del inventario.")
+    parser.add_argument("--host", default=HOST_POR_DEFECTO,
+                        help="Dirección en la que escuchar (0.0.0.0 para aceptar otros equipos).")
+    parser.add_argument("--puerto", type=int, default=PUERTO_POR_DEFECTO)
+    parser.add_argument("--datos", help="Carpeta de datos a usar (por defecto, la de la aplicación).")
+    parser.add_argument("--detallado", action="store_true", help="Mostrar cada petición recibida.")
+    args = parser.parse_args(argv)
+    if args.datos:
+        # Debe fijarse antes de importar los módulos de la aplicación (ver utils.DATA_DIR_ENV)
+        os.environ["INVENTARIO_DATA_DIR"] = os.path.abspath(args.datos)
+
+    from config import get_setting
+    from log import flush_history
+    if get_setting("inventario_backend") == "remoto":
+        print("Error: el servidor no puede usar el backend 'remoto'; elige 'archivo' o 'sqlite'.", file=sys.stderr)
+        return 1
+
+    servicio = ServicioInventario(crear_inventario())
+    servidor = ServidorInventario((args.host, args.puerto), servicio, token=get_setting("servidor_token") or "",
+                                  detallado=args.detallado)
+    print(f"Servidor del inventario escuchando en http://{args.host}:{servidor.server_address[1]} "
+          f"({len(servicio.inventario.obtener_dataframe())} productos). Ctrl+C para detenerlo.")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nDeteniendo el servidor...")
+    finally:
+        servidor.server_close()
+        try:
+            servicio.guardar()
+        except ErrorPeticion as e:
+            print(f"Advertencia: {e}")
+        flush_history()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# tabla_virtual.py
+
+import ttkbootstrap as ttk
+
+# Filas extra que se materializan por debajo de la última visible
+FILAS_DE_RESERVA = 2
+# Alto de fila usado si el tema no define uno
+ALTO_FILA_POR_DEFECTO = 20
+
+class TablaVirtual(ttk.Frame):
+    """
+    Treeview virtualizado: solo crea tantas filas como caben en pantalla (más
+    una pequeña reserva) y, al desplazarse, reutiliza esas mismas filas con los
+    valores de la ventana visible. El coste de refrescar depende del tamaño de
+    la vista, no del número de filas de los datos.
+
+    Los datos se entregan por columnas (listas, arrays o Series), de modo que
+    no hace falta recorrer el DataFrame fila a fila.
+    """
+    def __init__(self, parent, columnas, mensaje_vacio=None, **kwargs):
+        super().__init__(parent)
+        self.mensaje_vacio = mensaje_vacio
+        self._columnas_datos = []
+        self._fuente = None           # Fuente de filas bajo demanda (cargar_fuente)
+        self._etiquetas = None
+        self._total = 0
+        self._inicio = 0              # Primera fila de datos visible
+        self._seleccion = None        # Fila de datos seleccionada
+        self._filas_visibles = 1
+
+        self.scroll = ttk.Scrollbar(self, command=self._on_scrollbar)
+        self.scroll.pack(side="right", fill="y")
+        kwargs.setdefault("show", "headings")
+        self.tree = ttk.Treeview(self, selectmode="browse", **kwargs)
+        self.tree.pack(fill="both", expand=True)
+        self.tree['columns'] = columnas
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._desplazar(-3))
+        self.tree.bind("<Button-5>", lambda e: self._desplazar(3))
+        self.tree.bind("<Up>", lambda e: self._mover_seleccion(-1))
+        self.tree.bind("<Down>", lambda e: self._mover_seleccion(1))
+        self.tree.bind("<Prior>", lambda e: self._mover_seleccion(-self._filas_visibles))
+        self.tree.bind("<Next>", lambda e: self._mover_seleccion(self._filas_visibles))
+
+    def cargar(self, columnas_datos, etiquetas=None):
+        """
+        Reemplaza los datos mostrados.
+
+        Args:
+            columnas_datos (list): Una secuencia por columna, todas de la misma longitud.
+            etiquetas (sequence, opcional): Tag de Treeview para cada fila (ej. 'danger').
+        """
+        self._fuente = None
+        self._columnas_datos = [c.to_numpy() if hasattr(c, "to_numpy") else c for c in columnas_datos]
+        self._etiquetas = etiquetas.to_numpy() if hasattr(etiquetas, "to_numpy") else etiquetas
+        self._total = len(self._columnas_datos[0]) if self._columnas_datos else 0
+        self._inicio = 0
+        self._seleccion = None
+        self._redibujar()
+
+    def cargar_fuente(self, fuente):
+        """
+        Reemplaza los datos mostrados por una fuente que entrega las filas bajo
+        demanda: len(fuente) y fuente.fila(indice). Solo se le piden las filas
+        de la ventana visible (ej. models_sqlite.VistaPaginadaSQLite).
+        """
+        self._fuente = fuente
+        self._columnas_datos = []
+        self._etiquetas = None
+        self._total = len(fuente)
+        self._inicio = 0
+        self._seleccion = None
+        self._redibujar()
+
+    def __len__(self):
+        return self._total
+
+    def fila(self, indice: int) -> tuple:
+        """Devuelve los valores de la fila de datos indicada."""
+        if self._fuente is not None:
+            return self._fuente.fila(indice)
+        return tuple(columna[indice] for columna in self._columnas_datos)
+
+    def fila_seleccionada(self):
+        """Devuelve los valores de la fila seleccionada, o None si no hay selección."""
+        if self._seleccion is None or self._seleccion >= self._total:
+            return None
+        return self.fila(self._seleccion)
+
+    # --- Ventana visible ---
+
+    def _alto_fila(self) -> int:
+        alto = ttk.Style().lookup("Treeview", "rowheight")
+        try:
+            return int(alto) or ALTO_FILA_POR_DEFECTO
+        except (TypeError, ValueError):
+            return ALTO_FILA_POR_DEFECTO
+
+    def _on_configure(self, event=None):
+        alto_cabecera = self._alto_fila() if "headings" in str(self.tree.cget("show")) else 0
+        filas = max(1, (self.tree.winfo_height() - alto_cabecera) // self._alto_fila())
+        if filas != self._filas_visibles:
+            self._filas_visibles = filas
+            self._redibujar()
+
+    def _redibujar(self):
+        """Materializa la ventana visible reutilizando los items existentes del Treeview."""
+        self._inicio = max(0, min(self._inicio, self._total - self._filas_visibles))
+        huecos = self._filas_visibles + FILAS_DE_RESERVA
+        existentes = self.tree.get_children()
+
+        if self._total == 0:
+            self.tree.delete(*existentes)
+            if self.mensaje_vacio:
+                valores = [""] * len(self.tree['columns'])
+                valores[min(1, len(valores) - 1)] = self.mensaje_vacio
+                self.tree.insert("", "end", iid="vacio", values=valores)
+            self.scroll.set(0, 1)
+            return
+
+        fin = min(self._inicio + huecos, self._total)
+        necesarios = fin - self._inicio
+        if "vacio" in existentes:
+            self.tree.delete("vacio")
+            existentes = self.tree.get_children()
+        if len(existentes) > necesarios:
+            self.tree.delete(*existentes[necesarios:])
+        for hueco in range(len(existentes), necesarios):
+            self.tree.insert("", "end", iid=str(hueco))
+
+        for hueco, indice in enumerate(range(self._inicio, fin)):
+            etiquetas = (self._etiquetas[indice],) if self._etiquetas is not None else ()
+            self.tree.item(str(hueco), values=self.fila(indice), tags=etiquetas)
+
+        # Reflejar la selección solo si la fila seleccionada está a la vista
+        if self._seleccion is not None and self._inicio <= self._seleccion < fin:
+            hueco = str(self._seleccion - self._inicio)
+            if self.tree.selection() != (hueco,):
+                self.tree.selection_set(hueco)
+            self.tree.focus(hueco)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        self.scroll.set(self._inicio / self._total, min(1.0, (self._inicio + self._filas_visibles) / self._total))
+
+    def _desplazar(self, filas: int):
+        nuevo_inicio = max(0, min(self._inicio + filas, self._total - self._filas_visibles))
+        if nuevo_inicio != self._inicio:
+            self._inicio = nuevo_inicio
+            self._redibujar()
+        return "break"
+
+    # --- Eventos ---
+
+    def _on_scrollbar(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self._inicio = int(float(cantidad) * self._total)
+            self._redibujar()
+        elif accion == "scroll":
+            paso = self._filas_visibles if unidad == "pages" else 1
+            self._desplazar(int(cantidad) * paso)
+
+    def _on_mousewheel(self, event):
+        return self._desplazar(-3 if event.delta > 0 else 3)
+
+    def _on_select(self, event=None):
+        seleccion = self.tree.selection()
+        if seleccion and seleccion[0] != "vacio":
+            self._seleccion = self._inicio + int(seleccion[0])
+
+    def _mover_seleccion(self, filas: int):
+        if not self._total:
+            return "break"
+        actual = self._seleccion if self._seleccion is not None else self._inicio - 1
+        self._seleccion = max(0, min(actual + filas, self._total - 1))
+        if self._seleccion < self._inicio:
+            self._inicio = self._seleccion
+        elif self._seleccion >= self._inicio + self._filas_visibles:
+            self._inicio = self._seleccion - self._filas_visibles + 1
+        self._redibujar()
+        return "break"
@@ -0,0 +1,167 @@
+# tareas.py
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import perfilado
+
+# Tareas de importación/exportación que pueden ejecutarse a la vez
+HILOS_TAREAS = 4
+# Cada cuánto se consulta desde Tk el progreso de las tareas
+INTERVALO_SONDEO_MS = 100
+# Resultados parciales que una tarea puede adelantar antes de esperar a la interfaz
+MAX_PARCIALES_PENDIENTES = 2
+
+class TareaCancelada(Exception):
+    """Se lanza dentro de una tarea cuando el usuario ha pedido cancelarla."""
+    pass
+
+class Tarea:
+    """
+    Trabajo largo (leer o escribir un archivo) que se ejecuta en segundo plano.
+    La función de trabajo recibe la propia tarea para informar de su progreso
+    con informar_progreso() y para comprobar con comprobar_cancelacion() si
+    debe detenerse. El progreso se guarda aquí y lo lee la interfaz periódicamente.
+    Con entregar() la tarea puede pasar resultados parciales (p. ej. bloques
+    de filas) a la interfaz mientras sigue trabajando.
+    """
+    def __init__(self, nombre: str, funcion, *args, **kwargs):
+        self.nombre = nombre
+        self._funcion = funcion
+        self._args = args
+        self._kwargs = kwargs
+        self._cancelar = threading.Event()
+        self.progreso = None  # Fracción 0..1, o None si aún no se conoce
+        self.mensaje = ""
+        self.futuro = None
+        self._parciales = queue.Queue(maxsize=MAX_PARCIALES_PENDIENTES)
+
+    def informar_progreso(self, fraccion=None, mensaje=None):
+        """Actualiza el progreso de la tarea (llamar desde la función de trabajo)."""
+        if fraccion is not None:
+            self.progreso = max(0.0, min(1.0, fraccion))
+        if mensaje is not None:
+            self.mensaje = mensaje
+
+    def comprobar_cancelacion(self):
+        """Lanza TareaCancelada si se pidió cancelar la tarea."""
+        if self._cancelar.is_set():
+            raise TareaCancelada(self.nombre)
+
+    def entregar(self, parcial):
+        """
+        Pasa un resultado parcial a la interfaz (llamar desde la función de trabajo).
+        Si la interfaz aún no consumió los anteriores, espera: así la memoria
+        usada queda acotada a unos pocos resultados parciales.
+        """
+        while True:
+            self.comprobar_cancelacion()
+            try:
+                self._parciales.put(parcial, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _recoger_parciales(self):
+        """Devuelve los resultados parciales pendientes, en orden de entrega."""
+        parciales = []
+        while True:
+            try:
+                parciales.append(self._parciales.get_nowait())
+            except queue.Empty:
+                return parciales
+
+    def cancelar(self):
+        """Pide que la tarea se detenga en su próximo punto de control."""
+        self._cancelar.set()
+        if self.futuro is not None:
+            self.futuro.cancel()  # Si aún no empezó, ya no llegará a ejecutarse
+
+    @property
+    def cancelada(self) -> bool:
+        return self._cancelar.is_set()
+
+    def terminada(self) -> bool:
+        return self.futuro is not None and self.futuro.done()
+
+    def _ejecutar(self):
+        self.comprobar_cancelacion()
+        return self._funcion(self, *self._args, **self._kwargs)
+
+_ejecutor = None
+_cerrojo_ejecutor = threading.Lock()
+
+def _obtener_ejecutor() -> ThreadPoolExecutor:
+    """Devuelve el pool de hilos de las tareas, creándolo la primera vez."""
+    global _ejecutor
+    with _cerrojo_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=HILOS_TAREAS, thread_name_prefix="tarea")
+        return _ejecutor
+
+def lanzar_tarea(widget, tarea: Tarea, al_terminar, al_fallar=None, al_progresar=None, al_cancelar=None,
+                 al_recibir=None, intervalo=INTERVALO_SONDEO_MS) -> Tarea:
+    """
+    Ejecuta la tarea en el pool y sondea su estado con widget.after(), de
+    modo que todos los callbacks se llaman en el hilo de Tk:
+      - al_progresar(tarea) mientras se ejecuta,
+      - al_recibir(parcial) por cada resultado parcial entregado,
+      - al_terminar(resultado) al acabar bien,
+      - al_cancelar() si se canceló,
+      - al_fallar(excepcion) si lanzó un error.
+    Como al_recibir y al_terminar se ejecutan en el hilo de la interfaz, el
+    inventario solo se modifica desde ese hilo.
+    Si el modo de perfilado está armado, la tarea (en ambos hilos) se perfila
+    y al acabar se guarda el informe.
+    """
+    sesion = perfilado.iniciar_sesion(tarea.nombre)
+    tarea.futuro = _obtener_ejecutor().submit(perfilado.en_sesion(sesion, tarea._ejecutar))
+
+    def recibir():
+        for parcial in tarea._recoger_parciales():
+            if al_recibir is not None:
+                al_recibir(parcial)
+
+    def sondear():
+        if not widget.winfo_exists():
+            tarea.cancelar()
+            perfilado.terminar_sesion(sesion)
+            return
+        # Se mira antes de recoger los parciales para no perder los entregados justo al terminar
+        terminada = tarea.futuro.done()
+        try:
+            with perfilado.perfilar(sesion):
+                recibir()
+        except Exception as e:
+            # Si la interfaz no puede aplicar un parcial, la tarea no debe seguir produciendo
+            tarea.cancelar()
+            perfilado.terminar_sesion(sesion)
+            if al_fallar is not None:
+                al_fallar(e)
+            else:
+                print(f"Error en la tarea '{tarea.nombre}': {e}")
+            return
+        if not terminada:
+            if al_progresar is not None:
+                al_progresar(tarea)
+            widget.after(intervalo, sondear)
+            return
+        if tarea.futuro.cancelled():
+            error = TareaCancelada(tarea.nombre)
+        else:
+            error = tarea.futuro.exception()
+        try:
+            with perfilado.perfilar(sesion):
+                if error is None:
+                    al_terminar(tarea.futuro.result())
+                elif isinstance(error, TareaCancelada):
+                    if al_cancelar is not None:
+                        al_cancelar()
+                elif al_fallar is not None:
+                    al_fallar(error)
+                else:
+                    print(f"Error en la tarea '{tarea.nombre}': {error}")
+        finally:
+            perfilado.terminar_sesion(sesion)
+    widget.after(intervalo, sondear)
+    return tarea
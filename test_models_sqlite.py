@@ -0,0 +1,57 @@
+# test_models_sqlite.py
+
+import os
+import shutil
+import tempfile
+import unittest
+
+# Carpeta de datos temporal antes de importar los módulos que la usan
+os.environ["INVENTARIO_DATA_DIR"] = tempfile.mkdtemp()
+
+import pandas as pd
+from almacenamiento import AlmacenamientoCSV, AlmacenamientoFeather
+from models import Inventario
+from models_sqlite import InventarioSQLite
+
+class MigracionSQLiteTest(unittest.TestCase):
+    """Paso del inventario en archivo a la base de datos SQLite."""
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.csv = AlmacenamientoCSV(os.path.join(self.carpeta, "inventario.csv"))
+        self.feather = AlmacenamientoFeather(os.path.join(self.carpeta, "inventario.feather"), migrar_desde=self.csv)
+
+    def tearDown(self):
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _abrir_sqlite(self):
+        return InventarioSQLite(ruta=os.path.join(self.carpeta, "inventario.db"), migrar_desde=self.feather)
+
+    def test_migra_desde_csv_sin_feather(self):
+        codigos = [f"K{i}" for i in range(37)]
+        self.csv.guardar(pd.DataFrame({"codigo": codigos, "descripcion": "Caño", "cantidad": 5}))
+
+        df = self._abrir_sqlite().obtener_dataframe()
+
+        self.assertEqual(list(df['codigo']), codigos)
+        self.assertTrue(self.feather.existe())
+
+    def test_aplica_el_diario_sin_compactar(self):
+        inventario = Inventario(almacenamiento=self.feather)
+        inventario.agregar_o_actualizar_producto("K1", "Codo", 3)
+        inventario.agregar_o_actualizar_producto("K3", "Tee", 1)
+        inventario.guardar_datos()
+        inventario.eliminar_producto("K1")
+        inventario.agregar_o_actualizar_producto("K2", "Llave", 7)
+        inventario.agregar_o_actualizar_producto("K3", "Tee", 4)
+        inventario.guardar_datos()
+        self.assertGreater(os.path.getsize(self.feather.ruta + ".diario"), 0)
+
+        df = self._abrir_sqlite().obtener_dataframe()
+
+        self.assertEqual(sorted(zip(df['codigo'], df['cantidad'])), [("K2", 7), ("K3", 4)])
+
+    def test_sin_datos_deja_la_tabla_vacia(self):
+        self.assertEqual(len(self._abrir_sqlite().obtener_dataframe()), 0)
+
+if __name__ == "__main__":
+    unittest.main()
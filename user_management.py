@@ -3,6 +3,8 @@
 import ttkbootstrap as ttk
 from tkinter import messagebox
 from usuarios import GestionUsuarios
+from tabla_virtual import TablaVirtual
+from autenticacion import ServicioAutenticacion, esperar_resultado
 
 class UserManagementFrame(ttk.Frame):
     """Frame para la gestión de usuarios (solo para el administrador)."""
@@ -30,21 +32,10 @@ class UserManagementFrame(ttk.Frame):
         ttk.Button(button_frame, text="Eliminar Seleccionado", command=self._eliminar_usuario_seleccionado, bootstyle="DANGER").pack(side="left", padx=5)
         ttk.Button(button_frame, text="Actualizar Lista", command=self.cargar_usuarios_en_treeview, bootstyle="SECONDARY").pack(side="right", padx=5)
 
-        # Frame para la tabla (Treeview)
-        tree_frame = ttk.Frame(self)
-        tree_frame.pack(fill="both", expand=True, padx=10, pady=5)
-
-        # Scrollbar para la tabla
-        tree_scroll = ttk.Scrollbar(tree_frame)
-        tree_scroll.pack(side="right", fill="y")
-
-        # Crear el Treeview
-        self.tree = ttk.Treeview(tree_frame, yscrollcommand=tree_scroll.set, bootstyle="PRIMARY", show="headings")
-        self.tree.pack(fill="both", expand=True)
-        tree_scroll.config(command=self.tree.yview)
-
-        # Definir las columnas
-        self.tree['columns'] = ('id', 'nombre_usuario', 'nombre_completo')
+        # Tabla virtualizada (Treeview)
+        self.tabla = TablaVirtual(self, ('id', 'nombre_usuario', 'nombre_completo'), bootstyle="PRIMARY")
+        self.tabla.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tree = self.tabla.tree
         
         # Formatear las columnas
         self.tree.column("id", anchor="center", width=50)
@@ -57,15 +48,14 @@ class UserManagementFrame(ttk.Frame):
         self.tree.heading("nombre_completo", text="Nombre Completo", anchor='w')
 
     def cargar_usuarios_en_treeview(self):
-        """Limpia la tabla y la vuelve a llenar con los usuarios de la BD."""
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        
+        """Vuelve a llenar la tabla con los usuarios de la BD."""
         try:
             usuarios = self.gestion_usuarios.obtener_todos_los_usuarios()
-            for index, usuario in enumerate(usuarios):
-                self.tree.insert(parent='', index='end', iid=index, text='',
-                                 values=(usuario['id'], usuario['nombre_usuario'], usuario['nombre_completo']))
+            self.tabla.cargar([
+                [u['id'] for u in usuarios],
+                [u['nombre_usuario'] for u in usuarios],
+                [u['nombre_completo'] for u in usuarios],
+            ])
         except Exception as e:
             messagebox.showerror("Error al Cargar Usuarios", f"No se pudieron cargar los usuarios.\nError: {e}")
 
@@ -76,24 +66,22 @@ class UserManagementFrame(ttk.Frame):
     # NUEVO: Método para abrir el diálogo de cambio de contraseña
     def _abrir_dialogo_cambiar_password(self):
         """Abre el diálogo para cambiar la contraseña de un usuario seleccionado."""
-        selected_item = self.tree.focus()
-        if not selected_item:
+        item_values = self.tabla.fila_seleccionada()
+        if item_values is None:
             messagebox.showwarning("Selección Requerida", "Por favor, selecciona un usuario de la lista para cambiar su contraseña.")
             return
         
-        item_values = self.tree.item(selected_item, 'values')
         nombre_usuario = item_values[1]
         
         ChangePasswordDialog(self, self.gestion_usuarios, nombre_usuario)
 
     def _eliminar_usuario_seleccionado(self):
         """Elimina el usuario seleccionado en la tabla."""
-        selected_item = self.tree.focus()
-        if not selected_item:
+        item_values = self.tabla.fila_seleccionada()
+        if item_values is None:
             messagebox.showwarning("Selección Requerida", "Por favor, selecciona un usuario de la lista para eliminar.")
             return
         
-        item_values = self.tree.item(selected_item, 'values')
         nombre_usuario = item_values[1]
         nombre_completo = item_values[2]
 
@@ -127,6 +115,7 @@ class CrearUsuarioDialog(ttk.Toplevel):
         self.grab_set()
 
         self.gestion_usuarios = gestion_usuarios
+        self.autenticacion = ServicioAutenticacion(gestion_usuarios)
         self.refresh_callback = refresh_callback
 
         self.crear_widgets()
@@ -163,7 +152,8 @@ class CrearUsuarioDialog(ttk.Toplevel):
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill="x")
         
-        ttk.Button(button_frame, text="Crear", command=self._crear, bootstyle="SUCCESS").pack(side="left", padx=5)
+        self.crear_button = ttk.Button(button_frame, text="Crear", command=self._crear, bootstyle="SUCCESS")
+        self.crear_button.pack(side="left", padx=5)
         ttk.Button(button_frame, text="Cancelar", command=self.destroy).pack(side="right", padx=5)
 
     def _crear(self):
@@ -180,13 +170,24 @@ class CrearUsuarioDialog(ttk.Toplevel):
             messagebox.showerror("Error", "Las contraseñas no coinciden.", parent=self)
             return
 
-        if self.gestion_usuarios.crear_usuario(usuario, nombre_completo, password):
+        # El hash bcrypt se calcula en segundo plano
+        self.crear_button.configure(state="disabled")
+        futuro = self.autenticacion.crear_usuario(usuario, nombre_completo, password)
+        esperar_resultado(self, futuro, lambda creado: self._on_creado(usuario, creado), self._on_error)
+
+    def _on_creado(self, usuario, creado):
+        if creado:
             messagebox.showinfo("Éxito", f"Usuario '{usuario}' creado correctamente.", parent=self)
             self.refresh_callback()
             self.destroy()
         else:
+            self.crear_button.configure(state="normal")
             messagebox.showerror("Error", "El nombre de usuario ya está en uso.", parent=self)
 
+    def _on_error(self, error):
+        self.crear_button.configure(state="normal")
+        messagebox.showerror("Error", f"No se pudo crear el usuario: {error}", parent=self)
+
 
 # NUEVO: Diálogo para cambiar la contraseña
 class ChangePasswordDialog(ttk.Toplevel):
@@ -200,6 +201,7 @@ class ChangePasswordDialog(ttk.Toplevel):
         self.grab_set()
 
         self.gestion_usuarios = gestion_usuarios
+        self.autenticacion = ServicioAutenticacion(gestion_usuarios)
         self.nombre_usuario = nombre_usuario
 
         self.crear_widgets()
@@ -228,7 +230,8 @@ class ChangePasswordDialog(ttk.Toplevel):
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill="x")
         
-        ttk.Button(button_frame, text="Guardar Cambio", command=self._cambiar, bootstyle="SUCCESS").pack(side="left", padx=5)
+        self.guardar_button = ttk.Button(button_frame, text="Guardar Cambio", command=self._cambiar, bootstyle="SUCCESS")
+        self.guardar_button.pack(side="left", padx=5)
         ttk.Button(button_frame, text="Cancelar", command=self.destroy).pack(side="right", padx=5)
 
     def _cambiar(self):
@@ -247,8 +250,15 @@ class ChangePasswordDialog(ttk.Toplevel):
             messagebox.showwarning("Contraseña Débil", "La contraseña debe tener al menos 4 caracteres.", parent=self)
             return
 
-        if self.gestion_usuarios.cambiar_password(self.nombre_usuario, nueva_password):
+        # El hash bcrypt se calcula en segundo plano
+        self.guardar_button.configure(state="disabled")
+        futuro = self.autenticacion.cambiar_password(self.nombre_usuario, nueva_password)
+        esperar_resultado(self, futuro, self._on_cambiado, lambda error: self._on_cambiado(False))
+
+    def _on_cambiado(self, cambiado):
+        if cambiado:
             messagebox.showinfo("Éxito", f"La contraseña para '{self.nombre_usuario}' ha sido cambiada correctamente.", parent=self)
             self.destroy()
         else:
+            self.guardar_button.configure(state="normal")
             messagebox.showerror("Error", "No se pudo cambiar la contraseña. Inténtelo de nuevo.", parent=self)
\ No newline at end of file
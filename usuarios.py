@@ -2,63 +2,87 @@
 
 import sqlite3
 import bcrypt
-import os
+import threading
 from utils import USUARIOS_DB
 from log import log_change # <-- NUEVA IMPORTACIÓN
+from db import obtener_pool
+from config import get_setting
+from rendimiento import medido, medir
 
 # Constantes
 ADMIN_USER = "admin"
 ADMIN_PASSWORD = "admin" # Contraseña por defecto
 
+# La comprobación del admin por defecto se hace una sola vez por proceso
+_admin_verificado = False
+_cerrojo_admin = threading.Lock()
+
+def _rondas_configuradas() -> int:
+    """Factor de trabajo de bcrypt configurado (ajuste 'bcrypt_rounds', entre 4 y 31)."""
+    try:
+        return max(4, min(31, int(get_setting("bcrypt_rounds"))))
+    except (TypeError, ValueError):
+        return 12
+
+@medido("usuarios.bcrypt_hash")
+def _generar_hash(password: str) -> bytes:
+    """Calcula el hash bcrypt de la contraseña con el factor de trabajo configurado."""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=_rondas_configuradas()))
+
+def _rondas_del_hash(password_hash) -> int:
+    """Devuelve el factor de trabajo con el que se generó un hash bcrypt ($2b$<rondas>$...)."""
+    if isinstance(password_hash, str):
+        password_hash = password_hash.encode('utf-8')
+    return int(password_hash.split(b'$')[2])
+
+def _crear_tabla(conn):
+    """Crea la tabla de usuarios si no existe (se ejecuta una vez por proceso)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre_usuario TEXT UNIQUE NOT NULL,
+            nombre_completo TEXT NOT NULL,
+            password_hash TEXT NOT NULL
+        )
+    ''')
+
 class GestionUsuarios:
     """Maneja todas las operaciones de la base de datos de usuarios."""
 
     def __init__(self, usuario_actual=None): # <-- NUEVO PARÁMETRO
-        self._conectar_y_crear_tabla()
-        self._crear_admin_si_no_existe()
+        self._pool = obtener_pool(USUARIOS_DB, inicializar=_crear_tabla)
         self.usuario_actual = usuario_actual # <-- GUARDAR USUARIO
-
-    def _conectar_y_crear_tabla(self):
-        """Se conecta a la BD y crea la tabla de usuarios si no existe."""
-        os.makedirs(os.path.dirname(USUARIOS_DB), exist_ok=True)
-        conn = sqlite3.connect(USUARIOS_DB)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre_usuario TEXT UNIQUE NOT NULL,
-                nombre_completo TEXT NOT NULL,
-                password_hash TEXT NOT NULL
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        self._crear_admin_si_no_existe()
 
     def _crear_admin_si_no_existe(self):
         """Crea el usuario admin por defecto si no hay ningún usuario en la BD."""
-        if not self.obtener_todos_los_usuarios():
-            self.crear_usuario(ADMIN_USER, "Administrador del Sistema", ADMIN_PASSWORD)
-            print(f"Usuario admin por defecto creado. Usuario: '{ADMIN_USER}', Contraseña: '{ADMIN_PASSWORD}'")
+        global _admin_verificado
+        with _cerrojo_admin:
+            if _admin_verificado:
+                return
+            with self._pool.conexion() as conn:
+                hay_usuarios = conn.execute("SELECT 1 FROM usuarios LIMIT 1").fetchone()
+            if not hay_usuarios:
+                self.crear_usuario(ADMIN_USER, "Administrador del Sistema", ADMIN_PASSWORD)
+                print(f"Usuario admin por defecto creado. Usuario: '{ADMIN_USER}', Contraseña: '{ADMIN_PASSWORD}'")
+            _admin_verificado = True
 
     def es_admin(self, nombre_usuario: str) -> bool:
         """Verifica si el nombre de usuario proporcionado es el admin."""
         return nombre_usuario == ADMIN_USER
 
+    @medido("usuarios.crear_usuario")
     def crear_usuario(self, nombre_usuario: str, nombre_completo: str, password: str) -> bool:
         """Crea un nuevo usuario en la base de datos."""
         if not nombre_usuario or not password:
             return False
         
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        password_hash = _generar_hash(password)
         
         try:
-            conn = sqlite3.connect(USUARIOS_DB)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO usuarios (nombre_usuario, nombre_completo, password_hash) VALUES (?, ?, ?)",
-                           (nombre_usuario, nombre_completo, password_hash))
-            conn.commit()
-            conn.close()
+            with self._pool.conexion() as conn, conn:
+                conn.execute("INSERT INTO usuarios (nombre_usuario, nombre_completo, password_hash) VALUES (?, ?, ?)",
+                             (nombre_usuario, nombre_completo, password_hash))
             
             # NUEVO: Registrar en el historial
             log_change(
@@ -70,15 +94,25 @@ class GestionUsuarios:
         except sqlite3.IntegrityError:
             return False
 
+    @medido("usuarios.verificar_usuario")
     def verificar_usuario(self, nombre_usuario: str, password: str) -> dict | None:
         """Verifica las credenciales de un usuario. Devuelve los datos del usuario o None."""
-        conn = sqlite3.connect(USUARIOS_DB)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nombre_usuario, nombre_completo, password_hash FROM usuarios WHERE nombre_usuario = ?", (nombre_usuario,))
-        usuario = cursor.fetchone()
-        conn.close()
+        with self._pool.conexion() as conn:
+            usuario = conn.execute("SELECT id, nombre_usuario, nombre_completo, password_hash FROM usuarios WHERE nombre_usuario = ?",
+                                   (nombre_usuario,)).fetchone()
+
+        password_hash = usuario[3] if usuario else None
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode('utf-8')
 
-        if usuario and bcrypt.checkpw(password.encode('utf-8'), usuario[3]):
+        with medir("usuarios.bcrypt_verificar"):
+            valida = usuario is not None and bcrypt.checkpw(password.encode('utf-8'), password_hash)
+        if valida:
+            # Si el factor de trabajo configurado cambió, aprovechar para recalcular el hash
+            if _rondas_del_hash(password_hash) != _rondas_configuradas():
+                with self._pool.conexion() as conn, conn:
+                    conn.execute("UPDATE usuarios SET password_hash = ? WHERE id = ?",
+                                 (_generar_hash(password), usuario[0]))
             return {
                 "id": usuario[0],
                 "nombre_usuario": usuario[1],
@@ -86,27 +120,23 @@ class GestionUsuarios:
             }
         return None
 
+    @medido("usuarios.obtener_todos_los_usuarios")
     def obtener_todos_los_usuarios(self) -> list[dict]:
         """Devuelve una lista de todos los usuarios (sin la contraseña)."""
-        conn = sqlite3.connect(USUARIOS_DB)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nombre_usuario, nombre_completo FROM usuarios")
-        usuarios = cursor.fetchall()
-        conn.close()
+        with self._pool.conexion() as conn:
+            usuarios = conn.execute("SELECT id, nombre_usuario, nombre_completo FROM usuarios").fetchall()
         
         return [{"id": u[0], "nombre_usuario": u[1], "nombre_completo": u[2]} for u in usuarios]
 
+    @medido("usuarios.eliminar_usuario")
     def eliminar_usuario(self, nombre_usuario: str) -> bool:
         """Elimina un usuario de la base de datos por su nombre de usuario."""
         if not nombre_usuario or self.es_admin(nombre_usuario):
             return False
         
         try:
-            conn = sqlite3.connect(USUARIOS_DB)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM usuarios WHERE nombre_usuario = ?", (nombre_usuario,))
-            conn.commit()
-            conn.close()
+            with self._pool.conexion() as conn, conn:
+                conn.execute("DELETE FROM usuarios WHERE nombre_usuario = ?", (nombre_usuario,))
             
             # NUEVO: Registrar en el historial
             log_change(
@@ -118,20 +148,18 @@ class GestionUsuarios:
         except sqlite3.Error:
             return False
 
+    @medido("usuarios.cambiar_password")
     def cambiar_password(self, nombre_usuario: str, nueva_password: str) -> bool:
         """Cambia la contraseña de un usuario específico."""
         if not nombre_usuario or not nueva_password:
             return False
 
-        password_hash = bcrypt.hashpw(nueva_password.encode('utf-8'), bcrypt.gensalt())
+        password_hash = _generar_hash(nueva_password)
         
         try:
-            conn = sqlite3.connect(USUARIOS_DB)
-            cursor = conn.cursor()
-            cursor.execute("UPDATE usuarios SET password_hash = ? WHERE nombre_usuario = ?",
-                           (password_hash, nombre_usuario))
-            conn.commit()
-            conn.close()
+            with self._pool.conexion() as conn, conn:
+                conn.execute("UPDATE usuarios SET password_hash = ? WHERE nombre_usuario = ?",
+                             (password_hash, nombre_usuario))
             
             # NUEVO: Registrar en el historial
             log_change(
@@ -4,13 +4,23 @@ import sys
 import os
 import shutil
 
+# Variable de entorno que, si está definida, sustituye la carpeta de datos
+# (la usan las pruebas de rendimiento para no tocar los datos reales)
+DATA_DIR_ENV = "INVENTARIO_DATA_DIR"
+
 def get_data_path():
     """
     Devuelve la ruta a la carpeta de datos persistente.
+    Si la variable de entorno INVENTARIO_DATA_DIR está definida, usa esa carpeta.
     Si se ejecuta desde un .exe, crea una carpeta 'data' local si no existe,
     copiando los datos iniciales desde el bundle.
     Si se ejecuta desde el código fuente, usa la carpeta 'data' del proyecto.
     """
+    ruta_entorno = os.environ.get(DATA_DIR_ENV)
+    if ruta_entorno:
+        os.makedirs(ruta_entorno, exist_ok=True)
+        return ruta_entorno
+
     # Determinar si estamos en un entorno empaquetado (ejecutable .exe)
     if getattr(sys, 'frozen', False):
         # Ruta donde está el ejecutable
@@ -33,4 +43,7 @@ def get_data_path():
 
 # Actualizar las constantes en los otros módulos para que usen esta función
 INVENTARIO_FILE = os.path.join(get_data_path(), "inventario.csv")
-USUARIOS_DB = os.path.join(get_data_path(), "usuarios.db")
\ No newline at end of file
+INVENTARIO_FEATHER_FILE = os.path.join(get_data_path(), "inventario.feather")
+USUARIOS_DB = os.path.join(get_data_path(), "usuarios.db")
+INVENTARIO_DB = os.path.join(get_data_path(), "inventario.db")
+HISTORIAL_DB = os.path.join(get_data_path(), "historial.db")
\ No newline at end of file